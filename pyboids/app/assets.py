@@ -1,10 +1,21 @@
-"""Generic asset management utilities for Pygame."""
+"""Generic asset management utilities for Pygame.
 
+Every load is timed in LOAD_TIMES. When a bundle built by pack() is
+present and up to date, images are read from it already decoded, and
+fonts from its bytes, instead of from the asset directories.
+"""
+
+import io
 import os
+import time
+import numpy as np
 import pygame
 
 from . import settings
 
+# (asset type, filename, seconds) of every load
+LOAD_TIMES = []
+
 
 class AssetLoader:
     """Base asset loader.
@@ -55,15 +66,27 @@ class AssetLoader:
         filename : str
             The asset's filename, e.g. 'asset.png'.
         """
+        start = time.perf_counter()
         for search_dir in cls.search_dirs:
             file_path = cls.get_file_path(search_dir, filename)
             try:
                 asset = cls.get_asset(file_path, *args, **kwargs)
+                LOAD_TIMES.append((cls.asset_type, filename,
+                                   time.perf_counter() - start))
                 return asset
             except Exception as e:
                 pass
         raise AssetLoader.AssetNotFoundError(cls, filename)
 
+    @classmethod
+    def find(cls, filename):
+        """Return the full path of an asset, or None if not found."""
+        for search_dir in cls.search_dirs:
+            file_path = cls.get_file_path(search_dir, filename)
+            if os.path.isfile(file_path):
+                return file_path
+        return None
+
     class AssetNotFoundError(FileNotFoundError):
         """Error for assets not found."""
 
@@ -111,12 +134,29 @@ class ImageAssetLoader(AssetLoader):
 
     asset_type = 'image'
     search_dirs = settings.IMG_DIRS
+    # converted images by file path and alpha, shared by all callers
+    cache = {}
 
     @classmethod
     def get_asset(cls, file_path, *, alpha=None):
-        image = pygame.image.load(file_path)
+        key = (file_path, alpha)
+        if key not in cls.cache:
+            cls.cache[key] = cls.decode(file_path, alpha)
+        return cls.cache[key]
+
+    @classmethod
+    def decode(cls, file_path, alpha):
+        pixels = bundled(file_path)
+        if pixels is not None:
+            height, width, depth = pixels.shape
+            image = pygame.image.frombuffer(
+                pixels, (width, height), 'RGBA' if depth == 4 else 'RGB')
+            has_alpha = depth == 4
+        else:
+            image = pygame.image.load(file_path)
+            has_alpha = image.get_alpha() is not None
         if alpha is None:
-            alpha = image.get_alpha() is not None
+            alpha = has_alpha
         if alpha:
             image = image.convert_alpha()
         else:
@@ -128,7 +168,8 @@ def image(filename, *, alpha=None):
     """Load an image.
 
     Searches for the image in the IMG_DIRS from the settings.py file.
-    If image is not found, raises a FileNotFound exception.
+    If image is not found, raises a FileNotFound exception. Images are
+    loaded once and shared, so they must not be drawn on.
 
     image('img.png') -> pygame.Surface
 
@@ -140,7 +181,7 @@ def image(filename, *, alpha=None):
         Pass True or False to explicitly define if the image has alpha channel.
         Default is to derive it from the surface's get_alpha() value.
     """
-    return ImageAssetLoader.load(filename)
+    return ImageAssetLoader.load(filename, alpha=alpha)
 
 
 def image_with_rect(filename, *, alpha=None):
@@ -258,6 +299,9 @@ class FreetypeFontAssetLoader(AssetLoader):
     def get_asset(cls, file_path, *, size=20):
         if not pygame.freetype.was_init():
             pygame.freetype.init()
+        packed = bundled(file_path)
+        if packed is not None:
+            return pygame.freetype.Font(io.BytesIO(packed.tobytes()), size)
         return pygame.freetype.Font(file_path, size)
 
 
@@ -278,3 +322,65 @@ def freetype(filename='', *, size=20):
     if not filename:
         filename = settings.DEFAULT_FONT
     return FreetypeFontAssetLoader.load(filename, size=size)
+
+
+_bundle = None
+
+
+def bundled(file_path):
+    """Return the packed data of an asset, or None if not bundled.
+
+    The bundle is opened on first use, and ignored when disabled,
+    missing or older than any of the assets it packs. Assets are only
+    read from it when asked for.
+    """
+    global _bundle
+    if _bundle is None:
+        _bundle = {}
+        path = settings.ASSET_BUNDLE
+        if settings.USE_ASSET_BUNDLE and os.path.isfile(path):
+            packed = np.load(path)
+            built = os.path.getmtime(path)
+            sources = [os.path.join(settings.BASE_DIR, name)
+                       for name in packed.files]
+            if all(os.path.isfile(source) and
+                   os.path.getmtime(source) <= built for source in sources):
+                _bundle = packed
+    name = os.path.relpath(file_path, settings.BASE_DIR)
+    if name not in _bundle:
+        return None
+    return _bundle[name]
+
+
+def pack(images, fonts, path=settings.ASSET_BUNDLE):
+    """Pack assets in a single file, read instead of the assets.
+
+    Images are stored decoded, as RGB or RGBA pixels, and fonts as the
+    bytes of their files.
+
+    Parameters
+    ----------
+    images, fonts : list of str
+        File names of the assets, as passed to image() and freetype().
+    path : str, optional
+        Default is settings.ASSET_BUNDLE.
+    """
+    packed = {}
+    for loader, filenames in [(ImageAssetLoader, images),
+                              (FreetypeFontAssetLoader, fonts)]:
+        for filename in filenames:
+            file_path = loader.find(filename)
+            if file_path is None:
+                raise AssetLoader.AssetNotFoundError(loader, filename)
+            name = os.path.relpath(file_path, settings.BASE_DIR)
+            if loader is ImageAssetLoader:
+                image = pygame.image.load(file_path)
+                mode = 'RGBA' if image.get_alpha() is not None else 'RGB'
+                width, height = image.get_size()
+                packed[name] = np.frombuffer(
+                    pygame.image.tobytes(image, mode), dtype=np.uint8
+                ).reshape(height, width, len(mode))
+            else:
+                packed[name] = np.fromfile(file_path, dtype=np.uint8)
+    with open(path, 'wb') as f:
+        np.savez(f, **packed)
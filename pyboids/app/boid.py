@@ -4,86 +4,147 @@ import numpy as np
 from . import utils
 from . import params
 from . import assets
+from .state import FlockState
 
 
 class Boid(pygame.sprite.Sprite):
     """A normal boid.
 
+    The kinematic state of a boid lives in a row of a FlockState. A boid
+    created on its own owns a single-row state; it is moved into the
+    state of a flock with attach(). A boid created for an existing row
+    of a state, e.g. added in bulk, is bound to it instead. Boids are
+    steered and moved by their flock, over the whole state at once.
+
     Parameters
     ----------
     pos : np.array
     vel : np.array
+    mass : float, optional
+    state : FlockState, optional
+        State holding the row of the boid, which pos, vel and mass
+        then leave as is.
+    index : int, optional
+        Row of the boid in state.
     """
 
     image_file = 'normal-boid.png'
+    leader = False
 
-    def __init__(self, pos=None, vel=None, mass=20):
+    def __init__(self, pos=None, vel=None, mass=params.BOID_MASS,
+                 state=None, index=None):
         super().__init__()
-        if pos is None:
-            pos = np.zeros(2)
-        if vel is None:
-            vel = np.zeros(2)
         self.base_image, self.rect = assets.image_with_rect(self.image_file)
         self.image = self.base_image
-        self.pos = pos
-        self.vel = vel
-        self.mass = mass
-        self.steering = np.zeros(2)
-        self.wandering_angle = utils.randrange(-np.pi, np.pi)
+        self.zoom = 1.
+        if state is not None:
+            self.state, self.index = state, index
+        else:
+            if pos is None:
+                pos = np.zeros(2)
+            if vel is None:
+                vel = np.zeros(2)
+            self.state = FlockState(capacity=1)
+            self.index = self.state.append(
+                pos, vel, mass, leader=self.leader,
+                wander=utils.randrange(-np.pi, np.pi))
+        self.sync()
+
+    def attach(self, state):
+        """Move the boid's state into another FlockState."""
+        index = state.append(self.pos, self.vel, self.mass,
+                             leader=self.leader, wander=self.wandering_angle)
+        state.steering[index] = self.steering
+        self.state, self.index = state, index
 
     @property
     def pos(self):
-        return self._pos
+        return self.state.pos[self.index]
 
     @pos.setter
     def pos(self, pos):
-        self._pos = pos
+        self.state.pos[self.index] = pos
         self.rect.center = tuple(pos)
 
+    @property
+    def wandering_angle(self):
+        return self.state.wander[self.index]
+
+    @wandering_angle.setter
+    def wandering_angle(self, angle):
+        self.state.wander[self.index] = angle
+
     @property
     def vel(self):
-        return self._vel
+        return self.state.vel[self.index]
 
     @vel.setter
     def vel(self, vel):
-        self._vel = vel
+        self.state.vel[self.index] = vel
         self._rotate_image()
 
-    def steer(self, force, alt_max=None):
-        """Add a force to the current steering force."""
-        # limit the steering each time we add a force
-        if alt_max is not None:
-            self.steering += utils.truncate(force / self.mass, alt_max)
-        else:
-            self.steering += utils.truncate(
-                force / self.mass, params.BOID_MAX_FORCE)
+    @property
+    def steering(self):
+        return self.state.steering[self.index]
 
-    def _rotate_image(self):
+    @steering.setter
+    def steering(self, steering):
+        self.state.steering[self.index] = steering
+
+    @property
+    def mass(self):
+        return self.state.mass[self.index]
+
+    def _rotate_image(self, vel=None):
         """Rotate base image using the velocity and assign to image."""
-        angle = -np.rad2deg(np.angle(self.vel[0] + 1j * self.vel[1]))
-        self.image = pygame.transform.rotate(self.base_image, angle)
+        if vel is None:
+            vel = self.vel
+        angle = -np.rad2deg(np.angle(vel[0] + 1j * vel[1]))
+        if self.zoom == 1:
+            self.image = pygame.transform.rotate(self.base_image, angle)
+        else:
+            self.image = pygame.transform.rotozoom(
+                self.base_image, angle, self.zoom)
         self.rect = self.image.get_rect(center=self.rect.center)
 
-    def update(self):
-        self.vel = utils.truncate(
-            self.vel + self.steering, params.BOID_MAX_SPEED)
-        self.pos = self.pos + self.vel
-
-    def display(self, screen, debug=False):
+    def sync(self, center=None, zoom=1., vel=None):
+        """Bring image and rect in line with the state.
+
+        Needed after the state has been updated in bulk by a flock.
+
+        Parameters
+        ----------
+        center : (float, float), optional
+            Screen position of the boid. Default is its world position.
+        zoom : float, optional
+            Scale of the image. Default is 1.
+        vel : np.array, optional
+            Velocity giving the heading. Default is the boid's velocity.
+        """
+        if center is None:
+            center = self.pos
+        self.zoom = zoom
+        self.rect.center = tuple(center)
+        self._rotate_image(vel)
+
+    def display(self, screen, debug=False, vel=None, steering=None):
         screen.blit(self.image, self.rect)
         if debug:
+            if vel is None:
+                vel = self.vel
+            if steering is None:
+                steering = self.steering
+            center = np.array(self.rect.center)
             pygame.draw.line(
                 screen, pygame.Color("red"),
-                tuple(self.pos), tuple(self.pos + 2 * self.vel))
+                tuple(center), tuple(center + 2 * self.zoom * vel))
             pygame.draw.line(
-                screen, pygame.Color("blue"), tuple(self.pos),
-                tuple(self.pos + 30 * self.steering))
-
-    def reset_frame(self):
-        self.steering = np.zeros(2)
+                screen, pygame.Color("blue"), tuple(center),
+                tuple(center + 30 * self.zoom * steering))
 
 
 class LeaderBoid(Boid):
     """A boid that others boids want to follow."""
 
     image_file = 'leader-boid.png'
+    leader = True
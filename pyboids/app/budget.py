@@ -0,0 +1,112 @@
+"""Frame budget, trading fidelity for a steady frame rate."""
+import contextlib
+import logging
+from . import params
+
+logger = logging.getLogger(__name__)
+
+
+class FrameBudget:
+    """Lowers the fidelity of a flock to hold a frame rate.
+
+    The cost of frames is averaged over time. When it exceeds the time
+    of a frame, fidelity is lowered by one level; when it falls under a
+    fraction of it, the last level is undone. Each level is a dict of
+    Config values, or of the renderer of the flock, and every change is
+    logged.
+
+    FrameBudget(flock, fps=params.FPS, levels=params.BUDGET_LEVELS,
+                lock=None) -> FrameBudget
+
+    Parameters
+    ----------
+    flock : Flock
+    fps : float, optional
+        Frame rate to hold. Default is FPS.
+    levels : list of dict, optional
+        Default is BUDGET_LEVELS.
+    lock : context manager, optional
+        Held while changing the flock.
+
+    Attributes
+    ----------
+    level : int
+        Number of levels applied.
+    cost : float
+        Mean cost of a frame, in seconds.
+    history : list of (int, int, float)
+        Frame, new level and mean cost of each change.
+    """
+
+    def __init__(self, flock, fps=params.FPS, levels=params.BUDGET_LEVELS,
+                 lock=None):
+        self.flock = flock
+        self.budget = 1 / fps
+        self.levels = levels
+        self.lock = lock if lock is not None else contextlib.nullcontext()
+        self.level = 0
+        self.saved = []
+        self.cost = None
+        self.frames = 0
+        self.patience = params.BUDGET_PATIENCE
+        self.history = []
+
+    def update(self, cost):
+        """Account for the cost of a frame, changing level if needed.
+
+        Returns whether the level changed.
+        """
+        self.frames += 1
+        if self.cost is None:
+            self.cost = cost
+        else:
+            self.cost += params.BUDGET_SMOOTHING * (cost - self.cost)
+        self.patience -= 1
+        if self.patience > 0:
+            return False
+        if self.cost > self.budget and self.level < len(self.levels):
+            self.degrade()
+        elif self.cost < params.BUDGET_HEADROOM * self.budget and \
+                self.level > 0:
+            self.restore()
+        else:
+            return False
+        self.patience = params.BUDGET_PATIENCE
+        return True
+
+    def _apply(self, values):
+        """Set values, returning those they replace."""
+        values = dict(values)
+        previous = {}
+        with self.lock:
+            if 'renderer' in values:
+                previous['renderer'] = self.flock.renderer
+                self.flock.renderer = values.pop('renderer')
+            if values:
+                config = self.flock.config
+                previous.update(
+                    (name, getattr(config, name)) for name in values)
+                self.flock.configure(config.replace(**values))
+        return previous
+
+    def degrade(self):
+        """Apply the next level."""
+        values = self.levels[self.level]
+        self.saved.append(self._apply(values))
+        self.level += 1
+        self._log('lowered', values)
+
+    def restore(self):
+        """Undo the last level."""
+        values = self.saved.pop()
+        self._apply(values)
+        self.level -= 1
+        self._log('restored', values)
+
+    def _log(self, action, values):
+        self.history.append((self.frames, self.level, self.cost))
+        logger.info(
+            'frame %d: %.1f ms per frame for %.1f ms, %s fidelity to '
+            'level %d (%s)', self.frames, 1000 * self.cost,
+            1000 * self.budget, action, self.level,
+            ', '.join('{}={}'.format(*item) for item in values.items()))
@@ -0,0 +1,61 @@
+"""Camera class."""
+import numpy as np
+from . import params
+
+
+class Camera:
+    """A view on the world, mapping world coordinates to the screen.
+
+    Camera(size=params.SCREEN_SIZE, center=None, zoom=1.) -> Camera
+
+    Parameters
+    ----------
+    size : (int, int), optional
+        Size of the screen. Default is SCREEN_SIZE.
+    center : (float, float), optional
+        World position shown at the center of the screen.
+        Default is the center of the screen, i.e. no translation.
+    zoom : float, optional
+        Screen pixels per world pixel. Default is 1.
+    """
+
+    def __init__(self, size=params.SCREEN_SIZE, center=None, zoom=1.):
+        self.size = np.array(size, dtype=float)
+        if center is None:
+            center = self.size / 2
+        self.center = np.array(center, dtype=float)
+        self.zoom = zoom
+
+    def to_screen(self, pos):
+        """Convert world positions to screen positions."""
+        return (pos - self.center) * self.zoom + self.size / 2
+
+    def to_world(self, screen_pos):
+        """Convert screen positions to world positions."""
+        return (np.asarray(screen_pos) - self.size / 2) / self.zoom + \
+            self.center
+
+    def pan(self, delta):
+        """Move the view by delta screen pixels."""
+        self.center += np.asarray(delta) / self.zoom
+
+    def zoom_at(self, factor, screen_pos):
+        """Zoom by factor, keeping the world point under screen_pos fixed."""
+        anchor = self.to_world(screen_pos)
+        self.zoom = min(max(self.zoom * factor, params.MIN_ZOOM),
+                        params.MAX_ZOOM)
+        self.center = anchor - (np.asarray(screen_pos) - self.size / 2) / \
+            self.zoom
+
+    def view(self, margin=0):
+        """Return the lower and upper world corners of the view.
+
+        Parameters
+        ----------
+        margin : float, optional
+            Extra screen pixels around the view, e.g. to account for
+            the size of sprites.
+        """
+        lo = self.to_world((-margin, -margin))
+        hi = self.to_world(self.size + margin)
+        return lo, hi
@@ -0,0 +1,78 @@
+"""Simulation configuration."""
+from collections import namedtuple
+from . import params
+
+PARAMETERS = [
+    'box_margin', 'steer_inside', 'boid_max_force', 'boid_max_speed',
+    'r_seek', 'r_flee', 'wander_dist', 'wander_radius', 'wander_angle',
+    'max_see_ahead', 'max_avoid_force', 'separation_dist',
+    'max_separation_force', 'leader_behind_dist', 'leader_ahead_dist',
+    'obstacle_default_radius', 'align_radius', 'cell_size',
+    'obstacle_cell_size', 'neighbour_skin', 'neighbour_every',
+    'k_neighbours', 'world_size', 'wrap_around', 'debug', 'hotspots',
+    'renderer', 'behaviour_order', 'behaviour_weights', 'dtype',
+]
+DERIVED = [
+    'seek_max_force', 'flee_max_force', 'r_flee2', 'neighbour_radius',
+    'see_ahead',
+]
+
+
+class Config(namedtuple('Config', PARAMETERS + DERIVED)):
+    """Frozen set of parameters of a simulation.
+
+    Each parameter defaults to the params value of the same name in
+    upper case. Constants derived from the parameters are computed once,
+    on creation, and are read-only like the parameters themselves.
+    behaviour_weights is kept as a tuple of (name, weight) pairs, so
+    that changing the dict it was given changes no Config.
+
+    Config(**parameters) -> Config
+
+    Derived constants
+    -----------------
+    seek_max_force, flee_max_force : float
+        Caps on the seek and flee forces.
+    r_flee2 : float
+        Square of R_FLEE.
+    neighbour_radius : float
+        Largest radius of the neighbour-based behaviours.
+    see_ahead : float
+        Look-ahead distance of obstacle avoidance per unit of velocity.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, **parameters):
+        unknown = set(parameters) - set(PARAMETERS)
+        if unknown:
+            raise TypeError('unknown parameters: {}'.format(
+                ', '.join(sorted(unknown))))
+        values = {name: getattr(params, name.upper()) for name in PARAMETERS}
+        values.update(parameters)
+        values['behaviour_weights'] = tuple(
+            dict(values['behaviour_weights']).items())
+        values.update(
+            seek_max_force=values['boid_max_force'] / 50,
+            flee_max_force=values['boid_max_force'] / 10,
+            r_flee2=values['r_flee'] * values['r_flee'],
+            neighbour_radius=max(values['align_radius'],
+                                 values['separation_dist']),
+            see_ahead=values['max_see_ahead'] / values['boid_max_speed'],
+        )
+        return super().__new__(cls, **values)
+
+    def replace(self, **parameters):
+        """Return a copy with some parameters changed."""
+        values = {name: getattr(self, name) for name in PARAMETERS}
+        values.update(parameters)
+        return Config(**values)
+
+
+def configured(overrides):
+    """Return a Config from values keyed by upper case params name.
+
+    configured({'ALIGN_RADIUS': 100}) -> Config
+    """
+    return Config(**{name.lower(): value
+                     for name, value in overrides.items()})
@@ -0,0 +1,326 @@
+"""Headless export of runs to image sequences, raw video or recordings.
+
+A flock is simulated without a window and drawn to an offscreen surface
+every few steps. Frames are handed to a writer thread, which encodes
+them while the next ones are simulated, so that a run exports as fast
+as it simulates instead of at the frame rate of a screen. Runs are
+seeded, so exporting the same run twice gives the same frames.
+
+From the pyboids directory, as a PNG sequence:
+
+    python -m app.export --boids 500 --steps 600 --on align --out frames
+
+or as a raw RGB stream, e.g. piped to ffmpeg:
+
+    python -m app.export --boids 500 --steps 600 --scale 0.5 --raw \\
+        --out - | ffmpeg -f rawvideo -pix_fmt rgb24 -s 480x360 -r 30 \\
+        -i - flock.mp4
+
+or as a recording, to be replayed from the menu:
+
+    python -m app.export --boids 500 --steps 6000 --record recordings/run
+
+The time series of flocking observables of a run may be written along,
+as CSV:
+
+    python -m app.export --boids 500 --steps 600 --on align \\
+        --metrics metrics.csv
+"""
+import argparse
+import ast
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+import pygame
+
+from . import params
+from .camera import Camera
+from .config import configured
+from .flock import Flock
+from .metrics import Series
+from .obstacle import Obstacle
+from .recording import Recorder
+from . import scenario as scenarios
+
+
+class FrameWriter:
+    """Writes frames to disk on a thread of its own.
+
+    Frames are queued as RGB bytes, so that the surface they come from
+    can be drawn on again right away. Images are written as numbered
+    files in a directory, raw frames one after the other to a single
+    file.
+
+    FrameWriter(path, size, raw=False,
+                queue_size=params.EXPORT_QUEUE_SIZE) -> FrameWriter
+
+    Parameters
+    ----------
+    path : str
+        Directory of the images, or file of the raw stream, '-' for the
+        standard output.
+    size : (int, int)
+        Size of the frames, in pixels.
+    raw : bool, optional
+        Whether to write a raw stream instead of images.
+    queue_size : int, optional
+        Number of frames waiting to be written, past which write()
+        blocks. Default is EXPORT_QUEUE_SIZE.
+
+    Attributes
+    ----------
+    frames : int
+        Number of frames written.
+    """
+
+    def __init__(self, path, size, raw=False,
+                 queue_size=params.EXPORT_QUEUE_SIZE):
+        self.path = path
+        self.size = tuple(size)
+        self.raw = raw
+        self.queue = queue.Queue(queue_size)
+        self.frames = 0
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        """Start writing the queued frames."""
+        if not self.raw:
+            os.makedirs(self.path, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, surface):
+        """Queue a copy of a surface, of the size of the frames."""
+        if self.error is not None:
+            raise self.error
+        self.queue.put(pygame.image.tobytes(surface, 'RGB'))
+
+    def close(self):
+        """Wait for the queued frames to be written."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        if not self.raw:
+            stream = None
+        elif self.path == '-':
+            stream = sys.stdout.buffer
+        else:
+            stream = open(self.path, 'wb')
+        try:
+            while True:
+                data = self.queue.get()
+                if data is None:
+                    break
+                if self.error is not None:
+                    # keep emptying the queue, so that write() raises
+                    # instead of blocking
+                    continue
+                try:
+                    self._write(stream, data)
+                except Exception as error:
+                    self.error = error
+        finally:
+            if stream is sys.stdout.buffer:
+                stream.flush()
+            elif stream is not None:
+                stream.close()
+
+    def _write(self, stream, data):
+        if stream is not None:
+            stream.write(data)
+        else:
+            image = pygame.image.frombuffer(data, self.size, 'RGB')
+            pygame.image.save(image, os.path.join(
+                self.path, params.EXPORT_PATTERN.format(self.frames)))
+        self.frames += 1
+
+
+def export(path=None, boids=200, obstacles=5, steps=300,
+           every=params.EXPORT_EVERY, scale=params.EXPORT_SCALE,
+           size=params.SCREEN_SIZE, raw=False, seed=0, overrides=None,
+           behaviours=None, renderer=None, record=None, scenario=None,
+           metrics=None):
+    """Simulate a flock and write a frame every few steps.
+
+    A display mode must be set, e.g. on the dummy video driver, for the
+    images of the boids to load.
+
+    Parameters
+    ----------
+    path : str, optional
+        Where images are written, see FrameWriter. Default is to draw
+        nothing.
+    boids, obstacles : int, optional
+        Number of entities, placed uniformly at random in the world.
+    steps : int, optional
+    every : int, optional
+        Number of steps per frame; the steps in between are simulated
+        but not drawn. Default is EXPORT_EVERY.
+    scale : float, optional
+        Size of the frames relative to size. Frames are drawn at that
+        size rather than scaled down once drawn. Default is
+        EXPORT_SCALE.
+    size : (int, int), optional
+        Size of the full-scale frames, which show the whole world.
+        Default is SCREEN_SIZE.
+    raw : bool, optional
+        Whether to write a raw RGB stream instead of PNG images.
+    seed : int, optional
+    overrides : dict, optional
+        Parameter values of the run, by upper case params name.
+    behaviours : dict, optional
+        Behaviour switches overriding the flock's defaults.
+    renderer : str, optional
+        Renderer of the boids. Default is the one of the Config.
+    record : str, optional
+        Directory of a recording to write the frames to as well.
+    scenario : str, optional
+        Scenario file the flock is set up from, instead of placing
+        boids and obstacles at random. Overrides and behaviours apply
+        on top of it.
+    metrics : str, optional
+        CSV file the time series of flocking observables is written to,
+        see metrics.Series.
+
+    Returns
+    -------
+    stats : dict
+        Number of frames, their size and the export rate in frames and
+        steps per second.
+    """
+    np.random.seed(seed)
+    if scenario is not None:
+        flock = scenarios.load(scenario)
+        flock.configure(flock.config.replace(**{
+            name.lower(): value for name, value in (overrides or {}).items()}))
+    else:
+        flock = Flock(configured(overrides or {}), seed=seed)
+    config, world = flock.config, flock.world
+    flock.behaviours.update(behaviours or {})
+    if renderer is not None:
+        flock.renderer = renderer
+    if scenario is None:
+        for pos in np.random.rand(boids, 2) * world.size:
+            flock.add_element(pos)
+        for pos in np.random.rand(obstacles, 2) * world.size:
+            flock.add_obstacle(
+                Obstacle(pos=pos, radius=config.obstacle_default_radius))
+    full = np.array(size, dtype=float)
+    size = np.round(full * scale).astype(int)
+    camera = Camera(size=size, center=world.size / 2,
+                    zoom=scale * min(full / world.size))
+    surface = pygame.Surface(tuple(size))
+    writer = recorder = None
+    if path is not None:
+        writer = FrameWriter(path, size, raw=raw)
+        writer.start()
+    if record is not None:
+        recorder = Recorder(record, flock)
+    series = stream = None
+    if metrics is not None:
+        stream = open(metrics, 'w', newline='')
+        series = Series(flock, stream=stream)
+    frames = 0
+    start = time.perf_counter()
+    try:
+        for step in range(1, steps + 1):
+            flock.update(None, None)
+            if series is not None:
+                series.update()
+            if step % every:
+                flock.reset_frame()
+                continue
+            frames += 1
+            if recorder is not None:
+                obstacles = [(obstacle, obstacle.pos)
+                             for obstacle in flock.obstacle_map.obstacles]
+                recorder.write(flock.state.pos, flock.state.vel, obstacles,
+                               flock.steps)
+            if writer is None:
+                flock.reset_frame()
+                continue
+            surface.fill(params.SIMULATION_BACKGROUND)
+            flock.display(surface, camera)
+            writer.write(surface)
+    finally:
+        if writer is not None:
+            writer.close()
+        if recorder is not None:
+            recorder.close()
+        if stream is not None:
+            stream.close()
+    elapsed = time.perf_counter() - start
+    return {
+        'frames': frames,
+        'size': tuple(int(n) for n in size),
+        'frames_per_sec': frames / elapsed,
+        'steps_per_sec': steps / elapsed,
+    }
+
+
+def headless():
+    """Switch pygame to the dummy video driver and set a display mode."""
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.display.quit()
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('overrides', nargs='*', metavar='NAME=VALUE')
+    parser.add_argument('--boids', type=int, default=200)
+    parser.add_argument('--obstacles', type=int, default=5)
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--on', action='append', default=[], metavar='BEHAVIOUR',
+        help='switch a behaviour on, e.g. --on align')
+    parser.add_argument('--every', type=int, default=params.EXPORT_EVERY,
+                        help='steps per frame')
+    parser.add_argument('--scale', type=float, default=params.EXPORT_SCALE,
+                        help='size of the frames relative to the screen')
+    parser.add_argument('--renderer', choices=['sprites', 'points',
+                                               'heatmap'])
+    parser.add_argument('--raw', action='store_true',
+                        help='write a raw RGB stream instead of images')
+    parser.add_argument('--out',
+                        help="directory of the images, or file of the raw "
+                        "stream, '-' for the standard output")
+    parser.add_argument('--scenario', metavar='FILE',
+                        help='scenario to set up the flock from, instead '
+                        'of --boids, --obstacles and --seed')
+    parser.add_argument('--record', metavar='DIR',
+                        help='directory of a recording of the frames')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='CSV file of the time series of observables')
+    args = parser.parse_args()
+    if args.out is None and args.record is None and args.metrics is None:
+        parser.error('nothing to export: give --out, --record or --metrics')
+    overrides = {}
+    for item in args.overrides:
+        name, value = item.split('=', 1)
+        overrides[name] = ast.literal_eval(value)
+    headless()
+    stats = export(args.out, boids=args.boids, obstacles=args.obstacles,
+                   steps=args.steps, every=args.every, scale=args.scale,
+                   raw=args.raw, seed=args.seed, overrides=overrides,
+                   behaviours={name: True for name in args.on},
+                   renderer=args.renderer, record=args.record,
+                   scenario=args.scenario, metrics=args.metrics)
+    # the standard output may be the stream itself
+    print('{frames} frames of {size[0]}x{size[1]}, {frames_per_sec:.1f} '
+          'frames and {steps_per_sec:.1f} steps per second'.format(**stats),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,51 @@
 """Flock class."""
 import pygame
 import numpy as np
-from . import params, utils
+from . import params, utils, spatial, render
 from .boid import Boid, LeaderBoid
-from .obstacle import Obstacle
+from .obstacle import Obstacle, ObstacleMap
+from .state import FlockState
+from .config import Config
+from .world import World
+from .camera import Camera
+from .hotspots import HotSpots
+from .pipeline import Pipeline
+from .leading import Leading
+
+NEIGHBOUR_BEHAVIOURS = ('align', 'separate')
 
 
 class Flock(pygame.sprite.Sprite):
-    """Represents a set of boids that obey to certain behaviours."""
+    """Represents a set of boids that obey to certain behaviours.
+
+    Parameters
+    ----------
+    config : Config, optional
+        Default is Config().
+    seed : int, optional
+        Seed of the random generator of the flock.
+    """
 
-    def __init__(self):
+    def __init__(self, config=None, seed=None):
         super().__init__()
+        self.config = config = config if config is not None else Config()
+        self.random = np.random.RandomState(seed)
+        self.randoms = np.zeros(0)
+        self.buffers = {}
+        self.world = World(size=config.world_size, wrap=config.wrap_around)
+        self.state = FlockState(dtype=config.dtype)
+        self.neighbours = self.neighbour_list(config)
         self.normal_boids = pygame.sprite.Group()
-        self.leader_boid = pygame.sprite.GroupSingle()
+        self.leader_boids = pygame.sprite.Group()
         self.boids = pygame.sprite.Group()
+        self.members = []  # boid sprites, by row of the state
         self.obstacles = pygame.sprite.Group()
+        self.obstacle_map = ObstacleMap(
+            config.obstacle_cell_size, self.world.period)
+        self.hotspots = HotSpots(self.world.size)
+        self.neighbours_fresh = False
+        self.neighbours_step = None
+        self.steps = 0
         self.behaviours = {
             'pursue': False,
             'escape': False,
@@ -24,214 +55,462 @@ class Flock(pygame.sprite.Sprite):
             'align': False,
             'separate': False,
         }
+        self.leading = None
+        self.pipeline = Pipeline()
+        for name, stage in [('pursue', self.pursue),
+                            ('escape', self.escape),
+                            ('follow leader', self.follow_leader),
+                            ('wander', self.wander),
+                            ('avoid collision', self.avoid_collision),
+                            ('align', self.align),
+                            ('separate', self.separate),
+                            ('remain in screen', self.remain_in_screen)]:
+            self.pipeline.register(name, stage)
         self.kinds = ['normal-boid', 'leader-boid', 'obstacle']
         self.add_kind = 'normal-boid'
+        self.renderers = ['sprites', 'points', 'heatmap']
+        self.renderer = config.renderer
 
     def switch_element(self):
         self.kinds = np.roll(self.kinds, -1)
         self.add_kind = self.kinds[0]
 
+    def switch_renderer(self):
+        k = self.renderers.index(self.renderer)
+        self.renderer = self.renderers[(k + 1) % len(self.renderers)]
+
     def add_element(self, pos):
         """Add a boid at pos.
 
         The type of boid is the current add_kind value.
         """
         angle = np.pi * (2 * np.random.rand() - 1)
-        vel = params.BOID_MAX_SPEED * np.array([np.cos(angle), np.sin(angle)])
+        vel = self.config.boid_max_speed * np.array(
+            [np.cos(angle), np.sin(angle)])
         if self.add_kind == 'normal-boid':
-            self.normal_boids.add(Boid(pos=np.array(pos), vel=vel))
-            self.boids.add(self.normal_boids)
+            self.add_boid(Boid(pos=np.array(pos), vel=vel))
         elif self.add_kind == 'leader-boid':
-            self.boids.remove(self.leader_boid)
-            self.leader_boid.add(LeaderBoid(pos=np.array(pos), vel=vel))
-            self.boids.add(self.leader_boid)
+            self.add_boid(LeaderBoid(pos=np.array(pos), vel=vel))
         elif self.add_kind == 'obstacle':
-            self.obstacles.add(Obstacle(pos=pos))
+            self.add_obstacle(Obstacle(
+                pos=pos, radius=self.config.obstacle_default_radius))
+
+    def add_boid(self, boid):
+        """Add a boid to the flock, moving its state into the flock's."""
+        boid.attach(self.state)
+        self.members.append(boid)
+        if boid.leader:
+            self.leader_boids.add(boid)
+        else:
+            self.normal_boids.add(boid)
+        self.boids.add(boid)
+
+    def add_boids(self, pos, vel, leader=False, mass=params.BOID_MASS,
+                  wander=None):
+        """Add boids at once, straight into the state of the flock.
+
+        Parameters
+        ----------
+        pos, vel : np.array, shape (n, 2)
+        leader, mass : np.array, shape (n,), or scalars, optional
+        wander : np.array, shape (n,), optional
+            Wandering angles. Default is drawn from the flock's
+            generator.
+
+        Returns
+        -------
+        rows : np.array of int
+            Rows of the boids in the state.
+        """
+        if wander is None:
+            wander = np.pi * self.uniform(len(pos))
+        rows = self.state.extend(pos, vel, mass, leader=leader,
+                                 wander=wander)
+        leader = np.broadcast_to(leader, rows.shape)
+        boids = [(LeaderBoid if lead else Boid)(state=self.state, index=row)
+                 for row, lead in zip(rows, leader)]
+        self.members += boids
+        self.leader_boids.add(boid for boid in boids if boid.leader)
+        self.normal_boids.add(boid for boid in boids if not boid.leader)
+        self.boids.add(boids)
+        return rows
+
+    def add_obstacle(self, obstacle):
+        self.obstacles.add(obstacle)
+        self.obstacle_map.add(obstacle)
+
+    def add_obstacles(self, obstacles):
+        """Add obstacles at once."""
+        obstacles = list(obstacles)
+        self.obstacles.add(obstacles)
+        self.obstacle_map.extend(obstacles)
+
+    def configure(self, config):
+        """Switch to another configuration from the next step on.
+
+        Only what depends on the parameters that changed is rebuilt, so
+        that switching e.g. debug or a frame budget level is cheap.
+        """
+        previous, self.config = self.config, config
+        self.world.size = np.array(config.world_size, dtype=float)
+        self.world.wrap = config.wrap_around
+        self.state.cast(config.dtype)
+        self.world.contain(self.state.pos)
+        neighbour_parameters = ('k_neighbours', 'neighbour_radius',
+                                'neighbour_skin')
+        if any(getattr(config, name) != getattr(previous, name)
+               for name in neighbour_parameters) or \
+                not np.array_equal(self.world.period, self.neighbours.period):
+            self.neighbours = self.neighbour_list(config)
+            self.neighbours_fresh = False
+            self.neighbours_step = None
+        if config.obstacle_cell_size != self.obstacle_map.cell_size or \
+                not np.array_equal(self.world.period,
+                                   self.obstacle_map.period):
+            obstacles = self.obstacle_map.obstacles
+            self.obstacle_map = ObstacleMap(
+                config.obstacle_cell_size, self.world.period)
+            self.obstacle_map.extend(obstacles)
+        if not np.array_equal(config.world_size, previous.world_size):
+            self.hotspots = HotSpots(self.world.size)
+
+    def neighbour_list(self, config):
+        """Return an empty neighbour list, metric or topological."""
+        if config.k_neighbours:
+            return spatial.KNearestList(
+                config.k_neighbours, config.neighbour_radius,
+                period=self.world.period)
+        return spatial.NeighbourList(
+            config.neighbour_radius, skin=config.neighbour_skin,
+            period=self.world.period)
+
+    @property
+    def recording(self):
+        """Whether pairwise tests are counted in the hot spots."""
+        return self.config.debug or self.config.hotspots
+
+    def toggle_wrap(self):
+        """Switch the world between bounded and wrapping."""
+        self.configure(
+            self.config.replace(wrap_around=not self.config.wrap_around))
 
     def remain_in_screen(self):
-        for boid in self.boids:
-            if boid.pos[0] > params.SCREEN_WIDTH - params.BOX_MARGIN:
-                boid.steer(np.array([-params.STEER_INSIDE, 0.]))
-            if boid.pos[0] < params.BOX_MARGIN:
-                boid.steer(np.array([params.STEER_INSIDE, 0.]))
-            if boid.pos[1] < params.BOX_MARGIN:
-                boid.steer(np.array([0., params.STEER_INSIDE]))
-            if boid.pos[1] > params.SCREEN_HEIGHT - params.BOX_MARGIN:
-                boid.steer(np.array([0., -params.STEER_INSIDE]))
-
-    def seek_single(self, target_pos, boid):
-        d = utils.dist(boid.pos, target_pos)
-        steering = (
-            utils.normalize(target_pos - boid.pos) *
-            params.BOID_MAX_SPEED * min(d / params.R_SEEK, 1) -
-            boid.vel)
-        boid.steer(steering, alt_max=params.BOID_MAX_FORCE / 50)
-
-    def seek(self, target_boid):
-        """Make all normal boids seek to go to a target."""
-        for boid in self.normal_boids:
-            self.seek_single(target_boid, boid)
-
-    def flee_single(self, target_pos, boid):
-        too_close = utils.dist2(boid.pos, target_pos) < params.R_FLEE**2
-        if too_close:
-            steering = (utils.normalize(boid.pos - target_pos) *
-                        params.BOID_MAX_SPEED -
-                        boid.vel)
-            boid.steer(steering, alt_max=params.BOID_MAX_FORCE / 10)
-
-    def flee(self, target_boid):
-        """Make all normal boids fly away from a target."""
-        for boid in self.normal_boids:
-            self.flee_single(target_boid, boid)
-
-    def pursue_single(self, target_pos, target_vel, boid):
-        t = int(utils.norm(target_pos - boid.pos) / params.BOID_MAX_SPEED)
-        future_pos = target_pos + t * target_vel
-        self.seek_single(future_pos, boid)
-
-    def pursue(self, target_boid):
-        """Make all normal boids pursue a target boid with anticipation."""
-        for boid in self.normal_boids:
-            self.pursue_single(target_boid.pos, target_boid.vel, boid)
-
-    def escape_single(self, target_pos, target_vel, boid):
-        t = int(utils.norm(target_pos - boid.pos) / params.BOID_MAX_SPEED)
-        future_pos = target_pos + t * target_vel
-        self.flee_single(future_pos, boid)
-
-    def escape(self, target_boid):
-        """Make all normal boids escape a target boid with anticipation."""
-        for boid in self.normal_boids:
-            self.escape_single(target_boid.pos, target_boid.vel, boid)
+        """Steer boids back inside a bounded world."""
+        if not self.world.wrap:
+            c = self.config
+            self.steer(np.arange(len(self.state)), self.world.steer_inside(
+                self.state.pos, c.box_margin, c.steer_inside))
+
+    def steer(self, boids, forces, max_force=None):
+        """Add forces to the steering of several boids at once.
+
+        Same as Boid.steer, applied to every row. Forces are queued in
+        the pipeline, which adds them up once all behaviours have run.
+
+        Parameters
+        ----------
+        boids : np.array of int
+            Rows of the boids in the flock state.
+        forces : np.array, shape (len(boids), 2)
+        max_force : float, optional
+            Cap on the contribution of each force.
+            Default is the boid_max_force of the configuration.
+        """
+        if max_force is None:
+            max_force = self.config.boid_max_force
+        self.pipeline.emit(boids, forces, max_force)
+
+    def followers(self):
+        """Return the rows of the normal boids and of their leader.
+
+        Each normal boid follows the leader nearest to it.
+        """
+        leader = self.state.leader
+        boids = np.flatnonzero(~leader)
+        leaders = np.flatnonzero(leader)
+        if len(leaders) == 1:
+            return boids, np.repeat(leaders, len(boids))
+        grid = spatial.SpatialGrid(self.state.pos[leaders],
+                                   cell_size=self.config.cell_size,
+                                   period=self.world.period)
+        return boids, leaders[grid.nearest(self.state.pos[boids])]
+
+    def seek(self, boids, targets):
+        """Make boids seek to go to targets.
+
+        Parameters
+        ----------
+        boids : np.array of int
+        targets : np.array, shape (len(boids), 2) or (2,)
+        """
+        s, c = self.state, self.config
+        offset = self.world.offset(s.pos[boids], targets)
+        d = utils.norms(offset)
+        speed = c.boid_max_speed * np.minimum(d / c.r_seek, 1)
+        steering = (utils.normalize_rows(offset, pre_computed=d) *
+                    speed[:, None] - s.vel[boids])
+        self.steer(boids, steering, c.seek_max_force)
+
+    def flee(self, boids, targets):
+        """Make boids fly away from targets that are too close.
+
+        Parameters
+        ----------
+        boids : np.array of int
+        targets : np.array, shape (len(boids), 2) or (2,)
+        """
+        s, c = self.state, self.config
+        offset = self.world.offset(targets, s.pos[boids])
+        too_close = (offset[:, 0] * offset[:, 0] +
+                     offset[:, 1] * offset[:, 1]) < c.r_flee2
+        boids = boids[too_close]
+        steering = (utils.normalize_rows(offset[too_close]) *
+                    c.boid_max_speed - s.vel[boids])
+        self.steer(boids, steering, c.flee_max_force)
+
+    def pursue(self):
+        """Make boids pursue their leader with anticipation."""
+        if self.leading is None:
+            return
+        self.seek(self.leading.boids, self.leading.predicted)
+
+    def escape(self):
+        """Make boids escape their leader with anticipation."""
+        if self.leading is None:
+            return
+        self.flee(self.leading.boids, self.leading.predicted)
+
+    def uniform(self, n):
+        """Return n random numbers between -1 and 1.
+
+        Numbers are drawn from the flock's generator in blocks of at
+        least RANDOM_BLOCK.
+        """
+        if len(self.randoms) < n:
+            self.randoms = self.random.uniform(
+                -1, 1, max(n, params.RANDOM_BLOCK))
+        numbers, self.randoms = self.randoms[:n], self.randoms[n:]
+        return numbers
+
+    def buffer(self, name, n, width=None):
+        """Return a scratch array of n rows, reused from step to step."""
+        shape = (n,) if width is None else (n, width)
+        buffer = self.buffers.get(name)
+        if buffer is None or len(buffer) < n:
+            buffer = self.buffers[name] = np.empty((2 * n,) + shape[1:])
+        return buffer[:n]
 
     def wander(self):
-        """Make all boids wander around randomly."""
-        rands = 2 * np.random.rand(len(self.boids)) - 1
-        cos = np.cos([b.wandering_angle for b in self.boids])
-        sin = np.sin([b.wandering_angle for b in self.boids])
-        for i, boid in enumerate(self.boids):
-            nvel = utils.normalize(boid.vel)
-            # calculate circle center
-            circle_center = nvel * params.WANDER_DIST
-            # calculate displacement force
-            c, s = cos[i], sin[i]
-            displacement = np.dot(
-                np.array([[c, -s], [s, c]]), nvel * params.WANDER_RADIUS)
-            boid.steer(circle_center + displacement)
-            boid.wandering_angle += params.WANDER_ANGLE * rands[i]
-
-    def find_most_threatening_obstacle(self, boid, aheads):
-        most_threatening = None
-        distance_to_most_threatening = float('inf')
-        for obstacle in self.obstacles:
-            norms = [utils.norm2(obstacle.pos - ahead) for ahead in aheads]
-            if all(n > obstacle.radius * obstacle.radius for n in norms):
-                continue
-            distance_to_obstacle = utils.dist2(boid.pos, obstacle.pos)
-            if most_threatening is not None and \
-                    distance_to_obstacle > distance_to_most_threatening:
-                continue
-            most_threatening = obstacle
-            distance_to_most_threatening = utils.dist2(boid.pos,
-                                                       most_threatening.pos)
-        return most_threatening
+        """Make all boids wander around randomly.
+
+        Each boid seeks a point on a circle ahead of it, at its wandering
+        angle, which then turns by a random amount.
+        """
+        s, c = self.state, self.config
+        n = len(s)
+        vx, vy = s.vel[:, 0], s.vel[:, 1]
+        speed = np.hypot(vx, vy, out=self.buffer('speed', n))
+        np.maximum(speed, 1e-13, out=speed)
+        # components of the force along and across the velocity,
+        # divided by the speed to normalize the velocity
+        along = np.cos(s.wander, out=self.buffer('along', n))
+        along *= c.wander_radius
+        along += c.wander_dist
+        across = np.sin(s.wander, out=self.buffer('across', n))
+        across *= c.wander_radius
+        along /= speed
+        across /= speed
+        forces = self.buffer('wander', n, 2)
+        np.multiply(vx, along, out=forces[:, 0])
+        forces[:, 0] -= vy * across
+        np.multiply(vy, along, out=forces[:, 1])
+        forces[:, 1] += vx * across
+        s.wander += c.wander_angle * self.uniform(n)
+        self.steer(np.arange(n), forces)
 
     def avoid_collision(self):
-        """Avoid collisions between boids and obstacles."""
-        for boid in self.boids:
-            ahead = boid.pos + boid.vel / params.BOID_MAX_SPEED * \
-                params.MAX_SEE_AHEAD
-            ahead2 = boid.pos + boid.vel / params.BOID_MAX_SPEED / 2 * \
-                params.MAX_SEE_AHEAD
-            most_threatening = self.find_most_threatening_obstacle(
-                boid, [ahead, ahead2, boid.pos])
-            if most_threatening is not None:
-                steering = utils.normalize(ahead - most_threatening.pos)
-                steering *= params.MAX_AVOID_FORCE
-                boid.steer(steering)
-
-    def separate_single(self, boid):
-        number_of_neighbors = 0
-        force = np.zeros(2)
-        for other_boid in self.boids:
-            if boid == other_boid:
-                continue
-            elif pygame.sprite.collide_rect(boid, other_boid):
-                force -= other_boid.pos - boid.pos
-                number_of_neighbors += 1
-        if number_of_neighbors:
-            force /= number_of_neighbors
-        boid.steer(utils.normalize(force) * params.MAX_SEPARATION_FORCE)
+        """Avoid collisions between boids and obstacles.
+
+        Boids look ahead along their velocity. The first obstacle in the
+        way pushes the look-ahead point away from it, or the boid itself
+        when the look-ahead point went through it.
+        """
+        if not len(self.obstacle_map):
+            return
+        s, c = self.state, self.config
+        ahead = s.pos + s.vel * c.see_ahead
+        boids, a, b = self.obstacle_map.threats(s.pos, ahead)
+        if self.recording:
+            self.hotspots.record(
+                'obstacle_tests', s.pos[self.obstacle_map.tested])
+            self.hotspots.record(
+                'obstacle_culls', s.pos[self.obstacle_map.culled])
+        pos, ahead = s.pos[boids], ahead[boids]
+        away = ahead - utils.closest_on_segments(ahead, a, b)
+        through = utils.segments_cross(pos, ahead, a, b)
+        away[through] = (pos - utils.closest_on_segments(pos, a, b))[through]
+        self.steer(boids, utils.normalize_rows(away) * c.max_avoid_force)
 
     def separate(self):
-        for boid in self.boids:
-            self.separate_single(boid)
+        """Make boids move away from the boids that are too close."""
+        s, c = self.state, self.config
+        i, j, offset = self.neighbours.within(c.separation_dist)
+        if self.recording:
+            self.hotspots.record('separation_hits', s.pos[i])
+        n = len(s)
+        # bincount returns ints when no two boids are close
+        force = -np.stack([np.bincount(i, offset[:, 0], minlength=n),
+                           np.bincount(i, offset[:, 1], minlength=n)],
+                          axis=1).astype(offset.dtype)
+        self.steer(np.arange(n),
+                   utils.normalize_rows(force) * c.max_separation_force)
 
-    def follow_leader(self, leader):
-        """Make all normal boids follow a leader.
+    def follow_leader(self):
+        """Make boids follow their leader.
 
         Boids stay at a certain distance from the leader.
         They move away when in the leader's path.
         They avoid cluttering when behind the leader.
         """
-        nvel = utils.normalize(leader.vel)
-        behind = leader.pos - nvel * params.LEADER_BEHIND_DIST
-        ahead = leader.pos + nvel * params.LEADER_AHEAD_DIST
-        for boid in self.normal_boids:
-            self.seek_single(behind, boid)
-            self.escape_single(ahead, leader.vel, boid)
+        if self.leading is None:
+            return
+        leading = self.leading
+        self.seek(leading.boids, leading.behind)
+        self.flee(leading.boids, leading.ahead_predicted)
 
     def align(self):
-        """Make all boids to align their velocities."""
-        r2 = params.ALIGN_RADIUS * params.ALIGN_RADIUS
-        # find the neighbors
-        boids = list(self.normal_boids)
-        neighbors = [[] for boid in boids]
-        for i, boid in enumerate(boids):
-            for j, other_boid in enumerate(boids):
-                if j in neighbors[i]:
-                    continue
-                elif boid == other_boid:
-                    continue
-                elif utils.dist2(boid.pos, other_boid.pos) < r2:
-                    neighbors[i].append(j)
-                    neighbors[j].append(i)
-        for i, boid in enumerate(boids):
-            number_of_neighbors = len(neighbors[i])
-            if number_of_neighbors:
-                desired = np.zeros(2)
-                for j in neighbors[i]:
-                    desired += boids[j].vel
-                boid.steer(desired / number_of_neighbors - boid.vel)
+        """Make all normal boids align their velocities.
+
+        With topological neighbours, boids align with their k nearest
+        neighbours whatever their distance.
+        """
+        s, c = self.state, self.config
+        i, j, _ = self.neighbours.within(
+            np.inf if c.k_neighbours else c.align_radius)
+        normal = ~s.leader
+        both_normal = normal[i] & normal[j]
+        i, j = i[both_normal], j[both_normal]
+        n = len(s)
+        number_of_neighbors = np.bincount(i, minlength=n)
+        boids = np.flatnonzero(number_of_neighbors)
+        desired = np.stack([np.bincount(i, s.vel[j, 0], minlength=n),
+                            np.bincount(i, s.vel[j, 1], minlength=n)], axis=1)
+        desired = desired[boids] / number_of_neighbors[boids, None]
+        self.steer(boids, desired - s.vel[boids])
 
     def flock(self):
         """Simulate flocking behaviour : alignment + separation + cohesion."""
-        self.align()
-        for boid in self.boids:
-            self.separate_single(boid)
+        self.neighbours.update(self.state.pos)
+        self.pipeline.run(self.state, ['align', 'separate'])
 
     def update(self, motion_event, click_event):
+        c = self.config
+        step = self.steps
+        self.steps += 1
+        self.obstacle_map.move(self.world)
+        if self.recording:
+            self.hotspots.next_frame()
+        # quantities relative to leaders are shared within the step only
+        self.leading = None
+        if self.leader_boids and self.normal_boids:
+            self.leading = Leading(self)
+        # neighbour pairs may only be refreshed every few steps, in
+        # between neighbour-based behaviours measure those of the last
+        # refresh again
+        wanted = any(self.behaviours[name] for name in NEIGHBOUR_BEHAVIOURS)
+        self.neighbours_fresh = wanted and (
+            self.neighbours_step is None or
+            step - self.neighbours_step >= c.neighbour_every)
+        if self.neighbours_fresh:
+            self.neighbours.update(self.state.pos)
+            self.neighbours_step = step
+        elif wanted:
+            self.neighbours.measure(self.state.pos)
+            if self.recording:
+                self.hotspots.record('neighbour_tests', self.state.pos[
+                    self.neighbours.candidates[0]])
         # apply steering behaviours
-        if self.leader_boid:
-            target = self.leader_boid.sprite
-            self.behaviours['pursue'] and self.pursue(target)
-            self.behaviours['escape'] and self.escape(target)
-            self.behaviours['follow leader'] and self.follow_leader(target)
-        self.behaviours['wander'] and self.wander()
-        if self.behaviours['avoid collision'] and self.obstacles:
-            self.avoid_collision()
-        self.behaviours['align'] and self.align()
-        self.behaviours['separate'] and self.separate()
-        self.remain_in_screen()
+        self.pipeline.run(
+            self.state, c.behaviour_order, c.behaviour_weights,
+            lambda name: self.behaviours.get(name, True))
         # update all boids
-        for boid in self.boids:
-            boid.update()
+        s = self.state
+        s.vel = utils.truncate_rows(s.vel + s.steering,
+                                    self.config.boid_max_speed)
+        s.pos += s.vel
+        self.world.contain(s.pos)
+
+    def visible(self, lo, hi):
+        """Return the rows of the boids inside a box of the world.
+
+        Candidates come from the grid of the neighbour list when it was
+        refreshed during the last update.
+        """
+        pos = self.state.pos
+        nb = self.neighbours
+        if self.neighbours_fresh and len(nb.ref_pos) == len(pos):
+            # boids moved by at most one step since the neighbour update
+            margin = nb.drift + self.config.boid_max_speed
+            rows = np.sort(nb.grid.query_box(lo - margin, hi + margin))
+        else:
+            rows = np.arange(len(pos))
+        inside = np.all((pos[rows] >= lo) & (pos[rows] <= hi), axis=1)
+        return rows[inside]
+
+    def visible_obstacles(self, lo, hi):
+        """Return the obstacles overlapping a box of the world."""
+        return self.obstacle_map.overlapping(lo, hi)
+
+    def display(self, screen, camera=None, frame=None):
+        """Draw the entities seen by a camera.
 
-    def display(self, screen):
-        for obstacle in self.obstacles:
+        Entities outside of the view are neither updated nor drawn.
+        Boids are drawn as sprites, or by one of the array renderers
+        depending on the renderer attribute. In debug mode, the hot spots
+        of the last frame are drawn over them.
+
+        Parameters
+        ----------
+        screen : pygame.Surface
+        camera : Camera, optional
+        frame : Frame, optional
+            Copy of the flock to draw instead of its current state, when
+            the flock is updated by another thread.
+        """
+        if camera is None:
+            camera = Camera()
+        lo, hi = camera.view(params.CULL_MARGIN)
+        if frame is None:
+            obstacles = [(obstacle, obstacle.pos)
+                         for obstacle in self.visible_obstacles(lo, hi)]
+            rows = self.visible(lo, hi)
+            pos, vel, steering = \
+                self.state.pos, self.state.vel, self.state.steering
+            debug, counts = self.config.debug, None
+        else:
+            obstacles = frame.visible_obstacles(lo, hi)
+            rows = frame.visible(lo, hi)
+            pos, vel, steering = frame.pos, frame.vel, frame.steering
+            debug, counts = frame.hotspots is not None, frame.hotspots
+        for obstacle, at in obstacles:
+            obstacle.sync(camera.to_screen(at), camera.zoom)
             obstacle.display(screen)
-        for boid in self.boids:
-            boid.display(screen, debug=params.DEBUG)
-        for boid in self.boids:
-            boid.reset_frame()
+        centers = camera.to_screen(pos[rows])
+        if self.renderer == 'points':
+            render.draw_points(screen, centers, vel[rows])
+        elif self.renderer == 'heatmap':
+            render.draw_heatmap(screen, centers)
+        else:
+            for row, center in zip(rows, centers):
+                boid = self.members[row]
+                boid.sync(center, camera.zoom, vel[row])
+                boid.display(screen, debug=debug, vel=vel[row],
+                             steering=steering[row])
+        if debug:
+            self.hotspots.draw(screen, camera, counts=counts)
+        if frame is None:
+            self.reset_frame()
+
+    def reset_frame(self):
+        """Clear the steering forces accumulated during the frame."""
+        self.state.steering[:] = 0.
@@ -1,11 +1,64 @@
 """Definition of GUI sprites and utilities."""
 
+from collections import OrderedDict
 import numpy as np
 import pygame
 from . import params
 from . import utils
 
 
+class TextCache:
+    """Rendered texts, the least recently used being dropped first.
+
+    TextCache(capacity=params.TEXT_CACHE_SIZE) -> TextCache
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Number of texts kept. Default is TEXT_CACHE_SIZE.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of texts found in the cache, and rendered.
+    """
+
+    def __init__(self, capacity=params.TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.texts = OrderedDict()
+        self.hits = self.misses = 0
+
+    def render(self, text, font, color=params.FONT_COLOR):
+        """Return the surface, rect and advance of a rendered text.
+
+        The surface is shared: it must not be drawn on.
+
+        Parameters
+        ----------
+        text : str
+        font : tuple (font object, size)
+        color : pygame.Color, optional
+            Default is FONT_COLOR.
+        """
+        key = (text, font[0], font[1], tuple(color))
+        rendered = self.texts.get(key)
+        if rendered is not None:
+            self.texts.move_to_end(key)
+            self.hits += 1
+            return rendered
+        self.misses += 1
+        image, rect = font[0].render(text, fgcolor=color, size=font[1])
+        metrics = font[0].get_metrics(text, size=font[1])
+        advance = sum(m[4] for m in metrics if m is not None)
+        rendered = self.texts[key] = (image, rect, advance)
+        if len(self.texts) > self.capacity:
+            self.texts.popitem(last=False)
+        return rendered
+
+
+TEXTS = TextCache()
+
+
 def mktext(text, font):
     """Render a text.
 
@@ -14,13 +67,39 @@ def mktext(text, font):
     text : str
     font : tuple (font object, size)
     """
-    return font[0].render(text, fgcolor=params.FONT_COLOR, size=font[1])
+    image, rect, _ = TEXTS.render(text, font)
+    return image, rect.copy()
+
+
+def mkcount(text, count, font):
+    """Render a text followed by a number.
+
+    The number is put together from the glyphs of its characters, so
+    that changing numbers only render each digit once.
+
+    Parameters
+    ----------
+    text : str
+    count : int or float
+    font : tuple (font object, size)
+    """
+    pieces = [TEXTS.render(text, font)] if text else []
+    pieces += [TEXTS.render(char, font) for char in str(count)]
+    ascender = font[0].get_sized_ascender(font[1])
+    height = ascender - font[0].get_sized_descender(font[1])
+    width = int(np.ceil(sum(advance for _, _, advance in pieces)))
+    image = pygame.Surface((max(width, 1), height), pygame.SRCALPHA)
+    x = 0
+    for glyph, rect, advance in pieces:
+        image.blit(glyph, (round(x) + rect.x, ascender - rect.y))
+        x += advance
+    return image, image.get_rect()
 
 
 class Message(pygame.sprite.Sprite):
     """A simple text message sprite.
 
-    Message(pos, text="", font=params.BODY_FONT) -> Message
+    Message(pos, text="", font=params.BODY_FONT, count=None) -> Message
 
     Parameters
     ----------
@@ -28,27 +107,41 @@ class Message(pygame.sprite.Sprite):
     text : str
     font : (font object, size)
         Default is BODY_FONT.
+    count : int or float, optional
+        Number shown after the text, see mkcount.
     """
 
     image = None
     rect = None
 
-    def __init__(self, pos, text="", font=params.BODY_FONT):
+    def __init__(self, pos, text="", font=params.BODY_FONT, count=None):
         super().__init__()
         self._text = text
+        self.count = count
         self.font = font
-        self.image, self.rect = mktext(text, font)
+        self.image, self.rect = self._render()
         self.rect.center = utils.grid_to_px(pos)
 
+    def _render(self):
+        if self.count is None:
+            return mktext(self._text, self.font)
+        return mkcount(self._text, self.count, self.font)
+
     def get_text(self):
-        return self._text
+        if self.count is None:
+            return self._text
+        return self._text + str(self.count)
 
     def set_text(self, text):
-        self._text = text
-        self.image, rect = mktext(text, self.font)
+        self.set_count(text, None)
+    text = property(get_text, set_text)
+
+    def set_count(self, text, count):
+        """Set the text, followed by a number unless count is None."""
+        self._text, self.count = text, count
+        self.image, rect = self._render()
         rect.topleft = self.rect.topleft
         self.rect = rect
-    text = property(get_text, set_text)
 
     def display(self, screen):
         screen.blit(self.image, self.rect)
@@ -57,7 +150,8 @@ class Message(pygame.sprite.Sprite):
 class TempMessage(Message):
     """A message that disappears after some time.
 
-    TempMessage(pos, text="", font=params.H4_FONT, duration=100) -> TempMessage
+    TempMessage(pos, text="", font=params.H4_FONT, duration=100, count=None)
+        -> TempMessage
 
     Parameters
     ----------
@@ -67,14 +161,16 @@ class TempMessage(Message):
         Default is H4_FONT.
     duration : int, optional
         Number of frames. Default is 100.
+    count : int or float, optional
 
     See also
     --------
     Message
     """
 
-    def __init__(self, pos, text="", font=params.H4_FONT, duration=100):
-        super().__init__(pos, text, font)
+    def __init__(self, pos, text="", font=params.H4_FONT, duration=100,
+                 count=None):
+        super().__init__(pos, text, font, count=count)
         self.duration = duration
         self.counter = 0
 
@@ -109,7 +205,7 @@ class FPSMessage(Message):
         self.time += time
         if self.counter == self.refresh_every:
             self.time /= self.refresh_every
-            self.text = "FPS: {}".format(round(1 / self.time, 1))
+            self.set_count("FPS: ", round(1 / self.time, 1))
             self.counter = 0
             self.time = 0
 
@@ -135,14 +231,21 @@ class Button(Message):
         self.hover = False  # True when mouse hovers the button
         self.action = action
 
+    def set_hover(self, hover):
+        """Set the hover state, returning whether it changed."""
+        changed = hover != self.hover
+        self.hover = hover
+        return changed
+
+    def click(self):
+        if self.action:
+            self.action()
+
     def update(self, motion_event, click_event):
         if motion_event:
-            if self.hover and not self.rect.collidepoint(motion_event.pos):
-                self.hover = False
-            elif not self.hover and self.rect.collidepoint(motion_event.pos):
-                self.hover = True
-        if self.action and click_event and self.hover:
-            self.action()
+            self.set_hover(bool(self.rect.collidepoint(motion_event.pos)))
+        if click_event and self.hover:
+            self.click()
 
     def display(self, screen):
         super().display(screen)
@@ -184,7 +287,71 @@ class ToggleButton(Button):
         self.label = self.labels[0].replace("-", " ").title()
         self.text = self.phrase + self.label
 
-    def update(self, motion_event, click_event):
-        super().update(motion_event, click_event)
-        if click_event and self.hover and len(self.labels) > 0:
+    def select(self, label):
+        """Show a label, without triggering the action."""
+        if label not in self.labels:
+            return
+        while self.labels[0] != label:
             self.toggle()
+
+    def click(self):
+        super().click()
+        if len(self.labels) > 0:
+            self.toggle()
+
+
+class Panel:
+    """A set of buttons driven by mouse events.
+
+    Buttons only hear about the events that concern them: on motion, the
+    button under the mouse is found with a single collidelist() call,
+    and a click only reaches that button. Without events, no button
+    code runs at all.
+
+    Panel(buttons=()) -> Panel
+
+    Parameters
+    ----------
+    buttons : iterable of Button, optional
+    """
+
+    def __init__(self, buttons=()):
+        self.buttons = []
+        self.rects = []
+        self.hovered = None
+        for button in buttons:
+            self.add(button)
+
+    def add(self, button):
+        self.buttons.append(button)
+        self.rects.append(button.rect)
+
+    def handle(self, event):
+        """Pass a mouse event to the buttons it concerns.
+
+        Returns whether a button changed, and needs to be drawn again.
+        """
+        if event.type == pygame.MOUSEMOTION:
+            k = pygame.Rect(event.pos, (1, 1)).collidelist(self.rects)
+            hovered = self.buttons[k] if k >= 0 else None
+            if hovered is self.hovered:
+                return False
+            if self.hovered is not None:
+                self.hovered.set_hover(False)
+            if hovered is not None:
+                hovered.set_hover(True)
+            self.hovered = hovered
+            return True
+        if event.type == pygame.MOUSEBUTTONDOWN and self.hovered:
+            self.hovered.click()
+            self.refresh(self.hovered)
+            return True
+        return False
+
+    def refresh(self, button):
+        """Take a change of the text, hence the size, of a button."""
+        self.rects[self.buttons.index(button)] = button.rect
+
+    def display(self, screen):
+        for button in self.buttons:
+            button.display(screen)
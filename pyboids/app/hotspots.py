@@ -0,0 +1,97 @@
+"""Per-cell counts of the pairwise tests done by a flock."""
+import numpy as np
+import pygame
+from . import params, render
+
+COUNTERS = ['neighbour_tests', 'separation_hits', 'obstacle_tests',
+            'obstacle_culls']
+
+
+class HotSpots:
+    """Counters of pairwise tests, by cell of the world.
+
+    Each test is counted in the cell of the boid that makes it. Dense
+    regions, where the cost of pairwise tests grows quadratically, show
+    up as hot spots.
+
+    HotSpots(size, cell=params.HOTSPOT_CELL) -> HotSpots
+
+    Parameters
+    ----------
+    size : np.array, shape (2,)
+        Size of the world.
+    cell : float, optional
+        Side of a cell, in pixels. Default is HOTSPOT_CELL.
+
+    Attributes
+    ----------
+    frame : dict of np.array
+        Counts of the last frame, by counter name.
+    total : dict of np.array
+        Counts since creation, by counter name.
+    frames : int
+        Number of frames recorded.
+    """
+
+    def __init__(self, size, cell=params.HOTSPOT_CELL):
+        self.cell = cell
+        self.shape = tuple(
+            np.maximum(np.ceil(np.asarray(size) / cell), 1).astype(int))
+        self.frame = {name: np.zeros(self.shape, dtype=np.int64)
+                      for name in COUNTERS}
+        self.total = {name: np.zeros(self.shape, dtype=np.int64)
+                      for name in COUNTERS}
+        self.frames = 0
+
+    def next_frame(self):
+        """Start recording a new frame."""
+        for counts in self.frame.values():
+            counts[:] = 0
+        self.frames += 1
+
+    def record(self, name, points):
+        """Count one test at each point.
+
+        Points outside of the world are counted in the closest cell.
+        """
+        cells = np.floor(points / self.cell).astype(int)
+        x = np.clip(cells[:, 0], 0, self.shape[0] - 1)
+        y = np.clip(cells[:, 1], 0, self.shape[1] - 1)
+        counts = np.bincount(x * self.shape[1] + y,
+                             minlength=self.shape[0] * self.shape[1])
+        counts = counts.reshape(self.shape)
+        self.frame[name] += counts
+        self.total[name] += counts
+
+    def arrays(self):
+        """Return copies of the counts of the last frame and of the totals.
+
+        Totals are keyed by counter name prefixed with 'total_'.
+        """
+        arrays = {name: counts.copy() for name, counts in self.frame.items()}
+        arrays.update(('total_' + name, counts.copy())
+                      for name, counts in self.total.items())
+        return arrays
+
+    def save(self, path):
+        """Save the counts to a .npz file, with the cell size and frames."""
+        np.savez(path, cell=self.cell, frames=self.frames, **self.arrays())
+
+    def draw(self, screen, camera, name=params.HOTSPOT_OVERLAY, counts=None):
+        """Draw the counts of the last frame over the view of a camera.
+
+        Counts copied from an earlier frame may be given instead.
+        """
+        if counts is None:
+            counts = self.frame[name]
+        lo, hi = camera.view()
+        c0 = np.clip(np.floor(lo / self.cell).astype(int), 0, counts.shape)
+        c1 = np.clip(np.ceil(hi / self.cell).astype(int), 0, counts.shape)
+        heatmap = render.heat_surface(counts[c0[0]:c1[0], c0[1]:c1[1]])
+        if heatmap is None:
+            return
+        heatmap.set_alpha(params.HOTSPOT_ALPHA)
+        size = np.ceil((c1 - c0) * self.cell * camera.zoom).astype(int)
+        corner = camera.to_screen(c0 * self.cell)
+        screen.blit(pygame.transform.scale(heatmap, tuple(size)),
+                    tuple(corner))
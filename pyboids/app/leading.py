@@ -0,0 +1,93 @@
+"""Quantities shared by the behaviours relative to leaders."""
+from functools import cached_property
+import numpy as np
+from . import utils
+
+
+class Leading:
+    """The normal boids, the leader each follows, and where they are.
+
+    Leader behaviours need the same quantities: where each leader is,
+    how far it is from its followers, where it will be when they reach
+    it. Each quantity is computed on first use, then shared by the other
+    behaviours. A flock makes a new Leading at each step, so quantities
+    never outlive the positions they were computed from, and a step
+    without leader behaviours never assigns followers to leaders.
+
+    Leading(flock) -> Leading
+
+    Parameters
+    ----------
+    flock : Flock
+    """
+
+    def __init__(self, flock):
+        self.flock = flock
+        self.world = flock.world
+        self.state = flock.state
+        self.config = flock.config
+
+    @cached_property
+    def followers(self):
+        """Rows of the normal boids and of the leader each follows."""
+        return self.flock.followers()
+
+    @property
+    def boids(self):
+        return self.followers[0]
+
+    @property
+    def leaders(self):
+        return self.followers[1]
+
+    @cached_property
+    def pos(self):
+        """Position of the leader of each boid."""
+        return self.state.pos[self.leaders]
+
+    @cached_property
+    def vel(self):
+        """Velocity of the leader of each boid."""
+        return self.state.vel[self.leaders]
+
+    @cached_property
+    def heading(self):
+        """Direction of the velocity of the leader of each boid."""
+        return utils.normalize_rows(self.vel)
+
+    @cached_property
+    def distance(self):
+        """Distance from each boid to its leader."""
+        return utils.norms(
+            self.world.offset(self.state.pos[self.boids], self.pos))
+
+    def predict(self, target, distance):
+        """Return where a point moving with the leader will be reached.
+
+        The point is reached in as many whole steps as a boid at full
+        speed needs to cover the distance to it.
+        """
+        t = np.floor(distance / self.config.boid_max_speed)
+        return target + t[:, None] * self.vel
+
+    @cached_property
+    def predicted(self):
+        """Position of the leader when each boid reaches it."""
+        return self.predict(self.pos, self.distance)
+
+    @cached_property
+    def behind(self):
+        """Point behind each leader its followers seek."""
+        return self.pos - self.heading * self.config.leader_behind_dist
+
+    @cached_property
+    def ahead(self):
+        """Point ahead of each leader, in its path."""
+        return self.pos + self.heading * self.config.leader_ahead_dist
+
+    @cached_property
+    def ahead_predicted(self):
+        """Point ahead of each leader when each boid reaches it."""
+        distance = utils.norms(
+            self.world.offset(self.state.pos[self.boids], self.ahead))
+        return self.predict(self.ahead, distance)
@@ -1,50 +1,84 @@
 """Menu screen."""
 import pygame
-from . import params
+from . import params, settings
 from . import assets
 from . import gui
+from . import scenario
+from .pacing import FramePacer
+from .recording import latest
+from .replay import Replay
 from .simulation import Simulation
 
 key_to_function = {
     # insert lambda hooks here
 }
 
+# events telling that the window was uncovered and must be drawn again
+EXPOSE_EVENTS = {pygame.VIDEOEXPOSE,
+                 getattr(pygame, 'WINDOWEXPOSED', pygame.VIDEOEXPOSE)}
+
 
 class Menu:
-    """The menu loop."""
+    """The menu loop.
+
+    Menu(scenario=None) -> Menu
 
-    def __init__(self):
+    Parameters
+    ----------
+    scenario : str, optional
+        Scenario file each simulation starts from.
+    """
+
+    def __init__(self, scenario=None):
         self.running = True
+        self.scenario = scenario
         self.screen = pygame.display.set_mode(params.SCREEN_SIZE)
         pygame.display.set_icon(assets.image('boids-logo.png'))
         pygame.display.set_caption(params.CAPTION)
-        self.clock = pygame.time.Clock()
-        self.to_update = pygame.sprite.Group()
+        self.pacer = FramePacer()
+        self.panel = gui.Panel()
         self.to_display = pygame.sprite.Group()
-
-    def update(self, motion_event, click_event):
-        self.to_update.update(motion_event, click_event)
+        self.no_recording = gui.Message(
+            pos=(6, 7.2),
+            text="No recording yet: press R during a simulation.")
 
     def display(self):
+        self.screen.fill(params.MENU_BACKGROUND)
         for sprite in self.to_display:
             sprite.display(self.screen)
+        self.panel.display(self.screen)
+        pygame.display.flip()
 
     def start_simulation(self):
-        s = Simulation(self.screen)
+        flock = None
+        if self.scenario is not None:
+            flock = scenario.load(self.scenario)
+        s = Simulation(self.screen, flock=flock)
         if s.run() == "PYGAME_QUIT":
             self.quit()
+        self.dirty = True
+
+    def start_replay(self):
+        path = latest(settings.RECORDINGS_DIR)
+        if path is None:
+            self.to_display.add(self.no_recording)
+        elif Replay(self.screen, path).run() == "PYGAME_QUIT":
+            self.quit()
+        self.dirty = True
 
     def main(self):
-        self.to_update = pygame.sprite.Group(
+        self.panel = gui.Panel([
             gui.Button(
                 pos=(6, 5.5), text="Start", font=params.H3_FONT,
                 action=lambda: self.start_simulation()),
+            gui.Button(
+                pos=(6, 6.5), text="Replay", font=params.H3_FONT,
+                action=lambda: self.start_replay()),
             gui.Button(
                 pos=(6, 8), text="Quit", font=params.H3_FONT,
                 action=lambda: self.quit())
-        )
+        ])
         self.to_display = pygame.sprite.Group(
-            self.to_update,
             gui.Message(pos=(6, 2), text="PyBoids", font=params.H1_FONT),
             gui.Message(
                 pos=(6, 3), text="An implementation of steering behaviors.",
@@ -54,6 +88,8 @@ class Menu:
         texts.append(
             "There are three entities : Boid - Leader boid - Obstacle.")
         texts.append("Right click to add an entity to the simulation space.")
+        texts.append("Arrow keys move the view, the mouse wheel zooms.")
+        texts.append("Press R to record a run, and replay it from here.")
         texts.append(
             "You can play with many different behaviors by toggling" +
             "them on or off.")
@@ -62,23 +98,25 @@ class Menu:
             gui.Message(pos=(6, 3.3 + 0.3 * k), text=t)
             for k, t in enumerate(texts))
 
+        # the menu is still: it is only drawn again when a button changed
+        # or the window was uncovered
+        self.dirty = True
         while self.running:
-            motion_event, click_event = None, None
-            self.screen.fill(params.MENU_BACKGROUND)
-            self.clock.tick(params.FPS)
+            self.pacer.wait()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key in key_to_function:
                         key_to_function[event.key](self, event)
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    click_event = event
-                elif event.type == pygame.MOUSEMOTION:
-                    motion_event = event
-            self.update(motion_event, click_event)
-            self.display()
-            pygame.display.flip()
+                elif event.type in (pygame.MOUSEBUTTONDOWN,
+                                    pygame.MOUSEMOTION):
+                    self.dirty |= self.panel.handle(event)
+                elif event.type in EXPOSE_EVENTS:
+                    self.dirty = True
+            if self.dirty and self.running:
+                self.display()
+                self.dirty = False
         pygame.quit()
 
     def quit(self):
@@ -0,0 +1,188 @@
+"""Flocking observables computed from the flock state."""
+import copy
+import csv
+
+import numpy as np
+from . import params, utils, spatial
+
+
+def polarization(vel):
+    """Return the norm of the mean heading, between 0 and 1.
+
+    1 means all boids fly in the same direction.
+
+    Parameters
+    ----------
+    vel : np.array, shape (n, 2)
+    """
+    if not len(vel):
+        return 0.
+    return utils.norm(utils.normalize_rows(vel).mean(axis=0))
+
+
+def angular_momentum(pos, vel, period=None):
+    """Return the normalized angular momentum about the centre of mass.
+
+    Between 0 and 1, 1 meaning all boids mill around the centre in the
+    same direction.
+
+    Parameters
+    ----------
+    pos, vel : np.array, shape (n, 2)
+    period : np.array, shape (2,), optional
+        Size of the world if it wraps. Positions are then unwrapped
+        around the first boid, which suits flocks smaller than the world.
+    """
+    if not len(pos):
+        return 0.
+    r = utils.wrap_offsets(pos - pos[0], period)
+    r -= r.mean(axis=0)
+    r = utils.normalize_rows(r)
+    v = utils.normalize_rows(vel)
+    return abs((r[:, 0] * v[:, 1] - r[:, 1] * v[:, 0]).mean())
+
+
+def cluster_labels(n, i, j):
+    """Return the connected component of each node of a graph.
+
+    Each component is labelled by its smallest node.
+
+    Parameters
+    ----------
+    n : int
+        Number of nodes.
+    i, j : np.array of int
+        Edges, listed in both directions.
+    """
+    labels = np.arange(n)
+    while True:
+        previous = labels
+        labels = labels.copy()
+        np.minimum.at(labels, i, labels[j])
+        labels = labels[labels]
+        if (labels == previous).all():
+            return labels
+
+
+def nearest_distances(pos, period=None):
+    """Return the distance from each boid to its nearest neighbour.
+
+    Parameters
+    ----------
+    pos : np.array, shape (n, 2)
+    period : np.array, shape (2,), optional
+        Size of the world if it wraps.
+    """
+    if len(pos) < 2:
+        return np.zeros(0)
+    grid = spatial.SpatialGrid(pos, period=period)
+    rows = np.arange(len(pos))
+    nearest = grid.nearest(pos, exclude=rows)
+    return utils.norms(utils.wrap_offsets(pos[nearest] - pos, period))
+
+
+def obstacle_hits(pos, obstacle_map):
+    """Return the number of boids lying inside an obstacle.
+
+    Boids inside a circle or within the thickness of a wall are counted.
+
+    Parameters
+    ----------
+    pos : np.array, shape (n, 2)
+    obstacle_map : ObstacleMap
+    """
+    if not len(obstacle_map) or not len(pos):
+        return 0
+    return len(obstacle_map.inside(pos))
+
+
+class Series:
+    """Time series of flocking observables of a flock.
+
+    Observables are sampled every few steps of the flock, from its
+    arrays and from the pairs of its neighbour list. Pairs the flock
+    found during the step are reused as they are. Otherwise a copy of
+    the list is refreshed, so that the list of the flock, and when it
+    is rebuilt, are left as they were. Each sample is kept in rows and,
+    when a stream is given, written to it as a CSV line straight away.
+
+    Series(flock, every=params.METRICS_EVERY, radius=None, stream=None)
+        -> Series
+
+    Parameters
+    ----------
+    flock : Flock
+    every : int, optional
+        Number of steps between two samples. Default is METRICS_EVERY.
+    radius : float, optional
+        Distance under which two boids are neighbours. It must not exceed
+        the radius of the neighbour list, which is the default.
+    stream : file, optional
+        Text file the samples are written to.
+
+    Attributes
+    ----------
+    rows : list of dict
+        One dict per sample, with a value per column.
+    """
+
+    def __init__(self, flock, every=params.METRICS_EVERY, radius=None,
+                 stream=None):
+        self.flock = flock
+        self.every = every
+        self.radius = radius
+        self.rows = []
+        self.stream = stream
+        self.columns = [
+            'step', 'polarization', 'angular_momentum', 'clusters',
+            'mean_neighbour_distance',
+        ] + ['density_{}'.format(k) for k in range(params.DENSITY_BINS)]
+        self.writer = None
+        if stream is not None:
+            self.writer = csv.DictWriter(stream, self.columns)
+            self.writer.writeheader()
+
+    def update(self):
+        """Sample the observables if a sample is due at this step."""
+        if self.flock.steps % self.every == 0:
+            self.sample()
+
+    def sample(self):
+        """Compute the observables of the current step.
+
+        The local density histogram counts the boids by number of
+        neighbours, the last bin holding DENSITY_BINS - 1 or more.
+        """
+        s = self.flock.state
+        period = self.flock.world.period
+        nb = self.flock.neighbours
+        if not self.flock.neighbours_fresh:
+            # update() rebinds the attributes of the list, never mutates
+            # them
+            nb = copy.copy(nb)
+            nb.update(s.pos)
+        radius = self.radius if self.radius is not None else nb.radius
+        i, j, _ = nb.within(radius)
+        # pairs found during the step were found before boids moved
+        offset = utils.wrap_offsets(s.pos[j] - s.pos[i], period)
+        n = len(s)
+        counts = np.bincount(i, minlength=n)
+        density = np.bincount(np.minimum(counts, params.DENSITY_BINS - 1),
+                              minlength=params.DENSITY_BINS)
+        row = {
+            'step': self.flock.steps,
+            'polarization': polarization(s.vel),
+            'angular_momentum': angular_momentum(s.pos, s.vel, period),
+            # nearest neighbour pairs may be listed one way only
+            'clusters': len(np.unique(cluster_labels(
+                n, np.concatenate([i, j]), np.concatenate([j, i])))),
+            'mean_neighbour_distance':
+                utils.norms(offset).mean() if len(i) else 0.,
+        }
+        row.update(('density_{}'.format(k), int(count))
+                   for k, count in enumerate(density))
+        self.rows.append(row)
+        if self.writer is not None:
+            self.writer.writerow(row)
+            self.stream.flush()
+        return row
@@ -1,21 +1,316 @@
-"""Obstacle class."""
+"""Obstacle classes."""
+import abc
 import pygame
 import numpy as np
-from . import params
+from . import params, utils, spatial
 from . import assets
 
 
-class Obstacle(pygame.sprite.Sprite):
-    """A circular obstacle for boids to avoid."""
+class Shape(pygame.sprite.Sprite, abc.ABC):
+    """Base class of obstacles.
 
-    def __init__(self, pos=None, radius=params.OBSTACLE_DEFAULT_RADIUS):
+    For avoidance, an obstacle is a set of capsules: segments with a
+    radius around them. A circle is a capsule of null length.
+
+    Parameters
+    ----------
+    pos : np.array, shape (2,) or (k, 2)
+        Centre of a circle, or vertices of the other shapes.
+    vel : np.array, shape (2,), optional
+        Velocity of a moving obstacle. Default is a null velocity.
+    """
+
+    def __init__(self, pos, vel=None):
         super().__init__()
-        self.image, self.rect = assets.image_with_rect('obstacle-circle.png')
-        self.image = pygame.transform.smoothscale(
-            self.image, (2 * radius, 2 * radius))
-        self.pos = pos if pos is not None else np.zeros(2)
+        self.pos = np.array(pos, dtype=float)
+        self.vel = np.zeros(2) if vel is None else np.array(vel, dtype=float)
+
+    @property
+    def moving(self):
+        return bool(np.any(self.vel))
+
+    @abc.abstractmethod
+    def capsules(self):
+        """Return the ends a, b and the radius of each capsule."""
+
+    def box(self):
+        """Return the lower and upper corners of the bounding box."""
+        a, b, radius = self.capsules()
+        reach = radius.max()
+        return (np.minimum(a, b).min(axis=0) - reach,
+                np.maximum(a, b).max(axis=0) + reach)
+
+    def move(self, world):
+        """Move by one step, bouncing on the sides of a bounded world."""
+        self.pos += self.vel
+        if world.wrap:
+            first = self.pos.reshape(-1, 2)[0]
+            self.pos += np.mod(first, world.size) - first
+        else:
+            lo, hi = self.box()
+            out = ((lo < 0) & (self.vel < 0)) | \
+                ((hi > world.size) & (self.vel > 0))
+            self.vel[out] *= -1
+
+
+class Obstacle(Shape):
+    """A circular obstacle for boids to avoid.
+
+    Images are scaled once per size and shared by all obstacles.
+    """
+
+    images = {}  # scaled images, by size in pixels
+
+    def __init__(self, pos=None, radius=params.OBSTACLE_DEFAULT_RADIUS,
+                 vel=None):
+        super().__init__(pos if pos is not None else np.zeros(2), vel=vel)
+        self.image = self.scaled(int(2 * radius))
         self.radius = radius
+        self.zoom = 1.
         self.rect = self.image.get_rect(center=self.pos)
 
+    @classmethod
+    def scaled(cls, size):
+        """Return the image of an obstacle scaled to a size."""
+        if size not in cls.images:
+            cls.images[size] = pygame.transform.smoothscale(
+                assets.image('obstacle-circle.png'), (size, size))
+        return cls.images[size]
+
+    def capsules(self):
+        return self.pos[None], self.pos[None], np.array([self.radius])
+
+    def sync(self, center, zoom=1.):
+        """Place the image at a screen position, rescaling it on zoom."""
+        if zoom != self.zoom:
+            self.image = self.scaled(
+                max(1, int(round(2 * self.radius * zoom))))
+            self.zoom = zoom
+        self.rect = self.image.get_rect(center=tuple(center))
+
     def display(self, screen):
         screen.blit(self.image, self.rect)
+
+
+class Wall(Shape):
+    """A wall made of line segments joining vertices.
+
+    Wall(vertices, thickness=params.WALL_THICKNESS, vel=None) -> Wall
+
+    Parameters
+    ----------
+    vertices : np.array, shape (k, 2)
+    thickness : float, optional
+        Default is WALL_THICKNESS.
+    vel : np.array, shape (2,), optional
+    """
+
+    closed = False
+
+    def __init__(self, vertices, thickness=params.WALL_THICKNESS, vel=None):
+        super().__init__(np.reshape(vertices, (-1, 2)), vel=vel)
+        self.thickness = thickness
+        self.points = self.pos
+        self.width = 1
+
+    def capsules(self):
+        a = self.pos
+        b = np.concatenate([a[1:], a[:1]])
+        if not self.closed:
+            a, b = a[:-1], b[:-1]
+        return a, b, np.full(len(a), self.thickness / 2)
+
+    def sync(self, points, zoom=1.):
+        """Place the vertices at screen positions."""
+        self.points = [tuple(point) for point in points]
+        self.width = max(1, int(round(self.thickness * zoom)))
+
+    def display(self, screen):
+        pygame.draw.lines(screen, params.WALL_COLOR, self.closed,
+                          self.points, self.width)
+
+
+class Polygon(Wall):
+    """A solid polygon, whose edges are walls."""
+
+    closed = True
+
+    def display(self, screen):
+        pygame.draw.polygon(screen, params.WALL_COLOR, self.points)
+
+
+class ObstacleMap:
+    """The capsules of a set of obstacles, indexed by their boxes.
+
+    Moving obstacles are moved and re-indexed together, the others are
+    indexed once.
+
+    ObstacleMap(cell_size=params.OBSTACLE_CELL_SIZE, period=None)
+        -> ObstacleMap
+
+    Parameters
+    ----------
+    cell_size : float, optional
+        Default is OBSTACLE_CELL_SIZE.
+    period : np.array, shape (2,), optional
+        Size of the world if it wraps.
+
+    Attributes
+    ----------
+    obstacles : list of Shape
+    a, b : np.array, shape (m, 2)
+        Ends of the capsules, by item of the index.
+    radius : np.array, shape (m,)
+    owner : np.array of int, shape (m,)
+        Position in obstacles of the obstacle of each capsule.
+    lo, hi : np.array, shape (len(obstacles), 2)
+        Corners of the bounding box of each obstacle.
+    tested : np.array of int
+        Segment of each capsule test made by the last threats() call.
+    culled : np.array of int
+        Segment of each capsule test skipped by the last threats() call.
+    tests, culls : int
+        Number of capsule tests found in the index by all threats()
+        calls, and of those skipped, see cull_rate.
+    """
+
+    def __init__(self, cell_size=params.OBSTACLE_CELL_SIZE, period=None):
+        self.cell_size = cell_size
+        self.period = period
+        self.index = spatial.BoxIndex(cell_size, period=period)
+        self.obstacles = []
+        self.items = []
+        self.moving = []
+        self.a = self.b = np.zeros((0, 2))
+        self.radius = np.zeros(0)
+        self.owner = np.zeros(0, dtype=np.int64)
+        self.lo = self.hi = np.zeros((0, 2))
+        self.tested = self.culled = np.zeros(0, dtype=np.int64)
+        self.tests = 0
+        self.culls = 0
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    @property
+    def cull_rate(self):
+        """Fraction of the capsule tests found in the index skipped."""
+        return self.culls / self.tests if self.tests else 0.
+
+    @staticmethod
+    def _boxes(a, b, radius):
+        return (np.minimum(a, b) - radius[:, None],
+                np.maximum(a, b) + radius[:, None])
+
+    def add(self, obstacle):
+        self.extend([obstacle])
+
+    def extend(self, obstacles):
+        """Add obstacles, indexing their capsules at once."""
+        if not obstacles:
+            return
+        capsules = [obstacle.capsules() for obstacle in obstacles]
+        a, b, radius = (np.concatenate(parts) for parts in zip(*capsules))
+        counts = [len(capsule[0]) for capsule in capsules]
+        starts = np.cumsum([0] + counts[:-1])
+        items = self.index.add(*self._boxes(a, b, radius))
+        self.items += np.split(items, starts[1:])
+        self.a = np.concatenate([self.a, a])
+        self.b = np.concatenate([self.b, b])
+        self.radius = np.concatenate([self.radius, radius])
+        first = len(self.obstacles)
+        self.owner = np.concatenate([self.owner, np.repeat(
+            np.arange(first, first + len(obstacles)), counts)])
+        # boxes of the obstacles, as Shape.box() computes them
+        reach = np.maximum.reduceat(radius, starts)[:, None]
+        lo = np.minimum.reduceat(np.minimum(a, b), starts) - reach
+        hi = np.maximum.reduceat(np.maximum(a, b), starts) + reach
+        self.lo = np.concatenate([self.lo, lo])
+        self.hi = np.concatenate([self.hi, hi])
+        self.moving += [first + k for k, obstacle in enumerate(obstacles)
+                        if obstacle.moving]
+        self.obstacles += obstacles
+
+    def move(self, world):
+        """Move the moving obstacles by one step."""
+        if not self.moving:
+            return
+        for k in self.moving:
+            self.obstacles[k].move(world)
+            self.lo[k], self.hi[k] = self.obstacles[k].box()
+        items = np.concatenate([self.items[k] for k in self.moving])
+        a, b, radius = (np.concatenate(parts) for parts in zip(
+            *(self.obstacles[k].capsules() for k in self.moving)))
+        self.a[items], self.b[items] = a, b
+        self.index.move(items, *self._boxes(a, b, radius))
+
+    def _near(self, items, points):
+        """Return the ends of capsules as seen from points."""
+        a = points + utils.wrap_offsets(self.a[items] - points, self.period)
+        return a, a + self.b[items] - self.a[items]
+
+    def threats(self, start, end):
+        """Find the capsule each segment runs into, if any.
+
+        When a segment runs into several capsules, the one whose surface
+        is closest to the start of the segment is kept. Capsules found in
+        the index are first culled when they lie behind the start of the
+        segment, beyond its end or to one side of it, so that only those
+        in the corridor swept by the segment are tested exactly.
+
+        Parameters
+        ----------
+        start, end : np.array, shape (n, 2)
+
+        Returns
+        -------
+        rows : np.array of int
+            Segments that run into a capsule.
+        a, b : np.array, shape (len(rows), 2)
+            Ends of the capsule, as seen from the segment.
+        """
+        rows, items = self.index.query(np.minimum(start, end),
+                                       np.maximum(start, end))
+        a, b = self._near(items, start[rows])
+        # bounds of the capsules along and across the segments, scaled
+        # by the length of the segments
+        d = end[rows] - start[rows]
+        reach = self.radius[items] * utils.norms(d)
+        a_along = np.sum((a - start[rows]) * d, axis=1)
+        b_along = np.sum((b - start[rows]) * d, axis=1)
+        a_across = utils.cross_rows(d, a - start[rows])
+        b_across = utils.cross_rows(d, b - start[rows])
+        culled = (np.maximum(a_along, b_along) < -reach) | \
+            (np.minimum(a_along, b_along) > np.sum(d * d, axis=1) + reach) | \
+            (np.minimum(a_across, b_across) > reach) | \
+            (np.maximum(a_across, b_across) < -reach)
+        self.culled = rows[culled]
+        rows, items, a, b = (rows[~culled], items[~culled], a[~culled],
+                             b[~culled])
+        self.tested = rows
+        self.tests += len(culled)
+        self.culls += len(self.culled)
+        hit = utils.segment_distances(start[rows], end[rows], a, b) < \
+            self.radius[items]
+        rows, items, a, b = rows[hit], items[hit], a[hit], b[hit]
+        gap = utils.norms(start[rows] - utils.closest_on_segments(
+            start[rows], a, b)) - self.radius[items]
+        # keep the closest capsule per segment
+        by_gap = np.lexsort((gap, rows))
+        rows, a, b = rows[by_gap], a[by_gap], b[by_gap]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = rows[1:] != rows[:-1]
+        return rows[first], a[first], b[first]
+
+    def inside(self, points):
+        """Return the rows of the points lying in a capsule."""
+        rows, items = self.index.query(points, points)
+        a, b = self._near(items, points[rows])
+        d = utils.norms(points[rows] - utils.closest_on_segments(
+            points[rows], a, b))
+        return np.unique(rows[d < self.radius[items]])
+
+    def overlapping(self, lo, hi):
+        """Return the obstacles whose capsules overlap a box."""
+        _, items = self.index.query(lo, hi)
+        return [self.obstacles[k] for k in np.unique(self.owner[items])]
@@ -0,0 +1,43 @@
+"""Frame pacing that leaves the CPU to other threads."""
+import threading
+import time
+from . import params
+
+
+class FramePacer:
+    """Paces a loop to a frame rate.
+
+    Between frames, the pacer waits on a threading.Event. The wait
+    releases the GIL, so other threads, such as a background simulation,
+    run in the meantime, and wake() ends it early.
+
+    FramePacer(fps=params.FPS) -> FramePacer
+
+    Parameters
+    ----------
+    fps : float, optional
+        Default is FPS.
+    """
+
+    def __init__(self, fps=params.FPS):
+        self.period = 1 / fps
+        self.start = self.deadline = time.perf_counter()
+        self.wakeup = threading.Event()
+
+    def wait(self):
+        """Wait for the next frame.
+
+        Returns the time spent working on the last frame, in seconds. A
+        frame that overran the period starts the next one right away.
+        """
+        now = time.perf_counter()
+        work = now - self.start
+        self.deadline = max(self.deadline + self.period, now)
+        self.wakeup.wait(self.deadline - now)
+        self.wakeup.clear()
+        self.start = time.perf_counter()
+        return work
+
+    def wake(self):
+        """End the current wait early."""
+        self.wakeup.set()
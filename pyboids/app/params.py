@@ -21,16 +21,33 @@ SCREEN_CENTER = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
 COL = SCREEN_WIDTH // 12
 ROW = SCREEN_HEIGHT // 9
 FPS = 30
+# World and camera parameters
+WORLD_SIZE = SCREEN_SIZE
+MIN_ZOOM, MAX_ZOOM = 0.1, 4.
+ZOOM_STEP = 1.1  # zoom factor per mouse wheel notch
+PAN_SPEED = 15  # screen pixels per frame
+CULL_MARGIN = 40  # screen pixels kept around the view when culling
+# Array renderers parameters
+RENDERER = 'sprites'  # or 'points', 'heatmap'
+POINT_LENGTH = 4  # pixels
+HEATMAP_CELL = 8  # pixels
+# Hot spot instrumentation parameters
+HOTSPOTS = False  # also record hot spots outside of debug mode
+HOTSPOT_CELL = 40  # pixels of the world
+HOTSPOT_OVERLAY = 'neighbour_tests'  # counter drawn in debug mode
+HOTSPOT_ALPHA = 128
 MENU_BACKGROUND = pygame.Color('slate gray')
 SIMULATION_BACKGROUND = pygame.Color('dark slate gray')
-FONTS = {
-    'hallo-sans-light': assets.freetype('hallo-sans-light.otf'),
-    'hallo-sans-bold': assets.freetype('hallo-sans-bold.otf'),
-    'hallo-sans': assets.freetype('hallo-sans.otf'),
-    'quicksand': assets.freetype('quicksand.otf'),
-    'quicksand-bold': assets.freetype('quicksand-bold.otf'),
-    'quicksand-light': assets.freetype('quicksand-light.otf'),
+FONT_FILES = {
+    'hallo-sans-light': 'hallo-sans-light.otf',
+    'hallo-sans-bold': 'hallo-sans-bold.otf',
+    'hallo-sans': 'hallo-sans.otf',
+    'quicksand': 'quicksand.otf',
+    'quicksand-bold': 'quicksand-bold.otf',
+    'quicksand-light': 'quicksand-light.otf',
 }
+FONTS = {name: assets.freetype(filename)
+         for name, filename in FONT_FILES.items()}
 FONT_SIZES = {
     'body': 17,
     'h1': 128,
@@ -46,11 +63,19 @@ H2_FONT = (FONTS['hallo-sans'], FONT_SIZES['h2'])
 H3_FONT = (FONTS['quicksand'], FONT_SIZES['h3'])
 H4_FONT = (FONTS['hallo-sans'], FONT_SIZES['h4'])
 H5_FONT = (FONTS['hallo-sans'], FONT_SIZES['h5'])
+TEXT_CACHE_SIZE = 256  # rendered texts and glyphs kept
 
 # Boid staying inside the screen box
+WRAP_AROUND = False  # periodic world instead of a box
 BOX_MARGIN = 200  # pixels
 STEER_INSIDE = 6.  # speed impulse when out of margins
+# Steering pipeline parameters
+BEHAVIOUR_ORDER = ('pursue', 'escape', 'follow leader', 'wander',
+                   'avoid collision', 'align', 'separate', 'remain in screen')
+BEHAVIOUR_WEIGHTS = {}  # factor on the capped force of a behaviour, or 1
 # Boid steering parameters
+BOID_MASS = 20
+DTYPE = 'float64'  # storage of the state of boids, or 'float32'
 BOID_MAX_FORCE = 10.
 BOID_MAX_SPEED = 7.
 # Boid seek parameters
@@ -61,6 +86,7 @@ R_FLEE = 200
 WANDER_DIST = 4.5
 WANDER_RADIUS = 3.0
 WANDER_ANGLE = 1.0  # degrees
+RANDOM_BLOCK = 4096  # random numbers drawn at once by a flock
 # Boid obstacle avoidance parameters
 MAX_SEE_AHEAD = 50  # pixels
 MAX_AVOID_FORCE = 10.
@@ -70,11 +96,51 @@ MAX_SEPARATION_FORCE = 8.
 # Leader following parameters
 LEADER_BEHIND_DIST = 10  # pixels
 LEADER_AHEAD_DIST = 40
+# Spatial index parameters
+CELL_SIZE = 200  # pixels
+OBSTACLE_CELL_SIZE = 50  # pixels, about the size of a wall segment
+NEIGHBOUR_SKIN = 30  # pixels, extra reach of cached neighbour lists
+NEIGHBOUR_EVERY = 1  # steps between two refreshes of neighbour pairs
+K_NEIGHBOURS = 0  # align and separate with the k nearest, 0 for radii
+KNN_OCCUPANCY = 2  # mean points per cell of the k nearest search, over k
 # Obstacles parameters
 OBSTACLE_DEFAULT_RADIUS = 40
+WALL_THICKNESS = 6  # pixels
+WALL_COLOR = pygame.Color('lightgray')
 # Boid alignment parameters
 ALIGN_RADIUS = 200
 # Boid cohesion parameters
 COHERE_RADIUS = 300
+# Metrics parameters
+METRICS_EVERY = 10  # steps between two samples of the time series
+DENSITY_BINS = 10  # last bin counts boids with more neighbours
+# Distributed tiles parameters
+TILE_HOST = 'localhost'  # host workers listen at for other workers
+TILE_AUTHKEY = b'pyboids'
 # multi-threading parameters
 N_CPU = os.cpu_count()
+THREADED = False  # update the flock of the simulation on its own thread
+# Frame budget parameters
+FRAME_BUDGET = False  # lower fidelity to hold the frame rate
+BUDGET_LEVELS = (  # fidelity given up in turn, as renderer or Config values
+    {'neighbour_skin': 60},
+    {'neighbour_every': 2},
+    {'neighbour_every': 4},
+    {'renderer': 'points'},
+)
+BUDGET_HEADROOM = 0.5  # fraction of the budget under which fidelity returns
+BUDGET_PATIENCE = 30  # frames between two changes of fidelity
+BUDGET_SMOOTHING = 0.1  # weight of the last frame in the mean frame cost
+# Export parameters
+EXPORT_EVERY = 1  # steps per exported frame
+EXPORT_SCALE = 1.  # size of exported frames relative to the screen
+EXPORT_QUEUE_SIZE = 16  # frames waiting to be written
+EXPORT_PATTERN = 'frame-{:06d}.png'
+# Replay parameters
+REPLAY_MIN_RATE, REPLAY_MAX_RATE = 0.125, 64.  # recorded steps per frame
+REPLAY_SEEK_STEP = 10 * FPS  # recorded steps skipped by page up and down
+REPLAY_BAR_HEIGHT = 8  # pixels
+REPLAY_BAR_COLOR = pygame.Color('lightgray')
+# Scenario parameters
+SCENARIO_BATCH = 10000  # obstacles parsed from files before being added
+SCENARIO_SPREAD = 50  # pixels, default deviation of normal spawns
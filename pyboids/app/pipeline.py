@@ -0,0 +1,78 @@
+"""Steering pipeline, summing the forces of all behaviours in one pass."""
+import numpy as np
+from . import utils
+
+
+class Pipeline:
+    """Steering behaviours run as stages, in a configurable order.
+
+    Stages are callables registered by name. When run, each stage emits
+    forces with emit(), capped by the maximum force of its behaviour.
+    Once every enabled stage has run, forces are truncated, weighted by
+    stage and summed into the steering of the boids in a single pass,
+    instead of once per behaviour.
+
+    Pipeline() -> Pipeline
+
+    Attributes
+    ----------
+    stages : dict
+        Callables taking no argument, by name.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.pending = []
+        self.weight = 1.
+
+    def register(self, name, stage):
+        """Add a stage, or replace the stage of the same name."""
+        self.stages[name] = stage
+
+    def emit(self, boids, forces, max_force):
+        """Queue forces of the running stage.
+
+        Parameters
+        ----------
+        boids : np.array of int
+            Rows of the boids in the flock state.
+        forces : np.array, shape (len(boids), 2)
+        max_force : float
+            Cap on the contribution of each force.
+        """
+        self.pending.append((boids, forces, max_force, self.weight))
+
+    def run(self, state, order, weights=None, enabled=None):
+        """Run stages and add their forces to the steering of boids.
+
+        Parameters
+        ----------
+        state : FlockState
+        order : list of str
+            Names of the stages to run, in order.
+        weights : dict or iterable of (str, float), optional
+            Factor on the capped forces of each stage. Default is 1.
+            Stages of null weight are not run.
+        enabled : callable, optional
+            Tells from the name of a stage whether to run it.
+        """
+        weights = dict(weights or ())
+        self.pending = []
+        for name in order:
+            self.weight = weights.get(name, 1.)
+            if self.weight and (enabled is None or enabled(name)):
+                self.stages[name]()
+        if not self.pending:
+            return
+        boids, forces, caps, weights = zip(*self.pending)
+        counts = [len(rows) for rows in boids]
+        boids = np.concatenate(boids)
+        forces = np.concatenate(forces).reshape(-1, 2)
+        steering = utils.truncate_rows(
+            forces / state.mass[boids, None], np.repeat(caps, counts))
+        steering *= np.repeat(weights, counts)[:, None]
+        n = len(state)
+        state.steering += np.stack(
+            [np.bincount(boids, steering[:, 0], minlength=n),
+             np.bincount(boids, steering[:, 1], minlength=n)], axis=1)
+        self.pending = []
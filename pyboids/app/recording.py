@@ -0,0 +1,201 @@
+"""Recordings of runs, written frame by frame and read back lazily.
+
+A recording is a directory holding:
+
+- frames.bin, the frames one after the other, in single precision: the
+  position and velocity of each boid, then the vertices of each
+  obstacle;
+- index.npy, the start of each frame in frames.bin, with its number of
+  boids and of obstacles, and the step of the run it was taken at;
+- meta.json, the world, which boids are leaders and the shape of each
+  obstacle.
+
+Every frame is stored whole, so every frame is a keyframe: seeking to
+any frame is one lookup in the index, and reading it only touches its
+own bytes of frames.bin, which is memory-mapped rather than loaded.
+Frames need not be evenly spaced: a threaded simulation may complete
+several steps, or none, between two frames it draws.
+"""
+import json
+import os
+
+import numpy as np
+
+from .obstacle import Obstacle, Wall, Polygon
+
+DATA_FILE = 'frames.bin'
+INDEX_FILE = 'index.npy'
+META_FILE = 'meta.json'
+
+
+def describe(shape):
+    """Return the description of an obstacle kept in a recording."""
+    if isinstance(shape, Wall):
+        return {'kind': 'polygon' if shape.closed else 'wall',
+                'thickness': shape.thickness, 'vertices': len(shape.pos)}
+    return {'kind': 'circle', 'radius': shape.radius, 'vertices': 1}
+
+
+def build(description):
+    """Return an obstacle from its description, placed at the origin."""
+    vertices = np.zeros((description['vertices'], 2))
+    if description['kind'] == 'circle':
+        return Obstacle(pos=vertices[0], radius=description['radius'])
+    kind = Polygon if description['kind'] == 'polygon' else Wall
+    return kind(vertices, thickness=description['thickness'])
+
+
+def latest(directory):
+    """Return the path of the last recording in a directory, or None."""
+    if not os.path.isdir(directory):
+        return None
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    paths = [path for path in paths
+             if os.path.exists(os.path.join(path, META_FILE))]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+class Recorder:
+    """Writes the frames of a flock to a recording.
+
+    Boids and obstacles are only ever appended to a flock, so the kind
+    of each boid and the shape of each obstacle are written once, on
+    close, while frames only hold positions and velocities.
+
+    Recorder(path, flock) -> Recorder
+
+    Parameters
+    ----------
+    path : str
+        Directory of the recording, created if needed.
+    flock : Flock
+    """
+
+    def __init__(self, path, flock):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.flock = flock
+        self.data = open(os.path.join(path, DATA_FILE), 'wb')
+        self.index = []
+        self.offset = 0
+        self.leader = np.zeros(0, dtype=bool)
+        self.shapes = []
+
+    def __len__(self):
+        return len(self.index)
+
+    def write(self, pos, vel, obstacles, step):
+        """Append a frame.
+
+        Parameters
+        ----------
+        pos, vel : np.array, shape (n, 2)
+            State of the first n boids of the flock.
+        obstacles : list of (Shape, np.array)
+            Each obstacle of the flock with its position.
+        step : int
+            Step of the run the frame was taken at.
+        """
+        n = len(pos)
+        if n > len(self.leader):
+            self.leader = self.flock.state.leader[:n].copy()
+        self.shapes += [describe(shape)
+                        for shape, _ in obstacles[len(self.shapes):]]
+        boids = np.empty((n, 4), dtype=np.float32)
+        boids[:, :2], boids[:, 2:] = pos, vel
+        self.data.write(boids.tobytes())
+        size = boids.size
+        for _, at in obstacles:
+            vertices = np.asarray(at, dtype=np.float32)
+            self.data.write(vertices.tobytes())
+            size += vertices.size
+        self.index.append((self.offset, n, len(obstacles), step))
+        self.offset += size
+
+    def close(self):
+        """Write the index and the description of the recording."""
+        self.data.close()
+        np.save(os.path.join(self.path, INDEX_FILE),
+                np.array(self.index, dtype=np.int64).reshape(-1, 4))
+        world = self.flock.world
+        meta = {
+            'world_size': world.size.tolist(),
+            'wrap': bool(world.wrap),
+            'leaders': np.flatnonzero(self.leader).tolist(),
+            'obstacles': self.shapes,
+        }
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+
+class Recording:
+    """A recording, read one frame at a time.
+
+    Recording(path) -> Recording
+
+    Parameters
+    ----------
+    path : str
+        Directory of the recording.
+
+    Attributes
+    ----------
+    meta : dict
+        Description of the recording, see Recorder.close().
+    leader : np.array of bool
+        Whether each boid is a leader.
+    steps : np.array of int
+        Step of the run each frame was taken at, in increasing order.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.index = np.load(os.path.join(path, INDEX_FILE), mmap_mode='r')
+        self.steps = np.asarray(self.index[:, 3])
+        data = os.path.join(path, DATA_FILE)
+        if os.path.getsize(data):
+            self.data = np.memmap(data, dtype=np.float32, mode='r')
+        else:
+            self.data = np.zeros(0, dtype=np.float32)
+        self.leader = np.zeros(
+            max(self.meta['leaders'], default=-1) + 1, dtype=bool)
+        self.leader[self.meta['leaders']] = True
+        # obstacles have images, which load once a display mode is set
+        self.shapes = None
+        self.ends = 2 * np.cumsum(
+            [0] + [shape['vertices'] for shape in self.meta['obstacles']])
+        self.steering = np.zeros((0, 2))
+
+    def __len__(self):
+        return len(self.index)
+
+    def is_leader(self, row):
+        return row < len(self.leader) and bool(self.leader[row])
+
+    def at(self, step):
+        """Return the last frame taken at or before a step."""
+        return max(int(np.searchsorted(self.steps, step, 'right')) - 1, 0)
+
+    def read(self, k, frame):
+        """Fill a Frame with frame k of the recording and return it."""
+        if self.shapes is None:
+            self.shapes = [build(shape) for shape in self.meta['obstacles']]
+        start, n, m, _ = (int(value) for value in self.index[k])
+        boids = self.data[start:start + 4 * n].reshape(n, 4)
+        frame.pos, frame.vel = boids[:, :2], boids[:, 2:]
+        if len(self.steering) < n:
+            self.steering = np.zeros((2 * n, 2))
+        frame.steering = self.steering[:n]
+        vertices = self.data[start + 4 * n:start + 4 * n + self.ends[m]]
+        frame.obstacles = []
+        boxes = []
+        for shape, a, b in zip(self.shapes[:m], self.ends, self.ends[1:]):
+            shape.pos = np.reshape(vertices[a:b], shape.pos.shape).astype(
+                float)
+            frame.obstacles.append((shape, shape.pos))
+            boxes.append(shape.box())
+        frame.lo = np.array([lo for lo, _ in boxes]).reshape(-1, 2)
+        frame.hi = np.array([hi for _, hi in boxes]).reshape(-1, 2)
+        frame.hotspots = None
+        return frame
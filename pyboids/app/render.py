@@ -0,0 +1,101 @@
+"""Array renderers, drawing whole flocks at once.
+
+They write boids straight into pixel arrays instead of blitting one
+rotated sprite per boid, which keeps large populations interactive.
+"""
+import numpy as np
+import pygame
+from . import params, utils
+
+
+def palette(colors, n=256):
+    """Return n RGB colors interpolated along a list of pygame colors."""
+    stops = np.array([tuple(color)[:3] for color in colors], dtype=float)
+    x = np.linspace(0, len(stops) - 1, n)
+    channels = [np.interp(x, np.arange(len(stops)), stops[:, c])
+                for c in range(3)]
+    return np.stack(channels, axis=1).astype(np.uint8)
+
+
+HEADING_COLORS = palette([pygame.Color(name) for name in
+                          'red yellow green cyan blue magenta red'.split()])
+# the darkest color is not black, which is transparent on the heatmap
+HEAT_COLORS = palette([pygame.Color(name) for name in
+                       'darkred red orange yellow white'.split()])
+
+
+def heading_colors(vel):
+    """Return one color per velocity, by heading angle."""
+    angle = np.arctan2(vel[:, 1], vel[:, 0])
+    n = len(HEADING_COLORS)
+    bins = ((angle + np.pi) / (2 * np.pi) * n).astype(int) % n
+    return HEADING_COLORS[bins]
+
+
+def draw_points(screen, points, vel, length=params.POINT_LENGTH):
+    """Draw boids as short lines colored by heading.
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+    points : np.array, shape (n, 2)
+        Screen positions of the boids.
+    vel : np.array, shape (n, 2)
+    length : int, optional
+        Length of the lines, in pixels. Default is POINT_LENGTH.
+    """
+    width, height = screen.get_size()
+    colors = heading_colors(vel)
+    direction = utils.normalize_rows(vel)
+    pixels = pygame.surfarray.pixels3d(screen)
+    for k in range(length):
+        xy = np.rint(points - k * direction).astype(int)
+        x, y = xy[:, 0], xy[:, 1]
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        pixels[x[inside], y[inside]] = colors[inside]
+    # release the lock on the screen
+    del pixels
+
+
+def draw_heatmap(screen, points, cell=params.HEATMAP_CELL):
+    """Draw the density of boids as a heatmap over the screen.
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+    points : np.array, shape (n, 2)
+        Screen positions of the boids.
+    cell : int, optional
+        Side of a heatmap cell, in pixels. Default is HEATMAP_CELL.
+    """
+    width, height = screen.get_size()
+    shape = (-(-width // cell), -(-height // cell))
+    cells = np.floor(points / cell).astype(int)
+    x, y = cells[:, 0], cells[:, 1]
+    inside = (x >= 0) & (x < shape[0]) & (y >= 0) & (y < shape[1])
+    counts = np.bincount(x[inside] * shape[1] + y[inside],
+                         minlength=shape[0] * shape[1]).reshape(shape)
+    heatmap = heat_surface(counts)
+    if heatmap is not None:
+        screen.blit(pygame.transform.scale(
+            heatmap, (shape[0] * cell, shape[1] * cell)), (0, 0))
+
+
+def heat_surface(counts):
+    """Return a surface with a pixel per count, on a log color scale.
+
+    Null counts are transparent. Returns None if all counts are null.
+
+    Parameters
+    ----------
+    counts : np.array of int, shape (width, height)
+    """
+    if not counts.any():
+        return None
+    level = np.log1p(counts) / np.log1p(counts.max())
+    colors = HEAT_COLORS[(level * (len(HEAT_COLORS) - 1)).astype(int)]
+    colors[counts == 0] = 0
+    heatmap = pygame.Surface(counts.shape)
+    pygame.surfarray.blit_array(heatmap, colors)
+    heatmap.set_colorkey((0, 0, 0))
+    return heatmap
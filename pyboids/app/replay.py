@@ -0,0 +1,226 @@
+"""Replay of recorded runs."""
+import pygame
+from .flock import Flock
+from .boid import Boid, LeaderBoid
+from .camera import Camera
+from .config import Config
+from .pacing import FramePacer
+from .recording import Recording
+from .stepper import Frame
+from . import params
+from . import gui
+
+
+class Replay:
+    """Plays a recording back, without running any behaviour.
+
+    Frames are read from disk as they are shown, and drawn by a flock
+    that is never updated. Playback moves through the steps of the run,
+    one per frame at normal rate, showing the last frame taken at or
+    before the current step, so that it keeps the pace of the run
+    however unevenly frames were taken. It can be paused, reversed, sped
+    up or slowed down, and seeks anywhere in the recording.
+
+    Replay(screen, path) -> Replay
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+    path : str
+        Directory of the recording.
+
+    Attributes
+    ----------
+    position : float
+        Step of the run shown, possibly between two steps.
+    rate : float
+        Steps of the run per frame played back.
+    direction : int
+        1 to play forward, -1 to play in reverse.
+    """
+
+    def __init__(self, screen, path):
+        self.running = True
+        self.screen = screen
+        self.pacer = FramePacer()
+        self.recording = Recording(path)
+        meta = self.recording.meta
+        self.flock = Flock(Config(world_size=tuple(meta['world_size']),
+                                  wrap_around=meta['wrap']))
+        self.frame = Frame()
+        self.camera = Camera(center=self.flock.world.size / 2)
+        self.steps = self.recording.steps
+        self.position = float(self.steps[0]) if len(self.steps) else 0.
+        self.rate = 1.
+        self.direction = 1
+        self.paused = False
+        self.bar = pygame.Rect(0, 0, params.SCREEN_WIDTH - 2 * params.COL,
+                               params.REPLAY_BAR_HEIGHT)
+        self.bar.midbottom = (params.SCREEN_WIDTH // 2,
+                              params.SCREEN_HEIGHT - params.ROW // 4)
+        self.panel = gui.Panel()
+        self.step_message = gui.Message(pos=(6, 0.5), text="Step: ",
+                                         count=0)
+        self.rate_message = gui.Message(pos=(6, 7.5), text="Rate: x",
+                                        count=self.rate)
+        self.fps_message = gui.FPSMessage(pos=(11, 0.5), text="FPS: ...")
+
+    @property
+    def first(self):
+        return float(self.steps[0])
+
+    @property
+    def last(self):
+        return float(self.steps[-1])
+
+    def seek(self, position):
+        """Show a step of the run, clamped to the recording."""
+        self.position = min(max(position, self.first), self.last)
+
+    def change_rate(self, factor):
+        rate = self.rate * factor
+        if params.REPLAY_MIN_RATE <= rate <= params.REPLAY_MAX_RATE:
+            self.rate = rate
+            self.rate_message.set_count("Rate: x", rate)
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+
+    def reverse(self):
+        self.direction = -self.direction
+
+    def press(self, button):
+        """Click a button from the keyboard, so that its label follows."""
+        button.click()
+        self.panel.refresh(button)
+
+    def click_bar(self, screen_pos):
+        """Seek to the step under a click on the progress bar."""
+        if self.bar.collidepoint(screen_pos):
+            fraction = (screen_pos[0] - self.bar.left) / self.bar.width
+            self.seek(round(self.first + fraction * (self.last - self.first)))
+
+    def move_camera(self):
+        """Pan the camera with the arrow keys."""
+        pressed = pygame.key.get_pressed()
+        dx = pressed[pygame.K_RIGHT] - pressed[pygame.K_LEFT]
+        dy = pressed[pygame.K_DOWN] - pressed[pygame.K_UP]
+        if dx or dy:
+            self.camera.pan((params.PAN_SPEED * dx, params.PAN_SPEED * dy))
+
+    def update(self):
+        self.move_camera()
+        if self.paused:
+            return
+        self.seek(self.position + self.direction * self.rate)
+        if self.position in (self.first, self.last):
+            self.paused = True
+            self.pause_button.select("paused")
+            self.panel.refresh(self.pause_button)
+
+    def add_sprites(self, n):
+        """Give a sprite to each of the first n boids."""
+        for row in range(len(self.flock.members), n):
+            kind = LeaderBoid if self.recording.is_leader(row) else Boid
+            self.flock.add_boid(kind())
+
+    def display(self):
+        k = self.recording.at(self.position)
+        frame = self.recording.read(k, self.frame)
+        self.add_sprites(len(frame.pos))
+        self.flock.display(self.screen, self.camera, frame)
+        self.panel.display(self.screen)
+        self.step_message.set_count("Step: ", int(self.position))
+        self.step_message.display(self.screen)
+        self.rate_message.display(self.screen)
+        done = self.bar.copy()
+        done.width = round(self.bar.width * (self.position - self.first) /
+                           max(self.last - self.first, 1))
+        pygame.draw.rect(self.screen, params.REPLAY_BAR_COLOR, self.bar, 1)
+        pygame.draw.rect(self.screen, params.REPLAY_BAR_COLOR, done)
+
+    def init_run(self):
+        self.pause_button = gui.ToggleButton(
+            pos=(0.2, 8),
+            text="Playback: ",
+            labels=["playing", "paused"],
+            init_label="playing",
+            action=lambda: self.toggle_pause())
+        self.direction_button = gui.ToggleButton(
+            pos=(0.2, 8.5),
+            text="Direction: ",
+            labels=["forward", "reverse"],
+            init_label="forward",
+            action=lambda: self.reverse())
+        self.panel = gui.Panel([
+            self.pause_button,
+            self.direction_button,
+            gui.ToggleButton(
+                pos=(8.5, 8),
+                text="Slower",
+                action=lambda: self.change_rate(0.5)),
+            gui.ToggleButton(
+                pos=(8.5, 8.5),
+                text="Faster",
+                action=lambda: self.change_rate(2)),
+            gui.ToggleButton(
+                pos=(8.5, 7.5),
+                text="Draw boids as: ",
+                labels=self.flock.renderers,
+                init_label=self.flock.renderer,
+                action=lambda: self.flock.switch_renderer()),
+        ])
+
+    def run(self):
+        step = params.REPLAY_SEEK_STEP
+        key_to_function = {
+            pygame.K_ESCAPE:
+                lambda self, event: setattr(self, "running", False),
+            pygame.K_SPACE:
+                lambda self, event: self.press(self.pause_button),
+            pygame.K_r:
+                lambda self, event: self.press(self.direction_button),
+            pygame.K_EQUALS: lambda self, event: self.change_rate(2),
+            pygame.K_PLUS: lambda self, event: self.change_rate(2),
+            pygame.K_MINUS: lambda self, event: self.change_rate(0.5),
+            pygame.K_HOME: lambda self, event: self.seek(self.first),
+            pygame.K_END: lambda self, event: self.seek(self.last),
+            pygame.K_PAGEUP:
+                lambda self, event: self.seek(self.position - step),
+            pygame.K_PAGEDOWN:
+                lambda self, event: self.seek(self.position + step),
+        }
+        button_to_function = {
+            1: lambda self, event: self.click_bar(event.pos),
+            4: lambda self, event: self.camera.zoom_at(
+                params.ZOOM_STEP, event.pos),
+            5: lambda self, event: self.camera.zoom_at(
+                1 / params.ZOOM_STEP, event.pos),
+        }
+        self.init_run()
+        if not len(self.recording):
+            return
+        while self.running:
+            dt = self.pacer.wait()
+            self.screen.fill(params.SIMULATION_BACKGROUND)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+                    return "PYGAME_QUIT"
+                elif event.type == pygame.KEYDOWN and \
+                        event.key in key_to_function:
+                    key_to_function[event.key](self, event)
+                elif event.type in (pygame.MOUSEBUTTONDOWN,
+                                    pygame.MOUSEMOTION):
+                    self.panel.handle(event)
+                    if event.type == pygame.MOUSEBUTTONDOWN and \
+                            event.button in button_to_function:
+                        button_to_function[event.button](self, event)
+            self.update()
+            self.fps_message.update(dt)
+            self.display()
+            self.fps_message.display(self.screen)
+            pygame.display.flip()
+
+    def quit(self):
+        self.running = False
@@ -0,0 +1,167 @@
+"""Scenario files, describing reproducible setups of a flock.
+
+A scenario is a JSON object, whose keys are all optional:
+
+    {
+        "seed": 0,
+        "params": {"WRAP_AROUND": true, "ALIGN_RADIUS": 100},
+        "behaviours": {"align": true, "separate": true},
+        "boids": [
+            {"count": 5000, "spawn": "uniform"},
+            {"count": 500, "spawn": "normal", "center": [480, 360],
+             "spread": 60, "heading": 0},
+            {"leader": true, "spawn": "points",
+             "points": [[100, 100], [800, 600]]}
+        ],
+        "obstacles": [
+            {"kind": "circle", "pos": [200, 300], "radius": 40},
+            {"kind": "circle", "count": 50, "spawn": "uniform",
+             "radius": 20, "vel": [1, 0]},
+            {"kind": "wall", "vertices": [[0, 0], [100, 0], [100, 80]]},
+            {"kind": "polygon", "vertices": [[300, 300], [400, 320],
+                                             [350, 400]]}
+        ],
+        "obstacle_files": ["maze.jsonl"]
+    }
+
+Boids and circles are spawned uniformly in a box, which defaults to the
+world, normally around a centre, or at given points. Boids move at
+full speed, with a random heading unless one is given, in radians.
+
+Obstacle files, relative to the scenario file, hold one obstacle per
+line, in the form of the items of "obstacles". They are parsed as a
+stream and added in batches, so that very large sets of obstacles are
+never held whole in memory.
+
+From the pyboids directory:
+
+    python main.py scenario.json
+    python -m app.export --scenario scenario.json --steps 600 --out frames
+"""
+import itertools
+import json
+import os
+
+import numpy as np
+
+from . import params
+from .config import configured
+from .flock import Flock
+from .obstacle import Obstacle, Wall, Polygon
+
+SPAWNS = ['uniform', 'normal', 'points']
+
+
+def read(path):
+    """Return the scenario of a file."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def stream(path):
+    """Yield the obstacles of an obstacle file, one line at a time."""
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise ValueError('{}, line {}: {}'.format(
+                    path, number, error))
+
+
+def batches(items, size=params.SCENARIO_BATCH):
+    """Yield lists of at most size items."""
+    items = iter(items)
+    batch = list(itertools.islice(items, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(items, size))
+
+
+def spawn(spec, world, rng):
+    """Return positions drawn from the spawn distribution of a spec."""
+    kind = spec.get('spawn', 'uniform')
+    if kind == 'points':
+        return np.array(spec['points'], dtype=float).reshape(-1, 2)
+    n = spec['count']
+    if kind == 'uniform':
+        lo, hi = np.array(spec.get('box', [(0, 0), world.size]), dtype=float)
+        pos = lo + rng.rand(n, 2) * (hi - lo)
+    elif kind == 'normal':
+        center = np.array(spec.get('center', world.size / 2), dtype=float)
+        pos = center + spec.get('spread', params.SCENARIO_SPREAD) * \
+            rng.randn(n, 2)
+    else:
+        raise ValueError('unknown spawn {!r}, expected one of {}'.format(
+            kind, ', '.join(SPAWNS)))
+    world.contain(pos)
+    return pos
+
+
+def velocities(spec, n, speed, rng):
+    """Return the velocities of n boids at a speed."""
+    if 'heading' in spec:
+        angle = np.full(n, float(spec['heading']))
+    else:
+        angle = rng.uniform(-np.pi, np.pi, n)
+    return speed * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+
+def shapes(spec, world, rng, config):
+    """Return the obstacles of an item of "obstacles"."""
+    kind = spec.get('kind', 'circle')
+    vel = spec.get('vel')
+    if kind == 'circle':
+        radius = spec.get('radius', config.obstacle_default_radius)
+        if 'pos' in spec:
+            return [Obstacle(pos=spec['pos'], radius=radius, vel=vel)]
+        return [Obstacle(pos=pos, radius=radius, vel=vel)
+                for pos in spawn(spec, world, rng)]
+    if kind in ('wall', 'polygon'):
+        shape = Polygon if kind == 'polygon' else Wall
+        return [shape(spec['vertices'], vel=vel,
+                      thickness=spec.get('thickness', params.WALL_THICKNESS))]
+    raise ValueError('unknown obstacle kind {!r}'.format(kind))
+
+
+def materialize(scenario, base_dir='.'):
+    """Return a flock set up as a scenario describes.
+
+    Parameters
+    ----------
+    scenario : dict
+        As returned by read().
+    base_dir : str, optional
+        Directory obstacle files are relative to.
+    """
+    seed = scenario.get('seed', 0)
+    rng = np.random.RandomState(seed)
+    flock = Flock(configured(scenario.get('params', {})), seed=seed)
+    behaviours = scenario.get('behaviours', {})
+    unknown = set(behaviours) - set(flock.behaviours)
+    if unknown:
+        raise ValueError('unknown behaviours: {}'.format(
+            ', '.join(sorted(unknown))))
+    flock.behaviours.update(behaviours)
+    config, world = flock.config, flock.world
+    for spec in scenario.get('boids', []):
+        pos = spawn(spec, world, rng)
+        vel = velocities(spec, len(pos),
+                         spec.get('speed', config.boid_max_speed), rng)
+        flock.add_boids(pos, vel, leader=spec.get('leader', False))
+    specs = itertools.chain(
+        scenario.get('obstacles', []),
+        *(stream(os.path.join(base_dir, path))
+          for path in scenario.get('obstacle_files', [])))
+    obstacles = itertools.chain.from_iterable(
+        shapes(spec, world, rng, config) for spec in specs)
+    for batch in batches(obstacles):
+        flock.add_obstacles(batch)
+    return flock
+
+
+def load(path):
+    """Return a flock set up as the scenario of a file describes."""
+    return materialize(read(path), os.path.dirname(path))
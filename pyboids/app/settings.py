@@ -17,3 +17,13 @@ FONT_DIRS = [
 DEFAULT_FONT = 'hallo-sans.otf'
 SOUND_DIRS = []
 MUSIC_DIRS = []
+
+# Parameter sweeps configuration
+SWEEP_CACHE_DIR = os.path.join(os.path.dirname(BASE_DIR), '.sweep_cache')
+
+# Recordings configuration
+RECORDINGS_DIR = os.path.join(os.path.dirname(BASE_DIR), 'recordings')
+
+# Asset bundle configuration
+ASSET_BUNDLE = os.path.join(ASSETS_DIR, 'bundle.npz')
+USE_ASSET_BUNDLE = os.environ.get('PYBOIDS_ASSET_BUNDLE', '1') != '0'
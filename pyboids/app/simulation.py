@@ -1,9 +1,16 @@
 """Simulation classes."""
+import contextlib
+import os
+import time
 import pygame
 from .flock import Flock
-from . import params
+from .camera import Camera
+from .pacing import FramePacer
+from .stepper import Stepper
+from .budget import FrameBudget
+from .recording import Recorder
+from . import params, settings
 from . import gui
-from time import time
 
 
 def callback(*args, **kwargs):
@@ -16,54 +23,124 @@ def callback(*args, **kwargs):
 
 
 class Simulation:
-    """Represent a simulation of a flock."""
+    """Represent a simulation of a flock.
 
-    def __init__(self, screen):
+    When threaded, the flock is updated by a Stepper on another thread
+    and drawn from the last frame it completed; events changing the
+    flock are handled while holding the lock of the stepper. With a
+    frame budget, fidelity is traded for a steady frame rate. While
+    recording, every new frame is written to a recording. The flock may
+    be given, e.g. loaded from a scenario, instead of made from config.
+    """
+
+    def __init__(self, screen, config=None, threaded=params.THREADED,
+                 budget=params.FRAME_BUDGET, flock=None):
         self.running = True
         self.screen = screen
-        self.clock = pygame.time.Clock()
-        self.flock = Flock()
-        self.to_update = pygame.sprite.Group()
-        self.to_display = pygame.sprite.Group()
+        self.pacer = FramePacer()
+        self.flock = flock if flock is not None else Flock(config)
+        self.stepper = Stepper(self.flock) if threaded else None
+        self.lock = self.stepper.lock if threaded else \
+            contextlib.nullcontext()
+        self.budget = FrameBudget(self.flock, lock=self.lock) if budget \
+            else None
+        self.camera = Camera(center=self.flock.world.size / 2)
+        self.panel = gui.Panel()
         self.temp_message = pygame.sprite.GroupSingle()
         self.fps_message = gui.FPSMessage(pos=(11, 0.5), text="FPS: ...")
+        self.recorder = None
+        self.recorded = None
 
-    def add_element(self, pos):
-        self.flock.add_element(pos)
+    def add_element(self, screen_pos):
+        self.flock.add_element(self.camera.to_world(screen_pos))
         if self.temp_message:
             self.temp_message.sprite.kill()
-        msg = "Number of "
         if "boid" in self.flock.add_kind:
-            msg += "boids: {}".format(len(self.flock.boids))
+            msg, count = "Number of boids: ", len(self.flock.boids)
         else:
-            msg += "obstacles: {}".format(len(self.flock.obstacles))
+            msg, count = "Number of obstacles: ", len(self.flock.obstacles)
         self.temp_message.add(
-            gui.TempMessage(pos=(6, 1), text=msg))
+            gui.TempMessage(pos=(6, 1), text=msg, count=count))
 
     def toggle_behaviour(self, behaviour):
         self.flock.behaviours[behaviour] = not self.flock.behaviours[behaviour]
 
+    def show(self, text):
+        if self.temp_message:
+            self.temp_message.sprite.kill()
+        self.temp_message.add(gui.TempMessage(pos=(6, 1), text=text))
+
+    def toggle_recording(self):
+        """Start recording to a new recording, or save the current one."""
+        if self.recorder is None:
+            path = os.path.join(settings.RECORDINGS_DIR,
+                                time.strftime('%Y%m%d-%H%M%S'))
+            self.recorder = Recorder(path, self.flock)
+            self.show("Recording...")
+        else:
+            self.recorder.close()
+            self.show("Recording saved: {} frames".format(
+                len(self.recorder)))
+            self.recorder = None
+
+    def record(self, frame):
+        """Write a frame to the recording, unless already written."""
+        if frame is None:
+            pos, vel = self.flock.state.pos, self.flock.state.vel
+            obstacles = [(obstacle, obstacle.pos)
+                         for obstacle in self.flock.obstacle_map.obstacles]
+            step = self.flock.steps
+        else:
+            pos, vel, obstacles, step = \
+                frame.pos, frame.vel, frame.obstacles, frame.step
+        if step != self.recorded:
+            self.recorder.write(pos, vel, obstacles, step)
+            self.recorded = step
+
     def toggle_debug(self):
-        params.DEBUG = not params.DEBUG
+        config = self.flock.config
+        self.flock.configure(config.replace(debug=not config.debug))
+
+    def move_camera(self):
+        """Pan the camera with the arrow keys."""
+        pressed = pygame.key.get_pressed()
+        dx = pressed[pygame.K_RIGHT] - pressed[pygame.K_LEFT]
+        dy = pressed[pygame.K_DOWN] - pressed[pygame.K_UP]
+        if dx or dy:
+            self.camera.pan((params.PAN_SPEED * dx, params.PAN_SPEED * dy))
 
-    def update(self, motion_event, click_event):
-        self.to_update.update(motion_event, click_event)
+    def update(self):
+        self.move_camera()
+        if self.stepper is None:
+            self.flock.update(None, None)
 
     def display(self):
-        for sprite in self.to_display:
-            sprite.display(self.screen)
-        if params.DEBUG:
+        frame = self.stepper.frame() if self.stepper else None
+        if self.recorder is not None:
+            self.record(frame)
+        self.flock.display(self.screen, self.camera, frame)
+        self.panel.display(self.screen)
+        config = self.flock.config
+        if config.debug and not self.flock.world.wrap:
+            width, height = self.flock.world.size
+            margin = config.box_margin
             pygame.draw.polygon(
                 self.screen, pygame.Color("turquoise"),
-                [
-                    (params.BOX_MARGIN, params.BOX_MARGIN),
-                    (params.SCREEN_WIDTH - params.BOX_MARGIN,
-                        params.BOX_MARGIN),
-                    (params.SCREEN_WIDTH - params.BOX_MARGIN,
-                        params.SCREEN_HEIGHT - params.BOX_MARGIN),
-                    (params.BOX_MARGIN,
-                        params.SCREEN_HEIGHT - params.BOX_MARGIN),
-                ], 1)
+                [tuple(self.camera.to_screen(corner)) for corner in [
+                    (margin, margin),
+                    (width - margin, margin),
+                    (width - margin, height - margin),
+                    (margin, height - margin),
+                ]], 1)
+
+    def check_budget(self, work):
+        """Change fidelity if needed, given the work time of a frame."""
+        if self.budget is None:
+            return
+        cost = work if self.stepper is None else max(work, self.stepper.cost)
+        if self.budget.update(cost):
+            self.renderer_button.select(self.flock.renderer)
+            self.panel.refresh(self.renderer_button)
 
     def init_run(self):
         # add 40 boids to the flock
@@ -75,8 +152,13 @@ class Simulation:
             text="Add entities and get steering !",
             font=params.H3_FONT)
         )
-        self.to_update = pygame.sprite.Group(
-            self.flock,
+        self.renderer_button = gui.ToggleButton(
+            pos=(8.5, 7.5),
+            text="Draw boids as: ",
+            labels=self.flock.renderers,
+            init_label=self.flock.renderer,
+            action=lambda: self.flock.switch_renderer())
+        self.panel = gui.Panel([
             gui.ToggleButton(
                 pos=(0.2, 8),
                 text="Entity : ",
@@ -87,13 +169,20 @@ class Simulation:
                 pos=(0.2, 8.5),
                 text="ADD ENTITY",
                 action=lambda: self.add_element(params.SCREEN_CENTER)),
+            self.renderer_button,
+            gui.ToggleButton(
+                pos=(8.5, 8),
+                text="World edges: ",
+                labels="box wrap".split(),
+                init_label="box wrap".split()[self.flock.world.wrap],
+                action=lambda: self.flock.toggle_wrap()),
             gui.ToggleButton(
                 pos=(8.5, 8.5),
                 text="Show forces, velocities and frame: ",
                 labels="Yes No".split(),
-                init_label="No Yes".split()[params.DEBUG],
+                init_label="No Yes".split()[self.flock.config.debug],
                 action=lambda: self.toggle_debug()),
-        )
+        ])
         # add behaviour toggle buttons
         for k, behaviour in enumerate(self.flock.behaviours):
             # v decorate to prevent a bug
@@ -101,54 +190,64 @@ class Simulation:
             def do_action(self, behaviour):
                 self.toggle_behaviour(behaviour)
             # ^
-            self.to_update.add(gui.ToggleButton(
+            self.panel.add(gui.ToggleButton(
                 pos=(0.2, 0.2 + 0.3 * (1 + k)),
                 text="{}: ".format(behaviour.title()),
                 labels="off on".split(),
                 init_label="off on".split()[self.flock.behaviours[behaviour]],
                 action=do_action)
             )
-        self.to_display = pygame.sprite.Group(
-            self.to_update,
-        )
 
     def run(self):
         key_to_function = {
             pygame.K_ESCAPE:
                 lambda self, event: setattr(self, "running", False),
+            pygame.K_r: lambda self, event: self.toggle_recording(),
         }
         button_to_function = {
             3: lambda self, event: self.add_element(event.pos),
+            4: lambda self, event: self.camera.zoom_at(
+                params.ZOOM_STEP, event.pos),
+            5: lambda self, event: self.camera.zoom_at(
+                1 / params.ZOOM_STEP, event.pos),
         }
         self.init_run()
-        dt = 0
-        while self.running:
-            self.clock.tick(params.FPS)
-            t = time()
-            motion_event, click_event = None, None
-            self.screen.fill(params.SIMULATION_BACKGROUND)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    return "PYGAME_QUIT"
-                elif event.type == pygame.KEYDOWN and \
-                        event.key in key_to_function:
-                    key_to_function[event.key](self, event)
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    click_event = event
-                    if event.button in button_to_function:
-                        button_to_function[event.button](self, event)
-                elif event.type == pygame.MOUSEMOTION:
-                    motion_event = event
-            self.update(motion_event, click_event)
-            self.fps_message.update(dt)
-            self.temp_message.update(motion_event, click_event)
-            self.display()
-            self.fps_message.display(self.screen)
-            if self.temp_message:
-                self.temp_message.sprite.display(self.screen)
-            pygame.display.flip()
-            dt = time() - t
+        if self.stepper:
+            self.stepper.start()
+        try:
+            while self.running:
+                dt = self.pacer.wait()
+                self.check_budget(dt)
+                self.screen.fill(params.SIMULATION_BACKGROUND)
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+                        return "PYGAME_QUIT"
+                    elif event.type == pygame.MOUSEMOTION:
+                        self.panel.handle(event)
+                        continue
+                    with self.lock:
+                        if event.type == pygame.KEYDOWN and \
+                                event.key in key_to_function:
+                            key_to_function[event.key](self, event)
+                        elif event.type == pygame.MOUSEBUTTONDOWN:
+                            self.panel.handle(event)
+                            if event.button in button_to_function:
+                                button_to_function[event.button](
+                                    self, event)
+                self.update()
+                self.fps_message.update(dt)
+                self.temp_message.update(None, None)
+                self.display()
+                self.fps_message.display(self.screen)
+                if self.temp_message:
+                    self.temp_message.sprite.display(self.screen)
+                pygame.display.flip()
+        finally:
+            if self.stepper:
+                self.stepper.stop()
+            if self.recorder is not None:
+                self.recorder.close()
 
     def quit(self):
         self.running = False
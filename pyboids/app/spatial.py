@@ -0,0 +1,715 @@
+"""Spatial indexing of point sets."""
+import numpy as np
+from . import params, utils
+
+
+def ring_offsets(ring):
+    """List the cell offsets at Chebyshev distance ring from the origin."""
+    if ring == 0:
+        return [(0, 0)]
+    side = range(-ring, ring + 1)
+    offsets = [(dx, dy) for dx in (-ring, ring) for dy in side]
+    offsets += [(dx, dy) for dx in side[1:-1] for dy in (-ring, ring)]
+    return offsets
+
+
+def _expand(starts, counts):
+    """Return the indices start, ..., start + count - 1 of each range."""
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + np.arange(counts.sum()) - first
+
+
+class SpatialGrid:
+    """Uniform grid index over a set of 2D points.
+
+    Points are bucketed in square cells. The content of each cell is a
+    slice of one index array sorted by cell key, so queries for many
+    points at once are answered with array operations only.
+
+    In a periodic space the grid covers the whole period, cells are
+    stretched so that a whole number of them fits in it, and distances
+    are measured to the nearest periodic image.
+
+    SpatialGrid(points, cell_size=params.CELL_SIZE, period=None)
+        -> SpatialGrid
+
+    Parameters
+    ----------
+    points : np.array, shape (n, 2)
+    cell_size : float, optional
+        Minimum side of a cell, in pixels. Default is CELL_SIZE.
+    period : np.array, shape (2,), optional
+        Size of the space if it is periodic.
+    """
+
+    def __init__(self, points, cell_size=params.CELL_SIZE, period=None):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.period = period
+        if period is not None:
+            self.period = np.asarray(period, dtype=float)
+            self.shape = np.maximum(
+                np.floor(self.period / cell_size), 1).astype(np.int64)
+            self.cell_size = self.period / self.shape
+            self.origin = np.zeros(2, dtype=np.int64)
+            cells = self.cell_of(self.points)
+        else:
+            self.cell_size = np.full(2, float(cell_size))
+            cells = self.cell_of(self.points)
+            if len(cells):
+                self.origin = cells.min(axis=0)
+                self.shape = cells.max(axis=0) - self.origin + 1
+            else:
+                self.origin = np.zeros(2, dtype=np.int64)
+                self.shape = np.zeros(2, dtype=np.int64)
+        keys = self._keys(cells)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.starts, self.counts = np.unique(
+            keys[self.order], return_index=True, return_counts=True)
+
+    def __len__(self):
+        return len(self.points)
+
+    def cell_of(self, points):
+        """Return the integer cell coordinates of points."""
+        if self.period is not None:
+            points = np.mod(points, self.period)
+        return np.floor(points / self.cell_size).astype(np.int64)
+
+    def _keys(self, cells):
+        """Flatten cell coordinates to keys, -1 for cells off the grid."""
+        local = cells - self.origin
+        if self.period is not None:
+            local = np.mod(local, self.shape)
+        inside = np.all((local >= 0) & (local < self.shape), axis=1)
+        keys = local[:, 0] * self.shape[1] + local[:, 1]
+        keys[~inside] = -1
+        return keys
+
+    def _offsets(self, offsets):
+        """Drop the cell offsets that wrap onto another one."""
+        if self.period is None:
+            return offsets
+        seen, distinct = set(), []
+        for dx, dy in offsets:
+            key = (dx % self.shape[0], dy % self.shape[1])
+            if key not in seen:
+                seen.add(key)
+                distinct.append((dx, dy))
+        return distinct
+
+    def _ring(self, ring):
+        """List the offsets of a ring of cells met for the first time.
+
+        In a periodic grid, outer rings wrap onto cells of inner rings,
+        or onto other cells of the same ring, which are left out.
+        """
+        if self.period is None:
+            return ring_offsets(ring)
+        seen, distinct = set(), []
+        for dx, dy in ring_offsets(ring):
+            key = (dx % self.shape[0], dy % self.shape[1])
+            inner = max(min(key[0], self.shape[0] - key[0]),
+                        min(key[1], self.shape[1] - key[1]))
+            if inner == ring and key not in seen:
+                seen.add(key)
+                distinct.append((dx, dy))
+        return distinct
+
+    def _diff(self, items, points):
+        """Return the offsets from points to items."""
+        return utils.wrap_offsets(self.points[items] - points, self.period)
+
+    def candidates(self, cells, queries):
+        """Return (query, item) pairs for the items lying in given cells.
+
+        Parameters
+        ----------
+        cells : np.array of int, shape (m, 2)
+            One cell per query.
+        queries : np.array of int, shape (m,)
+            Query identifiers, repeated in the output.
+        """
+        if not len(self.keys):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        keys = self._keys(cells)
+        slots = np.minimum(np.searchsorted(self.keys, keys),
+                           len(self.keys) - 1)
+        found = (keys >= 0) & (self.keys[slots] == keys)
+        starts = self.starts[slots[found]]
+        counts = self.counts[slots[found]]
+        items = self.order[_expand(starts, counts)]
+        return np.repeat(queries[found], counts), items
+
+    def query_pairs(self, points, radius):
+        """Return (query, item) pairs closer than radius.
+
+        Parameters
+        ----------
+        points : np.array, shape (m, 2)
+            Query points.
+        radius : float
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        reach = int(np.ceil(radius / self.cell_size.min()))
+        cells = self.cell_of(points)
+        queries = np.arange(len(points))
+        found_q, found_i = [], []
+        offsets = self._offsets([(dx, dy)
+                                 for dx in range(-reach, reach + 1)
+                                 for dy in range(-reach, reach + 1)])
+        for offset in offsets:
+            q, i = self.candidates(cells + offset, queries)
+            d = self._diff(i, points[q])
+            close = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] < radius * radius
+            found_q.append(q[close])
+            found_i.append(i[close])
+        return np.concatenate(found_q), np.concatenate(found_i)
+
+    def query_box(self, lo, hi):
+        """Return the items lying in the cells that overlap a box.
+
+        This is a superset of the items inside the box.
+
+        Parameters
+        ----------
+        lo, hi : np.array, shape (2,)
+            Lower and upper corners of the box.
+        """
+        corners = np.array([lo, hi], dtype=float) / self.cell_size
+        (x0, y0), (x1, y1) = np.floor(corners).astype(np.int64)
+        if self.period is not None:
+            # a box wider than the period covers every column or row
+            x1 = min(x1, x0 + self.shape[0] - 1)
+            y1 = min(y1, y0 + self.shape[1] - 1)
+        else:
+            x0, y0 = np.maximum((x0, y0), self.origin)
+            x1, y1 = np.minimum((x1, y1), self.origin + self.shape - 1)
+        xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+        cells = np.stack([xs.ravel(), ys.ravel()], axis=1)
+        return self.candidates(cells, np.zeros(len(cells), dtype=np.int64))[1]
+
+    def nearest(self, points, exclude=None):
+        """Return the index of the nearest item for each query point.
+
+        Rings of cells are scanned outwards until no unvisited cell can
+        hold a closer item. Returns -1 for the queries with no item.
+
+        Parameters
+        ----------
+        points : np.array, shape (m, 2)
+        exclude : np.array of int, shape (m,), optional
+            One item per query that must not be returned, typically the
+            query itself when the grid indexes the query points.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        best = np.full(len(points), -1, dtype=np.int64)
+        best_d2 = np.full(len(points), np.inf)
+        if not len(self):
+            return best
+        cells = self.cell_of(points)
+        if self.period is not None:
+            limit = np.full(len(points), self.shape.max() // 2)
+        else:
+            local = cells - self.origin
+            limit = np.maximum(np.abs(local),
+                               np.abs(local - (self.shape - 1))).max(axis=1)
+        pending = np.arange(len(points))
+        ring = 0
+        while len(pending):
+            for offset in ring_offsets(ring):
+                q, i = self.candidates(cells[pending] + offset, pending)
+                if exclude is not None:
+                    kept = i != exclude[q]
+                    q, i = q[kept], i[kept]
+                d = self._diff(i, points[q])
+                d2 = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+                # keep the closest candidate per query
+                by_distance = np.lexsort((d2, q))
+                q, i, d2 = q[by_distance], i[by_distance], d2[by_distance]
+                first = np.ones(len(q), dtype=bool)
+                first[1:] = q[1:] != q[:-1]
+                q, i, d2 = q[first], i[first], d2[first]
+                closer = d2 < best_d2[q]
+                best[q[closer]] = i[closer]
+                best_d2[q[closer]] = d2[closer]
+            reach = ring * self.cell_size.min()
+            pending = pending[(best_d2[pending] > reach * reach) &
+                              (limit[pending] > ring)]
+            ring += 1
+        return best
+
+    def nearest_k(self, points, k, exclude=None, max_ring=None):
+        """Return the k nearest items of each query point, closest first.
+
+        Rings of cells are scanned outwards as in nearest(), the first
+        two at once.
+
+        Parameters
+        ----------
+        points : np.array, shape (m, 2)
+        k : int
+        exclude : np.array of int, shape (m,), optional
+            One item per query that must not be returned.
+        max_ring : int, optional
+            Last ring scanned, at least 1. Items farther than max_ring
+            cells may then be missed.
+
+        Returns
+        -------
+        items : np.array of int, shape (m, k)
+            -1 past the last item of queries with fewer than k items.
+        d2 : np.array, shape (m, k)
+            Squared distances to the items, inf past the last item.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        best = np.full((len(points), k), -1, dtype=np.int64)
+        best_d2 = np.full((len(points), k), np.inf)
+        if not len(self) or not k:
+            return best, best_d2
+        cells = self.cell_of(points)
+        if self.period is not None:
+            limit = np.full(len(points), self.shape.max() // 2)
+        else:
+            local = cells - self.origin
+            limit = np.maximum(np.abs(local),
+                               np.abs(local - (self.shape - 1))).max(axis=1)
+        pending = np.arange(len(points))
+        ring = 1
+        while len(pending):
+            # candidates of each pending query, after its best items
+            local = np.arange(len(pending))
+            filled = np.full(len(pending), k)
+            columns, found = [], []
+            offsets = self._ring(ring)
+            if ring == 1:
+                offsets = self._ring(0) + offsets
+            for offset in offsets:
+                q, i = self.candidates(cells[pending] + offset, local)
+                if exclude is not None:
+                    kept = i != exclude[pending[q]]
+                    q, i = q[kept], i[kept]
+                counts = np.bincount(q, minlength=len(pending))
+                starts = np.cumsum(counts) - counts
+                columns.append(filled[q] + np.arange(len(q)) - starts[q])
+                found.append((q, i))
+                filled += counts
+            d2 = np.full((len(pending), filled.max()), np.inf)
+            items = np.full(d2.shape, -1, dtype=np.int64)
+            d2[:, :k], items[:, :k] = best_d2[pending], best[pending]
+            for column, (q, i) in zip(columns, found):
+                d = self._diff(i, points[pending[q]])
+                d2[q, column] = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+                items[q, column] = i
+            # keep the k closest items per query
+            if d2.shape[1] > k:
+                top = np.argpartition(d2, k - 1, axis=1)[:, :k]
+                d2 = np.take_along_axis(d2, top, axis=1)
+                items = np.take_along_axis(items, top, axis=1)
+            by_distance = np.argsort(d2, axis=1)
+            best_d2[pending] = np.take_along_axis(d2, by_distance, axis=1)
+            best[pending] = np.take_along_axis(items, by_distance, axis=1)
+            reach = ring * self.cell_size.min()
+            pending = pending[(best_d2[pending, -1] > reach * reach) &
+                              (limit[pending] > ring)]
+            if ring == max_ring:
+                break
+            ring += 1
+        return best, best_d2
+
+
+class NeighbourList:
+    """Verlet neighbour list over a set of moving points.
+
+    Candidate pairs closer than radius + skin are cached and reused from
+    step to step. The list is rebuilt only once some point has moved by
+    more than skin / 2 since the last build, as no pair can have come
+    within radius before that.
+
+    NeighbourList(radius, skin=params.NEIGHBOUR_SKIN, period=None)
+        -> NeighbourList
+
+    Parameters
+    ----------
+    radius : float
+        Largest interaction radius the list must serve.
+    skin : float, optional
+        Extra distance kept in the candidate pairs. 0 rebuilds the list
+        at every step. Default is NEIGHBOUR_SKIN.
+    period : np.array, shape (2,), optional
+        Size of the space if it is periodic. Call invalidate() after
+        changing it.
+
+    Attributes
+    ----------
+    builds : int
+        Number of times the candidate pairs were rebuilt.
+    updates : int
+        Number of calls to update().
+    grid : SpatialGrid
+        Index of the positions at the last build.
+    drift : float
+        Largest displacement since the last build, as of the last update.
+    """
+
+    def __init__(self, radius, skin=params.NEIGHBOUR_SKIN, period=None):
+        self.radius = radius
+        self.skin = skin
+        self.period = period
+        self.builds = 0
+        self.updates = 0
+        self.ref_pos = None
+        self.grid = None
+        self.drift = 0.
+        self.candidates = (np.zeros(0, dtype=np.int64),) * 2
+        self.i = self.j = self.candidates[0]
+        self.offset = np.zeros((0, 2))
+        self.d2 = np.zeros(0)
+
+    @property
+    def rebuild_rate(self):
+        """Fraction of updates that rebuilt the candidate pairs."""
+        return self.builds / self.updates if self.updates else 0.
+
+    def invalidate(self):
+        """Force a rebuild at the next update."""
+        self.ref_pos = None
+
+    def needs_rebuild(self, pos):
+        if self.ref_pos is None or len(self.ref_pos) != len(pos):
+            return True
+        moved = utils.wrap_offsets(pos - self.ref_pos, self.period)
+        self.drift = np.sqrt((moved[:, 0] * moved[:, 0] +
+                              moved[:, 1] * moved[:, 1]).max(initial=0))
+        return 2 * self.drift > self.skin
+
+    def rebuild(self, pos):
+        reach = self.radius + self.skin
+        self.grid = SpatialGrid(pos, cell_size=max(reach, 1),
+                                period=self.period)
+        i, j = self.grid.query_pairs(pos, reach)
+        distinct = i != j
+        self.candidates = (i[distinct], j[distinct])
+        self.ref_pos = pos.copy()
+        self.drift = 0.
+        self.builds += 1
+
+    def update(self, pos):
+        """Refresh the pairs for the current positions.
+
+        Parameters
+        ----------
+        pos : np.array, shape (n, 2)
+        """
+        if self.needs_rebuild(pos):
+            self.rebuild(pos)
+        self.updates += 1
+        i, j = self.candidates
+        self.offset = utils.wrap_offsets(pos[j] - pos[i], self.period)
+        self.d2 = (self.offset[:, 0] * self.offset[:, 0] +
+                   self.offset[:, 1] * self.offset[:, 1])
+        close = self.d2 < self.radius * self.radius
+        self.i, self.j = i[close], j[close]
+        self.offset, self.d2 = self.offset[close], self.d2[close]
+
+    def measure(self, pos):
+        """Measure the current pairs again at new positions.
+
+        No pair is searched for, so pairs that came within radius since
+        the last update are missed.
+        """
+        self.offset = utils.wrap_offsets(pos[self.j] - pos[self.i],
+                                         self.period)
+        self.d2 = (self.offset[:, 0] * self.offset[:, 0] +
+                   self.offset[:, 1] * self.offset[:, 1])
+
+    def within(self, radius):
+        """Return the (i, j, pos[j] - pos[i]) of pairs closer than radius.
+
+        Both (i, j) and (j, i) are listed. radius must not exceed the
+        radius of the list.
+        """
+        close = self.d2 < radius * radius
+        return self.i[close], self.j[close], self.offset[close]
+
+
+class KNearestList:
+    """Pairs of each point with its k nearest neighbours.
+
+    The topological counterpart of NeighbourList: the number of
+    neighbours of a point does not depend on the local density, which
+    bounds the work per point. Neighbours are searched again at every
+    update, on a grid refined until a point shares its cell with about
+    KNN_OCCUPANCY * k others on average.
+
+    KNearestList(k, radius, period=None) -> KNearestList
+
+    Parameters
+    ----------
+    k : int
+        Number of neighbours of each point.
+    radius : float
+        Largest interaction radius the list serves, for callers that
+        default to it.
+    period : np.array, shape (2,), optional
+        Size of the space if it is periodic.
+
+    Attributes
+    ----------
+    builds, updates : int
+        Number of calls to update(), both counted for compatibility
+        with NeighbourList.
+    grid : SpatialGrid
+        Index of the positions at the last update.
+    """
+
+    drift = 0.
+
+    def __init__(self, k, radius, period=None):
+        self.k = k
+        self.radius = radius
+        self.period = period
+        self.builds = 0
+        self.updates = 0
+        self.ref_pos = None
+        self.grid = None
+        self.candidates = (np.zeros(0, dtype=np.int64),) * 2
+        self.i = self.j = self.candidates[0]
+        self.offset = np.zeros((0, 2))
+        self.d2 = np.zeros(0)
+
+    @property
+    def rebuild_rate(self):
+        return 1. if self.updates else 0.
+
+    def invalidate(self):
+        self.ref_pos = None
+
+    def _cell_size(self, pos):
+        """Return the cell size holding about KNN_OCCUPANCY * k points."""
+        n = max(len(pos), 1)
+        cell_size = np.sqrt(np.prod(np.maximum(self._extent(pos), 1)) *
+                            self.k / n)
+        while cell_size > 1:
+            grid = SpatialGrid(pos, cell_size=cell_size, period=self.period)
+            # mean number of points in the cell of a point
+            occupancy = np.sum(grid.counts * grid.counts) / n
+            if occupancy <= params.KNN_OCCUPANCY * self.k:
+                break
+            cell_size /= 2
+        return cell_size
+
+    def _extent(self, pos):
+        if self.period is not None:
+            return self.period
+        if len(pos):
+            return np.ptp(pos, axis=0)
+        return np.ones(2)
+
+    def update(self, pos):
+        """Search the neighbours of the current positions.
+
+        Points whose neighbours are not within the next ring of cells
+        are searched again on a grid three times as coarse, so that
+        dense and sparse regions both scan few cells.
+
+        Parameters
+        ----------
+        pos : np.array, shape (n, 2)
+        """
+        n = len(pos)
+        items = np.full((n, self.k), -1, dtype=np.int64)
+        cell_size = self._cell_size(pos)
+        widest = self._extent(pos).max()
+        pending = np.arange(n)
+        while len(pending):
+            self.grid = SpatialGrid(pos, cell_size=cell_size,
+                                    period=self.period)
+            last = cell_size >= widest
+            found, d2 = self.grid.nearest_k(
+                pos[pending], self.k, exclude=pending,
+                max_ring=None if last else 1)
+            reach = self.grid.cell_size.min()
+            done = last | (d2[:, -1] <= reach * reach)
+            items[pending[done]] = found[done]
+            pending = pending[~done]
+            cell_size *= 3
+        i = np.repeat(np.arange(n), self.k)
+        j = items.ravel()
+        found = j >= 0
+        self.i, self.j = i[found], j[found]
+        self.candidates = (self.i, self.j)
+        self.offset = utils.wrap_offsets(pos[self.j] - pos[self.i],
+                                         self.period)
+        self.d2 = (self.offset[:, 0] * self.offset[:, 0] +
+                   self.offset[:, 1] * self.offset[:, 1])
+        self.ref_pos = pos.copy()
+        self.builds += 1
+        self.updates += 1
+
+    def measure(self, pos):
+        """Measure the current pairs again at new positions.
+
+        No pair is searched for, so points that became nearest
+        neighbours since the last update are missed.
+        """
+        self.offset = utils.wrap_offsets(pos[self.j] - pos[self.i],
+                                         self.period)
+        self.d2 = (self.offset[:, 0] * self.offset[:, 0] +
+                   self.offset[:, 1] * self.offset[:, 1])
+
+    def within(self, radius):
+        """Return the (i, j, pos[j] - pos[i]) of pairs closer than radius.
+
+        j is one of the k nearest neighbours of i, which does not imply
+        the converse.
+        """
+        close = self.d2 < radius * radius
+        return self.i[close], self.j[close], self.offset[close]
+
+
+class BoxIndex:
+    """Uniform grid index over axis-aligned boxes that move.
+
+    Each box is listed once per cell it overlaps, in entry arrays kept
+    sorted by cell key. Moving boxes only re-indexes those that changed
+    cells, and merging their new entries into the sorted arrays is cheap
+    as the sort is stable.
+
+    BoxIndex(cell_size=params.CELL_SIZE, period=None) -> BoxIndex
+
+    Parameters
+    ----------
+    cell_size : float, optional
+        Minimum side of a cell, in pixels. Default is CELL_SIZE.
+    period : np.array, shape (2,), optional
+        Size of the space if it is periodic.
+
+    Attributes
+    ----------
+    lo, hi : np.array, shape (m, 2)
+        Corners of the boxes, by item.
+    reindexed : int
+        Number of times a box was re-indexed after a move.
+    """
+
+    def __init__(self, cell_size=params.CELL_SIZE, period=None):
+        self.period = period
+        if period is not None:
+            self.period = np.asarray(period, dtype=float)
+            self.shape = np.maximum(
+                np.floor(self.period / cell_size), 1).astype(np.int64)
+            self.cell_size = self.period / self.shape
+        else:
+            self.cell_size = np.full(2, float(cell_size))
+        self.lo = self.hi = np.zeros((0, 2))
+        self.cell_lo = self.cell_hi = np.zeros((0, 2), dtype=np.int64)
+        self.keys = self.items = np.zeros(0, dtype=np.int64)
+        self.reindexed = 0
+
+    def __len__(self):
+        return len(self.lo)
+
+    def _cells(self, lo, hi):
+        """Return the lowest and highest cells overlapped by boxes."""
+        cell_lo = np.floor(lo / self.cell_size).astype(np.int64)
+        cell_hi = np.floor(hi / self.cell_size).astype(np.int64)
+        if self.period is not None:
+            # a box wider than the period covers every column or row
+            cell_hi = np.minimum(cell_hi, cell_lo + self.shape - 1)
+        return cell_lo, cell_hi
+
+    def _keys(self, cells):
+        if self.period is not None:
+            cells = np.mod(cells, self.shape)
+            return cells[:, 0] * self.shape[1] + cells[:, 1]
+        return (cells[:, 0] << 32) + (cells[:, 1] & 0xffffffff)
+
+    def _entries(self, ids, cell_lo, cell_hi):
+        """Return (key, id) for every cell of every box."""
+        extent = cell_hi - cell_lo + 1
+        counts = extent[:, 0] * extent[:, 1]
+        rows = np.repeat(np.arange(len(ids)), counts)
+        k = _expand(np.zeros(len(ids), dtype=np.int64), counts)
+        cells = cell_lo[rows] + np.stack(
+            [k // extent[rows, 1], k % extent[rows, 1]], axis=1)
+        return self._keys(cells), np.asarray(ids)[rows]
+
+    def _merge(self, keys, items):
+        keys = np.concatenate([self.keys, keys])
+        items = np.concatenate([self.items, items])
+        order = np.argsort(keys, kind='mergesort')
+        self.keys, self.items = keys[order], items[order]
+
+    def add(self, lo, hi):
+        """Index new boxes and return their items.
+
+        Parameters
+        ----------
+        lo, hi : np.array, shape (m, 2)
+        """
+        lo = np.asarray(lo, dtype=float).reshape(-1, 2)
+        hi = np.asarray(hi, dtype=float).reshape(-1, 2)
+        ids = np.arange(len(self), len(self) + len(lo))
+        cell_lo, cell_hi = self._cells(lo, hi)
+        self.lo = np.concatenate([self.lo, lo])
+        self.hi = np.concatenate([self.hi, hi])
+        self.cell_lo = np.concatenate([self.cell_lo, cell_lo])
+        self.cell_hi = np.concatenate([self.cell_hi, cell_hi])
+        self._merge(*self._entries(ids, cell_lo, cell_hi))
+        return ids
+
+    def move(self, items, lo, hi):
+        """Update the corners of some boxes.
+
+        Only the boxes that changed cells are re-indexed.
+
+        Parameters
+        ----------
+        items : np.array of int, shape (m,)
+        lo, hi : np.array, shape (m, 2)
+        """
+        self.lo[items] = lo
+        self.hi[items] = hi
+        cell_lo, cell_hi = self._cells(self.lo[items], self.hi[items])
+        changed = np.any((cell_lo != self.cell_lo[items]) |
+                         (cell_hi != self.cell_hi[items]), axis=1)
+        if not changed.any():
+            return
+        items = np.asarray(items)[changed]
+        self.cell_lo[items] = cell_lo[changed]
+        self.cell_hi[items] = cell_hi[changed]
+        kept = ~np.isin(self.items, items)
+        self.keys, self.items = self.keys[kept], self.items[kept]
+        self._merge(*self._entries(items, cell_lo[changed],
+                                   cell_hi[changed]))
+        self.reindexed += len(items)
+
+    def query(self, lo, hi):
+        """Return the (query, item) pairs of overlapping boxes.
+
+        Parameters
+        ----------
+        lo, hi : np.array, shape (q, 2)
+            Corners of the query boxes.
+        """
+        lo = np.asarray(lo, dtype=float).reshape(-1, 2)
+        hi = np.asarray(hi, dtype=float).reshape(-1, 2)
+        keys, queries = self._entries(np.arange(len(lo)), *self._cells(lo, hi))
+        starts = np.searchsorted(self.keys, keys)
+        counts = np.searchsorted(self.keys, keys, side='right') - starts
+        queries = np.repeat(queries, counts)
+        items = self.items[_expand(starts, counts)]
+        # keep the boxes that overlap, not just share a cell
+        center = (lo[queries] + hi[queries]) / 2
+        gap = np.abs(utils.wrap_offsets(
+            (self.lo[items] + self.hi[items]) / 2 - center, self.period))
+        overlap = np.all(2 * gap <= (hi[queries] - lo[queries]) +
+                         (self.hi[items] - self.lo[items]), axis=1)
+        queries, items = queries[overlap], items[overlap]
+        # a pair sharing several cells is found once per cell
+        order = np.lexsort((items, queries))
+        queries, items = queries[order], items[order]
+        first = np.ones(len(queries), dtype=bool)
+        first[1:] = (queries[1:] != queries[:-1]) | (items[1:] != items[:-1])
+        return queries[first], items[first]
@@ -0,0 +1,149 @@
+"""Startup profiling, with a cold-start benchmark.
+
+Each run starts a fresh interpreter which imports the app and opens the
+menu on the dummy video driver, as main.py does. Time spent per module
+import comes from python -X importtime, and time spent per font load
+and image decode from assets.LOAD_TIMES.
+
+From the pyboids directory:
+
+    python -m app.startup --pack  # build the asset bundle
+    python -m app.startup --runs 10
+    python -m app.startup --runs 10 --no-bundle
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from . import assets, params, settings
+
+IMAGES = ['boids-logo.png', 'normal-boid.png', 'leader-boid.png',
+          'obstacle-circle.png']
+
+# run in a fresh interpreter, timing what main.py does before its loop
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.Menu()
+opened = time.perf_counter()
+from app import assets
+print(json.dumps({"import": imported - start, "menu": opened - imported,
+                  "assets": assets.LOAD_TIMES}))
+'''
+
+
+def pack():
+    """Build the asset bundle from the images and fonts of the app."""
+    assets.pack(IMAGES, list(params.FONT_FILES.values()))
+
+
+def import_times(lines):
+    """Return the own import time of each module, in seconds.
+
+    Parameters
+    ----------
+    lines : list of str
+        Output of python -X importtime.
+    """
+    times = {}
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        if own.strip().isdigit():
+            times[name.strip()] = int(own) / 1e6
+    return times
+
+
+def profile(bundle=True):
+    """Start the app in a fresh interpreter and return its timings.
+
+    Returns
+    -------
+    timings : dict
+        Wall time of the whole start, including the interpreter, time to
+        import the app and to open the menu, own import time of each
+        module, and (type, name, seconds) of each asset load.
+    """
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy',
+               PYBOIDS_ASSET_BUNDLE='1' if bundle else '0',
+               PYGAME_HIDE_SUPPORT_PROMPT='1')
+    start = time.perf_counter()
+    child = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD], env=env,
+        cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    wall = time.perf_counter() - start
+    timings = json.loads(child.stdout.splitlines()[-1])
+    timings['wall'] = wall
+    timings['modules'] = import_times(child.stderr.splitlines())
+    return timings
+
+
+def package(module):
+    """Return the top-level package of a module, or the app module."""
+    if module.startswith('app.'):
+        return module
+    return module.split('.')[0]
+
+
+def report(runs, top=10):
+    """Return the median timings of several runs, as lines of text."""
+    def ms(values):
+        return '{:8.1f} ms'.format(1000 * np.median(values))
+    lines = ['{} cold starts, median times:'.format(len(runs)),
+             '  wall          {}'.format(ms([run['wall'] for run in runs])),
+             '  import app    {}'.format(ms([run['import'] for run in runs])),
+             '  open menu     {}'.format(ms([run['menu'] for run in runs]))]
+    packages = {}
+    for run in runs:
+        totals = {}
+        for module, seconds in run['modules'].items():
+            name = package(module)
+            totals[name] = totals.get(name, 0) + seconds
+        for name, seconds in totals.items():
+            packages.setdefault(name, []).append(seconds)
+    lines.append('imports, own time by package:')
+    ranked = sorted(packages, key=lambda name: -np.median(packages[name]))
+    for name in ranked[:top]:
+        lines.append('  {:30} {}'.format(name, ms(packages[name])))
+    loads, counts = {}, {}
+    for run in runs:
+        totals = {}
+        for kind, name, seconds in run['assets']:
+            totals[kind, name] = totals.get((kind, name), 0) + seconds
+            counts[kind, name] = counts.get((kind, name), 0) + 1
+        for asset, seconds in totals.items():
+            loads.setdefault(asset, []).append(seconds)
+    lines.append('asset loads, total by asset:')
+    for (kind, name), seconds in sorted(loads.items()):
+        lines.append('  {:6} {:23} {} x{}'.format(
+            kind, name, ms(seconds), counts[kind, name] // len(runs)))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--no-bundle', action='store_true',
+                        help='load assets from their files')
+    parser.add_argument('--pack', action='store_true',
+                        help='build the asset bundle and exit')
+    args = parser.parse_args()
+    if args.pack:
+        pack()
+        print('packed assets in {}'.format(settings.ASSET_BUNDLE))
+        return
+    runs = [profile(bundle=not args.no_bundle) for _ in range(args.runs)]
+    print('\n'.join(report(runs)))
+
+
+if __name__ == '__main__':
+    main()
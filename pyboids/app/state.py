@@ -0,0 +1,149 @@
+"""Array storage for the state of boids."""
+import numpy as np
+
+
+class FlockState:
+    """Contiguous arrays holding the kinematic state of a set of boids.
+
+    Rows are appended as boids join and are never reordered, so the row
+    index of a boid is stable for its whole lifetime. Storage grows by
+    doubling; the public attributes are views of the used rows, and
+    assigning to them writes in place.
+
+    Positions, velocities, steering forces and masses are stored with a
+    given floating point type. Wandering angles, which accumulate small
+    turns over the whole run, are always stored in double precision.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Number of rows allocated up front. Default is 64.
+    dtype : np.dtype, optional
+        Default is float64.
+    """
+
+    def __init__(self, capacity=64, dtype=float):
+        self.size = 0
+        self._pos = np.zeros((capacity, 2), dtype=dtype)
+        self._vel = np.zeros((capacity, 2), dtype=dtype)
+        self._steering = np.zeros((capacity, 2), dtype=dtype)
+        self._mass = np.zeros(capacity, dtype=dtype)
+        self._leader = np.zeros(capacity, dtype=bool)
+        self._wander = np.zeros(capacity)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def pos(self):
+        return self._pos[:self.size]
+
+    @pos.setter
+    def pos(self, value):
+        self._pos[:self.size] = value
+
+    @property
+    def vel(self):
+        return self._vel[:self.size]
+
+    @vel.setter
+    def vel(self, value):
+        self._vel[:self.size] = value
+
+    @property
+    def steering(self):
+        return self._steering[:self.size]
+
+    @steering.setter
+    def steering(self, value):
+        self._steering[:self.size] = value
+
+    @property
+    def mass(self):
+        return self._mass[:self.size]
+
+    @mass.setter
+    def mass(self, value):
+        self._mass[:self.size] = value
+
+    @property
+    def leader(self):
+        return self._leader[:self.size]
+
+    @leader.setter
+    def leader(self, value):
+        self._leader[:self.size] = value
+
+    @property
+    def wander(self):
+        """Wandering angles, in radians."""
+        return self._wander[:self.size]
+
+    @wander.setter
+    def wander(self, value):
+        self._wander[:self.size] = value
+
+    @property
+    def dtype(self):
+        return self._pos.dtype
+
+    def cast(self, dtype):
+        """Convert the floating point storage to another type, in place."""
+        if np.dtype(dtype) == self.dtype:
+            return
+        for name in ('_pos', '_vel', '_steering', '_mass'):
+            setattr(self, name, getattr(self, name).astype(dtype))
+
+    def _grow(self):
+        capacity = max(1, 2 * len(self._mass))
+        for name in ('_pos', '_vel', '_steering', '_mass', '_leader',
+                     '_wander'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def extend(self, pos, vel, mass, leader=False, wander=0.):
+        """Add rows at once and return their indices.
+
+        Parameters
+        ----------
+        pos, vel : np.array, shape (n, 2)
+        mass, leader, wander : np.array, shape (n,), or scalars
+        """
+        n = len(pos)
+        while self.size + n > len(self._mass):
+            self._grow()
+        rows = np.arange(self.size, self.size + n)
+        self.size += n
+        self.pos[rows] = pos
+        self.vel[rows] = vel
+        self.steering[rows] = 0.
+        self.mass[rows] = mass
+        self.leader[rows] = leader
+        self.wander[rows] = wander
+        return rows
+
+    def append(self, pos, vel, mass, leader=False, wander=0.):
+        """Add a row and return its index.
+
+        Parameters
+        ----------
+        pos : np.array
+        vel : np.array
+        mass : float
+        leader : bool, optional
+        wander : float, optional
+            Wandering angle, in radians.
+        """
+        if self.size == len(self._mass):
+            self._grow()
+        i = self.size
+        self._pos[i] = pos
+        self._vel[i] = vel
+        self._steering[i] = 0.
+        self._mass[i] = mass
+        self._leader[i] = leader
+        self._wander[i] = wander
+        self.size += 1
+        return i
@@ -0,0 +1,157 @@
+"""Background update of a flock, double-buffered for drawing."""
+import threading
+import time
+import numpy as np
+from . import params
+from .pacing import FramePacer
+
+
+class Frame:
+    """A copy of what a flock draws, taken between two updates.
+
+    Frame() -> Frame
+
+    Attributes
+    ----------
+    pos, vel, steering : np.array, shape (n, 2)
+        State of the boids.
+    obstacles : list of (Shape, np.array)
+        Each obstacle with its position.
+    lo, hi : np.array, shape (len(obstacles), 2)
+        Corners of the bounding box of each obstacle.
+    hotspots : np.array or None
+        Counts of the hot spot overlay, in debug mode only.
+    step : int
+        Number of updates of the flock when the copy was taken.
+    """
+
+    def __init__(self):
+        self._state = np.zeros((0, 3, 2))
+        self.pos = self.vel = self.steering = np.zeros((0, 2))
+        self.obstacles = []
+        self.lo = self.hi = np.zeros((0, 2))
+        self.hotspots = None
+        self.step = 0
+
+    def capture(self, flock):
+        """Copy the state of a flock, reusing the arrays of the frame."""
+        state = flock.state
+        n = len(state)
+        if len(self._state) < n:
+            self._state = np.zeros((2 * n, 3, 2))
+        arrays = self._state[:n]
+        arrays[:, 0], arrays[:, 1], arrays[:, 2] = \
+            state.pos, state.vel, state.steering
+        self.pos, self.vel, self.steering = \
+            arrays[:, 0], arrays[:, 1], arrays[:, 2]
+        obstacle_map = flock.obstacle_map
+        self.obstacles = [(obstacle, obstacle.pos)
+                          for obstacle in obstacle_map.obstacles]
+        for k in obstacle_map.moving:
+            obstacle = obstacle_map.obstacles[k]
+            self.obstacles[k] = (obstacle, obstacle.pos.copy())
+        self.lo, self.hi = obstacle_map.lo.copy(), obstacle_map.hi.copy()
+        self.hotspots = None
+        self.step = flock.steps
+        if flock.config.debug:
+            self.hotspots = \
+                flock.hotspots.frame[params.HOTSPOT_OVERLAY].copy()
+
+    def visible(self, lo, hi):
+        """Return the rows of the boids inside a box of the world."""
+        inside = np.all((self.pos >= lo) & (self.pos <= hi), axis=1)
+        return np.flatnonzero(inside)
+
+    def visible_obstacles(self, lo, hi):
+        """Return the obstacles, with positions, overlapping a box."""
+        overlap = np.all((self.lo <= hi) & (self.hi >= lo), axis=1)
+        return [self.obstacles[k] for k in np.flatnonzero(overlap)]
+
+
+class Stepper:
+    """Updates a flock on a background thread.
+
+    After each update, the flock is copied to a back frame. Drawing uses
+    the front frame, which is swapped with the back one once a new copy
+    is complete, so that a slow update does not hold up the display.
+    The update runs mostly in NumPy, which releases the GIL.
+
+    Stepper(flock, fps=params.FPS) -> Stepper
+
+    Parameters
+    ----------
+    flock : Flock
+    fps : float, optional
+        Number of updates per second. Default is FPS.
+
+    Attributes
+    ----------
+    lock : threading.Lock
+        Held during updates: hold it to change the flock.
+    steps : int
+        Number of updates done.
+    """
+
+    def __init__(self, flock, fps=params.FPS):
+        self.flock = flock
+        self.lock = threading.Lock()
+        self.pacer = FramePacer(fps)
+        self.frames = [Frame(), Frame()]
+        self.swap = threading.Lock()
+        self.ready = False
+        self.running = False
+        self.thread = None
+        self.steps = 0
+        self.last = 0.
+        self.started = None
+
+    def start(self):
+        """Start updating the flock."""
+        with self.lock:
+            self.frames[0].capture(self.flock)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop updating the flock, once the current update is done."""
+        self.running = False
+        self.pacer.wake()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    @property
+    def cost(self):
+        """Duration of the last update, or of the current one if longer.
+
+        In seconds.
+        """
+        started = self.started
+        if started is None:
+            return self.last
+        return max(self.last, time.perf_counter() - started)
+
+    def _run(self):
+        while self.running:
+            self.pacer.wait()
+            if not self.running:
+                break
+            with self.lock:
+                self.started = time.perf_counter()
+                self.flock.update(None, None)
+                self.last = time.perf_counter() - self.started
+                self.started = None
+                with self.swap:
+                    self.frames[1].capture(self.flock)
+                    self.ready = True
+                self.flock.reset_frame()
+            self.steps += 1
+
+    def frame(self):
+        """Return the last complete frame."""
+        with self.swap:
+            if self.ready:
+                self.frames.reverse()
+                self.ready = False
+        return self.frames[0]
@@ -0,0 +1,234 @@
+"""Parameter sweeps over headless simulations.
+
+Each parameter set runs in a worker process with its own Config, and
+its summary metrics are cached on disk under a hash
+of the parameters and of the run setup, so that rerunning a sweep only
+computes the new points.
+
+From the pyboids directory:
+
+    python -m app.sweep ALIGN_RADIUS=100,200 SEPARATION_DIST=30,70 \\
+        --on align --on separate --boids 300 --steps 500 --out sweep.csv
+"""
+import argparse
+import ast
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pygame
+
+from . import params, settings, metrics
+from .config import PARAMETERS, configured
+from .flock import Flock
+from .obstacle import Obstacle
+
+METRICS = ['nearest_distance', 'polarization', 'obstacle_hits',
+           'steps_per_sec']
+
+
+def grid(**values):
+    """Return every combination of parameter values.
+
+    grid(ALIGN_RADIUS=[100, 200], WANDER_ANGLE=[1, 5]) -> list of dict
+    """
+    names = sorted(values)
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*(values[n] for n in names))]
+
+
+def sample(n, seed=0, **ranges):
+    """Return n parameter sets drawn uniformly from (low, high) ranges.
+
+    sample(10, ALIGN_RADIUS=(50, 300)) -> list of dict
+    """
+    rng = np.random.RandomState(seed)
+    return [{name: float(rng.uniform(*ranges[name]))
+             for name in sorted(ranges)}
+            for _ in range(n)]
+
+
+def check(overrides):
+    """Raise a ValueError for names that are not simulation parameters."""
+    unknown = [name for name in overrides
+               if not name.isupper() or name.lower() not in PARAMETERS]
+    if unknown:
+        raise ValueError('unknown parameters: {}'.format(', '.join(unknown)))
+
+
+def run_key(overrides, setup):
+    """Return the cache key of a run."""
+    blob = json.dumps({'params': overrides, 'setup': setup}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def run(overrides, boids=200, obstacles=5, steps=300, sample_every=10,
+        seed=0, behaviours=None):
+    """Run one headless simulation and return its summary metrics.
+
+    Parameters
+    ----------
+    overrides : dict
+        Parameter values of the run, by upper case params name.
+    boids, obstacles : int, optional
+        Number of entities, placed uniformly at random in the world.
+    steps : int, optional
+    sample_every : int, optional
+        Number of steps between two samples of the metrics.
+    seed : int, optional
+    behaviours : dict, optional
+        Behaviour switches overriding the flock's defaults.
+
+    Returns
+    -------
+    metrics : dict
+        Mean nearest-neighbour distance and polarization over the
+        samples, total number of boid-obstacle overlaps at the samples,
+        and update rate.
+    """
+    np.random.seed(seed)
+    config = configured(overrides)
+    flock = Flock(config, seed=seed)
+    world = flock.world
+    flock.behaviours.update(behaviours or {})
+    for pos in np.random.rand(boids, 2) * world.size:
+        flock.add_element(pos)
+    for pos in np.random.rand(obstacles, 2) * world.size:
+        flock.add_obstacle(
+            Obstacle(pos=pos, radius=config.obstacle_default_radius))
+    distances, polarizations, hits = [], [], 0
+    elapsed = 0.
+    for step in range(1, steps + 1):
+        start = time.perf_counter()
+        flock.update(None, None)
+        flock.reset_frame()
+        elapsed += time.perf_counter() - start
+        if step % sample_every == 0:
+            s = flock.state
+            distances.append(
+                metrics.nearest_distances(s.pos, world.period).mean())
+            polarizations.append(metrics.polarization(s.vel))
+            hits += metrics.obstacle_hits(s.pos, flock.obstacle_map)
+    return {
+        'nearest_distance': float(np.mean(distances)),
+        'polarization': float(np.mean(polarizations)),
+        'obstacle_hits': hits,
+        'steps_per_sec': steps / elapsed,
+    }
+
+
+def _init_worker():
+    # images can only be converted once a display mode is set
+    pygame.display.set_mode((1, 1))
+
+
+def _run_job(job):
+    overrides, setup = job
+    return run(overrides, **setup)
+
+
+def sweep(param_sets, processes=None, cache_dir=settings.SWEEP_CACHE_DIR,
+          **setup):
+    """Run a simulation per parameter set and return a table of results.
+
+    Parameters
+    ----------
+    param_sets : list of dict
+        As returned by grid() or sample().
+    processes : int, optional
+        Size of the process pool. Default is N_CPU.
+    cache_dir : str, optional
+        Where results are cached, None to disable the cache.
+        Default is SWEEP_CACHE_DIR.
+    **setup
+        Keyword arguments of run(), shared by all runs.
+
+    Returns
+    -------
+    rows : list of dict
+        One row per parameter set, with its key, parameters and metrics.
+    """
+    for overrides in param_sets:
+        check(overrides)
+    keys = [run_key(overrides, setup) for overrides in param_sets]
+    results = {}
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        for key in keys:
+            path = os.path.join(cache_dir, key + '.json')
+            if os.path.exists(path):
+                with open(path) as f:
+                    results[key] = json.load(f)
+    todo = {key: overrides for key, overrides in zip(keys, param_sets)
+            if key not in results}
+    if todo:
+        # workers must not open a window nor inherit this process' display
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        context = multiprocessing.get_context('spawn')
+        pool = context.Pool(processes or params.N_CPU,
+                            initializer=_init_worker)
+        try:
+            jobs = [(overrides, setup) for overrides in todo.values()]
+            for key, result in zip(todo, pool.map(_run_job, jobs)):
+                results[key] = result
+                if cache_dir is not None:
+                    path = os.path.join(cache_dir, key + '.json')
+                    with open(path, 'w') as f:
+                        json.dump(result, f)
+        finally:
+            # SDL catches SIGTERM in the workers, so pool.terminate() would
+            # wait for them forever: let them exit on their own instead
+            pool.close()
+            pool.join()
+    return [dict(key=key, **overrides, **results[key])
+            for key, overrides in zip(keys, param_sets)]
+
+
+def write_table(rows, path):
+    """Write sweep results to a CSV file."""
+    fields = []
+    for row in rows:
+        fields += [name for name in row if name not in fields]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        'values', nargs='+', metavar='NAME=V1,V2,...',
+        help='values of a parameter; the sweep runs their combinations')
+    parser.add_argument('--boids', type=int, default=200)
+    parser.add_argument('--obstacles', type=int, default=5)
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--on', action='append', default=[], metavar='BEHAVIOUR',
+        help='switch a behaviour on, e.g. --on align')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--out', default='sweep.csv')
+    args = parser.parse_args()
+    values = {}
+    for item in args.values:
+        name, _, listed = item.partition('=')
+        values[name] = [ast.literal_eval(v) for v in listed.split(',')]
+    rows = sweep(grid(**values), processes=args.processes,
+                 boids=args.boids, obstacles=args.obstacles,
+                 steps=args.steps, seed=args.seed,
+                 behaviours={behaviour: True for behaviour in args.on})
+    write_table(rows, args.out)
+    for row in rows:
+        print(', '.join('{}={}'.format(name, row[name])
+                        for name in list(values) + METRICS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""Distributed simulation over tiles of the world.
+
+The world is split in a grid of tiles, each owned by a worker process.
+At every step, workers hand over the boids that crossed into another
+tile, then send their neighbours a halo of copies of the boids close to
+the shared borders, so that neighbour-based behaviours see across them.
+Workers talk to each other and to the coordinator through sockets, so
+they may run on other hosts.
+
+From the pyboids directory, with local workers:
+
+    python -m app.tiles --tiles 2 2 --boids 2000 --steps 200 --on align
+
+or with workers started by hand, possibly on other hosts:
+
+    python -m app.tiles --tiles 2 1 --listen 0.0.0.0:6000 --spawn 0
+    python -m app.tiles --worker coordinator-host:6000
+
+Leaders and obstacles are not distributed.
+"""
+import argparse
+import ast
+import multiprocessing
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+import pygame
+
+from . import params, utils
+from .config import configured
+from .flock import Flock
+from .state import FlockState
+
+FIELDS = ['ids', 'pos', 'vel', 'mass', 'wander']
+
+
+def bundle(state, ids, rows):
+    """Return the arrays of some rows of a state, keyed by field."""
+    return {'ids': ids[rows], 'pos': state.pos[rows],
+            'vel': state.vel[rows], 'mass': state.mass[rows],
+            'wander': state.wander[rows]}
+
+
+def merge(bundles):
+    """Concatenate bundles field by field."""
+    bundles = list(bundles)
+    return {field: np.concatenate([b[field] for b in bundles])
+            for field in FIELDS}
+
+
+def box_distances(points, lo, hi, period=None, extent=0):
+    """Return the distance from points, or boxes, to a box.
+
+    Parameters
+    ----------
+    points : np.array, shape (n, 2)
+        Points, or centres of boxes.
+    lo, hi : np.array, shape (2,)
+    period : np.array, shape (2,), optional
+        Size of the space if it is periodic.
+    extent : np.array, shape (2,), optional
+        Size of the boxes centred on the points.
+    """
+    offset = np.abs(utils.wrap_offsets(points - (lo + hi) / 2, period))
+    return utils.norms(np.maximum(offset - (hi - lo + extent) / 2, 0))
+
+
+def exchange(peers, outgoing):
+    """Send a message to each peer and return the message of each.
+
+    Messages are sent from threads, so that two peers sending each other
+    large messages do not wait for each other to receive.
+    """
+    senders = [threading.Thread(target=peers[t].send, args=(outgoing[t],))
+               for t in peers]
+    for sender in senders:
+        sender.start()
+    incoming = {t: peers[t].recv() for t in peers}
+    for sender in senders:
+        sender.join()
+    return incoming
+
+
+class Tile:
+    """The part of the world simulated by one worker.
+
+    Tile(index, shape, overrides=None, behaviours=None, seed=0) -> Tile
+
+    Parameters
+    ----------
+    index : int
+        Position of the tile in the grid, row-major.
+    shape : tuple of int
+        Number of tiles along each axis.
+    overrides : dict, optional
+        Parameter values, by upper case params name.
+    behaviours : dict, optional
+        Behaviour switches overriding the flock's defaults.
+    seed : int, optional
+
+    Attributes
+    ----------
+    neighbours : list of int
+        Tiles boids can cross to, or need a halo from, in one step.
+    migrated : int
+        Number of boids received from other tiles.
+    halo : int
+        Number of halo boids received, over all steps.
+    """
+
+    def __init__(self, index, shape, overrides=None, behaviours=None,
+                 seed=0):
+        self.index = index
+        self.shape = np.array(shape)
+        self.flock = Flock(configured(overrides or {}), seed=seed + index)
+        self.flock.behaviours.update(behaviours or {})
+        config = self.flock.config
+        self.world = self.flock.world
+        self.size = self.world.size / self.shape
+        if np.any(self.size < config.boid_max_speed):
+            raise ValueError('tiles must be larger than a step of a boid')
+        self.lo, self.hi = self.box(index)
+        self.halo_width = config.neighbour_radius
+        reach = max(self.halo_width, config.boid_max_speed)
+        self.neighbours = [
+            t for t in range(int(np.prod(self.shape))) if t != index and
+            box_distances((self.lo + self.hi)[None] / 2, *self.box(t),
+                          self.world.period, self.size)[0] < reach]
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.migrated = self.halo = 0
+
+    def box(self, t):
+        """Return the lower and upper corners of a tile."""
+        lo = np.array(divmod(t, self.shape[1])) * self.size
+        return lo, lo + self.size
+
+    def owners(self, pos):
+        """Return the tile each position belongs to."""
+        cells = np.floor(pos / self.size).astype(int)
+        cells = np.clip(cells, 0, self.shape - 1)
+        return cells[:, 0] * self.shape[1] + cells[:, 1]
+
+    def add(self, boids):
+        """Take ownership of boids, given as a bundle."""
+        self.flock.state.extend(boids['pos'], boids['vel'], boids['mass'],
+                                wander=boids['wander'])
+        self.ids = np.concatenate([self.ids, boids['ids']])
+
+    def step(self, peers):
+        """Exchange migrants and halos with the peers, then update.
+
+        Parameters
+        ----------
+        peers : dict of Connection
+            Connection to each neighbour tile.
+        """
+        state = self.flock.state
+        # hand over the boids that left the tile
+        owners = self.owners(state.pos)
+        incoming = exchange(peers, {
+            t: bundle(state, self.ids, owners == t) for t in peers})
+        own = merge([bundle(state, self.ids, owners == self.index)] +
+                    list(incoming.values()))
+        self.migrated += len(own['ids']) - int(np.sum(owners == self.index))
+        # copy the boids near each border to the tile across it
+        outgoing = {}
+        for t in peers:
+            near = box_distances(own['pos'], *self.box(t),
+                                 self.world.period) < self.halo_width
+            outgoing[t] = {field: values[near]
+                           for field, values in own.items()}
+        # a tile with no neighbours, alone in the world, gets no halo
+        halos = merge([{field: values[:0] for field, values in own.items()}] +
+                      list(exchange(peers, outgoing).values()))
+        self.halo += len(halos['ids'])
+        # simulate own and halo boids, then drop the halo
+        n = len(own['ids'])
+        self.flock.state = FlockState(capacity=n + len(halos['ids']),
+                                      dtype=self.flock.config.dtype)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.add(merge([own, halos]))
+        self.flock.neighbours.invalidate()
+        self.flock.update(None, None)
+        self.flock.reset_frame()
+        self.flock.state.size = n
+        self.ids = self.ids[:n]
+
+
+def work(address, host=params.TILE_HOST):
+    """Run a tile for a coordinator listening at address.
+
+    Other tiles connect to the tile at host.
+    """
+    with Client(address, authkey=params.TILE_AUTHKEY) as coordinator:
+        setup = coordinator.recv()
+        boids = setup.pop('boids')
+        steps = setup.pop('steps')
+        tile = Tile(**setup)
+        tile.add(boids)
+        listener = Listener((host, 0), authkey=params.TILE_AUTHKEY)
+        coordinator.send(listener.address)
+        addresses = coordinator.recv()
+        # connections go from lower to higher tiles, so none waits on
+        # a tile that waits on it
+        peers = {}
+        for t in tile.neighbours:
+            if t > tile.index:
+                peers[t] = Client(addresses[t],
+                                  authkey=params.TILE_AUTHKEY)
+                peers[t].send(tile.index)
+        for t in tile.neighbours:
+            if t < tile.index:
+                peer = listener.accept()
+                peers[peer.recv()] = peer
+        start = time.perf_counter()
+        for _ in range(steps):
+            tile.step(peers)
+        elapsed = time.perf_counter() - start
+        state = tile.flock.state
+        coordinator.send({
+            'boids': bundle(state, tile.ids, np.arange(len(state))),
+            'migrated': tile.migrated,
+            'halo': tile.halo / max(steps, 1),
+            'steps_per_sec': steps / elapsed,
+        })
+        for peer in peers.values():
+            peer.close()
+        listener.close()
+
+
+def _work(address):
+    # images can only be converted once a display mode is set
+    pygame.display.set_mode((1, 1))
+    work(address)
+
+
+def run(shape=(2, 2), boids=1000, steps=100, seed=0, overrides=None,
+        behaviours=None, address=(params.TILE_HOST, 0), spawn=None):
+    """Run a distributed simulation and return the final boids.
+
+    Parameters
+    ----------
+    shape : tuple of int, optional
+        Number of tiles along each axis.
+    boids : int, optional
+        Number of boids, placed uniformly at random in the world.
+    steps : int, optional
+    seed : int, optional
+    overrides : dict, optional
+        Parameter values, by upper case params name.
+    behaviours : dict, optional
+        Behaviour switches overriding the flock's defaults.
+    address : tuple, optional
+        Host and port the coordinator listens at, 0 for any port.
+    spawn : int, optional
+        Number of workers started as local processes, the others are
+        expected to connect by themselves. Default is one per tile.
+
+    Returns
+    -------
+    boids : dict of np.array
+        Arrays of the boids by field, sorted by id.
+    stats : list of dict
+        Migrations, mean halo size and update rate of each tile.
+    """
+    n_tiles = int(np.prod(shape))
+    overrides = overrides or {}
+    tile = Tile(0, shape, overrides)
+    rng = np.random.RandomState(seed)
+    angle = rng.uniform(-np.pi, np.pi, boids)
+    initial = {
+        'ids': np.arange(boids),
+        'pos': rng.rand(boids, 2) * tile.world.size,
+        'vel': tile.flock.config.boid_max_speed *
+        np.stack([np.cos(angle), np.sin(angle)], axis=1),
+        'mass': np.full(boids, float(params.BOID_MASS)),
+        'wander': rng.uniform(-np.pi, np.pi, boids),
+    }
+    context = multiprocessing.get_context('spawn')
+    with Listener(address, authkey=params.TILE_AUTHKEY) as listener:
+        workers = [context.Process(target=_work, args=(listener.address,))
+                   for _ in range(n_tiles if spawn is None else spawn)]
+        for worker in workers:
+            worker.start()
+        connections = [listener.accept() for _ in range(n_tiles)]
+    owners = tile.owners(initial['pos'])
+    for index, connection in enumerate(connections):
+        rows = owners == index
+        connection.send({
+            'index': index, 'shape': shape, 'overrides': overrides,
+            'behaviours': behaviours, 'seed': seed, 'steps': steps,
+            'boids': {field: values[rows]
+                      for field, values in initial.items()},
+        })
+    addresses = [connection.recv() for connection in connections]
+    for connection in connections:
+        connection.send(addresses)
+    results = [connection.recv() for connection in connections]
+    for connection in connections:
+        connection.close()
+    for worker in workers:
+        worker.join()
+    final = merge(result.pop('boids') for result in results)
+    order = np.argsort(final['ids'])
+    return {field: values[order] for field, values in final.items()}, results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a simulation split over tiles of the world.')
+    parser.add_argument('overrides', nargs='*', metavar='NAME=VALUE')
+    parser.add_argument('--tiles', type=int, nargs=2, default=(2, 2))
+    parser.add_argument('--boids', type=int, default=1000)
+    parser.add_argument('--steps', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--on', action='append', default=[],
+                        metavar='BEHAVIOUR', help='behaviour to switch on')
+    parser.add_argument('--listen', default='{}:0'.format(params.TILE_HOST),
+                        metavar='HOST:PORT')
+    parser.add_argument('--spawn', type=int,
+                        help='number of local workers, default one per tile')
+    parser.add_argument('--worker', metavar='HOST:PORT',
+                        help='run a worker for the coordinator at HOST:PORT')
+    parser.add_argument('--host', default=params.TILE_HOST,
+                        help='host other workers reach this worker at')
+    parser.add_argument('--out', help='.npz file to save the final boids to')
+    args = parser.parse_args()
+    if args.worker:
+        host, port = args.worker.rsplit(':', 1)
+        pygame.display.set_mode((1, 1))
+        work((host, int(port)), host=args.host)
+        return
+    overrides = {}
+    for item in args.overrides:
+        name, value = item.split('=', 1)
+        overrides[name] = ast.literal_eval(value)
+    host, port = args.listen.rsplit(':', 1)
+    boids, stats = run(tuple(args.tiles), boids=args.boids, steps=args.steps,
+                       seed=args.seed, overrides=overrides,
+                       behaviours={name: True for name in args.on},
+                       address=(host, int(port)), spawn=args.spawn)
+    for index, tile in enumerate(stats):
+        print('tile {}: {}'.format(index, ', '.join(
+            '{}={:.4g}'.format(key, value) for key, value in tile.items())))
+    if args.out:
+        np.savez(args.out, **boids)
+
+
+if __name__ == '__main__':
+    main()
@@ -76,3 +76,98 @@ def truncate(vector, max_length):
         return normalize(vector, pre_computed=n) * max_length
     else:
         return vector
+
+
+def norms(vectors):
+    """Compute the norms of an array of vectors, one vector per row."""
+    return np.hypot(vectors[:, 0], vectors[:, 1])
+
+
+def normalize_rows(vectors, pre_computed=None):
+    """Return the normalized version of an array of vectors.
+
+    Rows with a null norm are returned as zero vectors.
+
+    Parameters
+    ----------
+    vectors : np.array, shape (n, 2)
+    pre_computed : np.array, optional
+        The pre-computed norms for optimization. If not given, the norms
+        will be computed.
+    """
+    n = pre_computed if pre_computed is not None else norms(vectors)
+    return np.divide(vectors, n[:, None], out=np.zeros_like(vectors),
+                     where=n[:, None] >= 1e-13)
+
+
+def truncate_rows(vectors, max_length):
+    """Truncate the length of an array of vectors to a maximum value.
+
+    Parameters
+    ----------
+    vectors : np.array, shape (n, 2)
+    max_length : float or np.array, shape (n,)
+        One maximum for all vectors, or one per vector.
+    """
+    n = norms(vectors)
+    max_length = np.broadcast_to(max_length, n.shape)
+    scale = np.ones_like(n)
+    over = n > max_length
+    scale[over] = max_length[over] / n[over]
+    return vectors * scale[:, None]
+
+
+def wrap_offsets(vectors, period):
+    """Return the shortest periodic images of offset vectors.
+
+    Parameters
+    ----------
+    vectors : np.array, shape (..., 2)
+    period : np.array, shape (2,)
+        Size of the periodic space, or None if the space is not periodic.
+    """
+    if period is None:
+        return vectors
+    return vectors - period * np.round(vectors / period)
+
+
+def cross_rows(u, v):
+    """Return the z component of the cross products of rows of u and v."""
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+
+
+def closest_on_segments(points, a, b):
+    """Return the closest point to each point on the segment of its row.
+
+    Parameters
+    ----------
+    points, a, b : np.array, shape (n, 2)
+        Segments go from a to b and may have a null length.
+    """
+    ab = b - a
+    length2 = ab[:, 0] * ab[:, 0] + ab[:, 1] * ab[:, 1]
+    t = np.divide(((points - a) * ab).sum(axis=1), length2,
+                  out=np.zeros_like(length2), where=length2 > 0)
+    return a + np.clip(t, 0, 1)[:, None] * ab
+
+
+def segments_cross(p, q, a, b):
+    """Return whether segment pq crosses segment ab, row by row."""
+    d, e = q - p, b - a
+    denom = cross_rows(d, e)
+    safe = np.where(denom != 0, denom, 1)
+    t = cross_rows(a - p, e) / safe
+    u = cross_rows(a - p, d) / safe
+    return (denom != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+
+def segment_distances(p, q, a, b):
+    """Return the distance between segment pq and segment ab, by row."""
+    d = np.minimum.reduce([
+        norms(p - closest_on_segments(p, a, b)),
+        norms(q - closest_on_segments(q, a, b)),
+        norms(a - closest_on_segments(a, p, q)),
+        norms(b - closest_on_segments(b, p, q)),
+    ])
+    d[segments_cross(p, q, a, b)] = 0
+    return d
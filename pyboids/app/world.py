@@ -0,0 +1,60 @@
+"""World class."""
+import numpy as np
+from . import params, utils
+
+
+class World:
+    """The rectangular space boids live in.
+
+    A bounded world is a box: boids are steered back inside when they
+    come within a margin of its sides. A wrapping world is periodic:
+    boids leaving by one side come back by the opposite one, and
+    distances are measured to the nearest periodic image.
+
+    World(size=params.WORLD_SIZE, wrap=params.WRAP_AROUND) -> World
+
+    Parameters
+    ----------
+    size : (float, float), optional
+        Default is WORLD_SIZE.
+    wrap : bool, optional
+        Default is WRAP_AROUND.
+    """
+
+    def __init__(self, size=params.WORLD_SIZE, wrap=params.WRAP_AROUND):
+        self.size = np.array(size, dtype=float)
+        self.wrap = wrap
+
+    @property
+    def period(self):
+        """Size of the periodic space, None if the world is bounded."""
+        return self.size if self.wrap else None
+
+    def offset(self, a, b):
+        """Return b - a, taking the nearest image of b when wrapping."""
+        return utils.wrap_offsets(b - a, self.period)
+
+    def contain(self, pos):
+        """Bring positions back inside a wrapping world, in place."""
+        if self.wrap:
+            np.mod(pos, self.size, out=pos)
+
+    def steer_inside(self, pos, margin=params.BOX_MARGIN,
+                     impulse=params.STEER_INSIDE):
+        """Return the forces that push positions away from the margins.
+
+        Parameters
+        ----------
+        pos : np.array, shape (n, 2)
+        margin : float, optional
+            Default is BOX_MARGIN.
+        impulse : float, optional
+            Force along each axis beyond the margins.
+            Default is STEER_INSIDE.
+        """
+        forces = np.zeros_like(pos)
+        if self.wrap:
+            return forces
+        forces[pos < margin] += impulse
+        forces[pos > self.size - margin] -= impulse
+        return forces
@@ -3,7 +3,11 @@
 Implementation of the Boid Flocking Behaviour algorithms.
 """
 
+import logging
+import sys
 import app
 
 if __name__ == '__main__':
-    app.Menu().main()
+    logging.basicConfig(level=logging.INFO)
+    # optional scenario file, see app/scenario.py
+    app.Menu(*sys.argv[1:2]).main()
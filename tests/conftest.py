@@ -0,0 +1,20 @@
+"""Run the app headless, importing it as main.py does."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'pyboids'))
+
+import pygame  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def display():
+    """Set a display mode, which images need to be converted."""
+    pygame.display.set_mode((1, 1))
+    yield
+    pygame.quit()
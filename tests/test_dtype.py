@@ -0,0 +1,44 @@
+"""Trajectories with float32 storage against float64 storage."""
+import numpy as np
+import pytest
+
+from app.config import Config
+from app.flock import Flock
+from app.obstacle import Obstacle, Wall
+
+STEPS = 10
+BOIDS = 300
+# pixels, after STEPS steps, about ten times the largest error seen.
+# Over longer runs rounding differences grow, as the dynamics are
+# chaotic.
+TOLERANCE = 5e-3
+
+
+def run(dtype, wrap_around, k_neighbours):
+    """Return the positions of a seeded flock after STEPS steps."""
+    config = Config(dtype=dtype, wrap_around=wrap_around,
+                    k_neighbours=k_neighbours)
+    flock = Flock(config, seed=0)
+    rng = np.random.RandomState(0)
+    size = np.array(config.world_size, dtype=float)
+    flock.add_boids(rng.rand(BOIDS, 2) * size, rng.randn(BOIDS, 2))
+    flock.add_boids(rng.rand(3, 2) * size, rng.randn(3, 2), leader=True)
+    flock.add_obstacles(
+        [Obstacle(pos=pos, radius=20) for pos in rng.rand(5, 2) * size] +
+        [Wall([size / 3, size / 2])])
+    for name in flock.behaviours:
+        flock.behaviours[name] = True
+    for _ in range(STEPS):
+        flock.update(None, None)
+        flock.reset_frame()
+    return flock.state.pos
+
+
+@pytest.mark.parametrize('wrap_around', [False, True])
+@pytest.mark.parametrize('k_neighbours', [0, 6])
+def test_float32_stays_close_to_float64(wrap_around, k_neighbours):
+    single = run('float32', wrap_around, k_neighbours)
+    double = run('float64', wrap_around, k_neighbours)
+    assert single.dtype == np.float32
+    assert double.dtype == np.float64
+    assert np.abs(single - double).max() < TOLERANCE
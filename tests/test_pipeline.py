@@ -0,0 +1,51 @@
+"""Fused steering of the pipeline against per-behaviour sums."""
+import numpy as np
+
+from app import utils
+from app.pipeline import Pipeline
+from app.state import FlockState
+
+
+def make_state(n, rng):
+    state = FlockState()
+    state.extend(rng.rand(n, 2), rng.rand(n, 2), rng.uniform(1, 20, n))
+    return state
+
+
+def test_fused_steering_equals_the_sum_of_capped_weighted_forces():
+    rng = np.random.RandomState(0)
+    n = 50
+    state = make_state(n, rng)
+    emitted = {
+        'a': [(rng.choice(n, 30), rng.randn(30, 2) * 50, 2.)],
+        # a stage may emit several times, and for the same boid twice
+        'b': [(rng.choice(n, 40), rng.randn(40, 2) * 50, 0.5),
+              (np.array([3, 3]), np.array([[100., 0], [0, 100.]]), 1.)],
+        'c': [(np.zeros(0, dtype=np.int64), np.zeros((0, 2)), 1.)],
+    }
+    weights = {'a': 0.5, 'b': 2.}
+    pipeline = Pipeline()
+    for name, emits in emitted.items():
+        pipeline.register(name, lambda emits=emits: [
+            pipeline.emit(*emit) for emit in emits])
+    pipeline.run(state, ['a', 'b', 'c'], weights)
+    expected = np.zeros((n, 2))
+    for name, emits in emitted.items():
+        for boids, forces, cap in emits:
+            for boid, force in zip(boids, forces):
+                expected[boid] += weights.get(name, 1.) * utils.truncate(
+                    force / state.mass[boid], cap)
+    assert np.allclose(state.steering, expected)
+
+
+def test_stages_run_in_order_unless_disabled_or_weighted_out():
+    rng = np.random.RandomState(1)
+    state = make_state(5, rng)
+    calls = []
+    pipeline = Pipeline()
+    for name in 'abcd':
+        pipeline.register(name, lambda name=name: calls.append(name))
+    pipeline.run(state, ['d', 'a', 'b', 'c'], {'b': 0},
+                 enabled=lambda name: name != 'c')
+    assert calls == ['d', 'a']
+    assert not state.steering.any()
@@ -0,0 +1,62 @@
+"""Recordings read back as they were written."""
+import numpy as np
+
+from app.flock import Flock
+from app.obstacle import Obstacle, Wall, Polygon
+from app.recording import Recorder, Recording
+from app.stepper import Frame
+
+
+def snapshot(flock):
+    return (flock.state.pos.copy(), flock.state.vel.copy(),
+            [(obstacle, obstacle.pos.copy())
+             for obstacle in flock.obstacle_map.obstacles])
+
+
+def test_recording_round_trip(tmp_path):
+    rng = np.random.RandomState(0)
+    flock = Flock(seed=0)
+    flock.add_boids(rng.rand(20, 2) * 500, rng.randn(20, 2),
+                    leader=np.arange(20) == 3)
+    flock.add_obstacles([
+        Obstacle(pos=(100., 200.), radius=30),
+        Wall(np.array([[0., 0], [50, 10], [80, 60]]), thickness=4)])
+    recorder = Recorder(str(tmp_path), flock)
+    written = []
+    for step in [0, 2, 3, 7]:
+        if step == 3:
+            # boids and obstacles may be added during a recording
+            flock.add_boids(rng.rand(5, 2) * 500, rng.randn(5, 2),
+                            leader=True)
+            flock.add_obstacle(Polygon(
+                np.array([[300., 300], [350, 300], [320, 340]])))
+        flock.state.pos[:] += flock.state.vel
+        pos, vel, obstacles = snapshot(flock)
+        recorder.write(pos, vel, obstacles, step)
+        written.append((pos, vel, obstacles))
+    recorder.close()
+    assert len(recorder) == 4
+
+    recording = Recording(str(tmp_path))
+    assert len(recording) == 4
+    assert list(recording.steps) == [0, 2, 3, 7]
+    assert [recording.at(step) for step in range(9)] == \
+        [0, 0, 1, 2, 2, 2, 2, 3, 3]
+    assert [row for row in range(25) if recording.is_leader(row)] == \
+        [3] + list(range(20, 25))
+    kinds = [(shape['kind'], shape['vertices'])
+             for shape in recording.meta['obstacles']]
+    assert kinds == [('circle', 1), ('wall', 3), ('polygon', 3)]
+    frame = Frame()
+    for k, (pos, vel, obstacles) in enumerate(written):
+        assert recording.read(k, frame) is frame
+        # frames are stored in single precision
+        assert np.array_equal(frame.pos, pos.astype(np.float32))
+        assert np.array_equal(frame.vel, vel.astype(np.float32))
+        assert len(frame.obstacles) == len(obstacles)
+        for (shape, at), (obstacle, expected) in zip(frame.obstacles,
+                                                     obstacles):
+            assert type(shape) is type(obstacle)
+            assert np.allclose(at, expected)
+            assert np.allclose(shape.pos, expected)
+        assert len(frame.lo) == len(frame.hi) == len(obstacles)
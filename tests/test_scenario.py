@@ -0,0 +1,92 @@
+"""Flocks materialized from scenarios."""
+import json
+
+import numpy as np
+import pytest
+
+from app import scenario
+from app.obstacle import Obstacle, Wall, Polygon
+
+BOIDS = [
+    {'count': 200, 'spawn': 'uniform', 'box': [[100, 50], [300, 150]]},
+    {'count': 100, 'spawn': 'normal', 'center': [480, 360], 'spread': 20,
+     'heading': 0.5},
+    {'leader': True, 'spawn': 'points', 'points': [[10, 20], [30, 40]]},
+]
+
+
+def test_boids_are_spawned_as_described():
+    flock = scenario.materialize({
+        'params': {'BOID_MAX_SPEED': 5.}, 'behaviours': {'align': True},
+        'boids': BOIDS})
+    state = flock.state
+    assert len(state) == 302
+    assert flock.behaviours['align']
+    uniform, normal, points = (slice(0, 200), slice(200, 300),
+                               slice(300, 302))
+    assert np.all((state.pos[uniform] >= [100, 50]) &
+                  (state.pos[uniform] <= [300, 150]))
+    assert np.allclose(state.pos[normal].mean(axis=0), [480, 360], atol=5)
+    assert np.allclose(state.pos[normal].std(axis=0), 20, rtol=0.25)
+    assert np.array_equal(state.pos[points], [[10, 20], [30, 40]])
+    # boids move at full speed, along the heading when one is given
+    assert np.allclose(np.hypot(*state.vel.T), 5.)
+    assert np.allclose(state.vel[normal], 5. * np.array(
+        [np.cos(0.5), np.sin(0.5)]))
+    assert np.array_equal(np.flatnonzero(state.leader), [300, 301])
+
+
+def test_obstacles_come_from_the_scenario_and_its_files(tmp_path):
+    specs = [{'kind': 'circle', 'pos': [50. * k, 20], 'radius': 10}
+             for k in range(7)]
+    specs.append({'kind': 'wall', 'vertices': [[0, 0], [100, 0]]})
+    with open(str(tmp_path / 'maze.jsonl'), 'w') as f:
+        # blank lines are skipped
+        f.write('\n'.join(json.dumps(spec) for spec in specs) + '\n\n')
+    with open(str(tmp_path / 'scenario.json'), 'w') as f:
+        json.dump({'obstacles': [
+            {'kind': 'circle', 'count': 5, 'radius': 20,
+             'box': [[0, 0], [100, 100]]},
+            {'kind': 'polygon', 'vertices': [[300, 300], [400, 320],
+                                             [350, 400]]},
+        ], 'obstacle_files': ['maze.jsonl']}, f)
+    flock = scenario.load(str(tmp_path / 'scenario.json'))
+    obstacles = flock.obstacle_map.obstacles
+    assert [type(obstacle) for obstacle in obstacles] == \
+        [Obstacle] * 5 + [Polygon] + [Obstacle] * 7 + [Wall]
+    assert len(flock.obstacles) == len(obstacles)
+    assert all(np.all((obstacle.pos >= 0) & (obstacle.pos <= 100)) and
+               obstacle.radius == 20 for obstacle in obstacles[:5])
+    assert np.array_equal(obstacles[8].pos, [100, 20])
+
+
+def test_same_seed_gives_the_same_flock():
+    spec = {'seed': 3, 'boids': BOIDS[:2],
+            'obstacles': [{'kind': 'circle', 'count': 10}]}
+    first, second = scenario.materialize(spec), scenario.materialize(spec)
+    assert np.array_equal(first.state.pos, second.state.pos)
+    assert np.array_equal(first.state.vel, second.state.vel)
+    assert np.array_equal(
+        [obstacle.pos for obstacle in first.obstacle_map.obstacles],
+        [obstacle.pos for obstacle in second.obstacle_map.obstacles])
+    other = scenario.materialize(dict(spec, seed=4))
+    assert not np.array_equal(first.state.pos, other.state.pos)
+
+
+@pytest.mark.parametrize('spec, error', [
+    ({'behaviours': {'fly': True}}, ValueError),
+    ({'params': {'NO_SUCH_PARAM': 1}}, TypeError),
+    ({'boids': [{'count': 3, 'spawn': 'grid'}]}, ValueError),
+    ({'obstacles': [{'kind': 'star'}]}, ValueError),
+])
+def test_invalid_scenarios_are_rejected(spec, error):
+    with pytest.raises(error):
+        scenario.materialize(spec)
+
+
+def test_bad_obstacle_lines_are_located(tmp_path):
+    with open(str(tmp_path / 'bad.jsonl'), 'w') as f:
+        f.write('{"kind": "circle", "pos": [0, 0]}\n{"kind":\n')
+    with pytest.raises(ValueError, match='line 2'):
+        scenario.materialize({'obstacle_files': ['bad.jsonl']},
+                             str(tmp_path))
@@ -0,0 +1,138 @@
+"""Spatial indices against brute force searches."""
+import numpy as np
+import pytest
+
+from app import utils
+from app.obstacle import Obstacle, ObstacleMap, Wall
+from app.spatial import BoxIndex, NeighbourList, KNearestList
+
+SIZE = np.array([400., 300.])
+
+
+def brute_pairs(pos, radius, period):
+    """Return the set of (i, j), i != j, closer than radius."""
+    offset = utils.wrap_offsets(pos[None, :, :] - pos[:, None, :], period)
+    d2 = np.sum(offset * offset, axis=2)
+    np.fill_diagonal(d2, np.inf)
+    return set(zip(*np.nonzero(d2 < radius * radius)))
+
+
+def pairs(i, j):
+    return set(zip(i.tolist(), j.tolist()))
+
+
+@pytest.mark.parametrize('period', [None, SIZE])
+def test_neighbour_list_matches_brute_force_as_points_move(period):
+    rng = np.random.RandomState(0)
+    pos = rng.rand(300, 2) * SIZE
+    nb = NeighbourList(radius=40, skin=10, period=period)
+    for _ in range(20):
+        nb.update(pos)
+        i, j, offset = nb.within(25)
+        assert pairs(i, j) == brute_pairs(pos, 25, period)
+        assert np.allclose(offset,
+                           utils.wrap_offsets(pos[j] - pos[i], period))
+        pos = pos + rng.uniform(-3, 3, pos.shape)
+        if period is not None:
+            pos %= period
+    # boids moved by at most 3 per step, so several steps per build
+    assert 1 < nb.builds < nb.updates
+
+
+def test_neighbour_list_rebuilds_once_points_moved_half_the_skin():
+    rng = np.random.RandomState(1)
+    pos = rng.rand(100, 2) * SIZE
+    nb = NeighbourList(radius=30, skin=10)
+    nb.update(pos)
+    moved = pos.copy()
+    moved[0] += [4.9, 0]
+    nb.update(moved)
+    assert nb.builds == 1
+    moved[0] += [0.2, 0]
+    nb.update(moved)
+    assert nb.builds == 2
+    nb.update(moved[:50])
+    assert nb.builds == 3
+
+
+@pytest.mark.parametrize('period', [None, SIZE])
+@pytest.mark.parametrize('n', [5, 400])
+def test_k_nearest_list_matches_brute_force(period, n):
+    k = 4
+    rng = np.random.RandomState(2)
+    # a dense cluster and sparse points, searched on coarser grids
+    pos = np.concatenate([rng.rand(n - n // 5, 2) * 20 + 100,
+                          rng.rand(n // 5, 2) * SIZE])
+    nb = KNearestList(k, radius=50, period=period)
+    nb.update(pos)
+    offset = utils.wrap_offsets(pos[None, :, :] - pos[:, None, :], period)
+    d2 = np.sum(offset * offset, axis=2)
+    np.fill_diagonal(d2, np.inf)
+    nearest = np.argsort(d2, axis=1)[:, :min(k, n - 1)]
+    expected = {(i, j) for i in range(n) for j in nearest[i]}
+    i, j, offset = nb.within(np.inf)
+    assert pairs(i, j) == expected
+    assert np.allclose(offset, utils.wrap_offsets(pos[j] - pos[i], period))
+
+
+def brute_overlaps(lo, hi, box_lo, box_hi, period):
+    """Return the set of (query, item) of overlapping boxes."""
+    gap = np.abs(utils.wrap_offsets(
+        (box_lo + box_hi)[None] / 2 - (lo + hi)[:, None] / 2, period))
+    overlap = np.all(2 * gap <= (hi - lo)[:, None] + (box_hi - box_lo)[None],
+                     axis=2)
+    return set(zip(*np.nonzero(overlap)))
+
+
+@pytest.mark.parametrize('period', [None, SIZE])
+def test_box_index_matches_brute_force_as_boxes_move(period):
+    rng = np.random.RandomState(3)
+    box_lo = rng.rand(200, 2) * SIZE
+    box_hi = box_lo + rng.rand(200, 2) * 60
+    index = BoxIndex(cell_size=25, period=period)
+    index.add(box_lo[:150], box_hi[:150])
+    index.add(box_lo[150:], box_hi[150:])
+    for _ in range(3):
+        lo = rng.rand(100, 2) * SIZE
+        hi = lo + rng.rand(100, 2) * 40
+        queries, items = index.query(lo, hi)
+        assert pairs(queries, items) == brute_overlaps(
+            lo, hi, box_lo, box_hi, period)
+        moved = rng.choice(200, 50, replace=False)
+        shift = rng.uniform(-30, 30, (50, 2))
+        box_lo[moved] += shift
+        box_hi[moved] += shift
+        index.move(moved, box_lo[moved], box_hi[moved])
+    assert index.reindexed > 0
+
+
+@pytest.mark.parametrize('period', [None, SIZE])
+def test_threats_find_the_closest_capsule_each_segment_runs_into(period):
+    rng = np.random.RandomState(4)
+    obstacles = [Obstacle(pos=pos, radius=10) for pos in
+                 rng.rand(30, 2) * SIZE]
+    obstacles += [Wall([p, p + rng.uniform(-40, 40, 2)], thickness=6)
+                  for p in rng.rand(30, 2) * SIZE]
+    obstacle_map = ObstacleMap(cell_size=25, period=period)
+    obstacle_map.extend(obstacles)
+    start = rng.rand(500, 2) * SIZE
+    end = start + rng.uniform(-50, 50, (500, 2))
+    rows, a, b = obstacle_map.threats(start, end)
+    assert 0 < len(rows) < len(start)
+    # every capsule, as seen from the start of every segment
+    capsules = [obstacle.capsules() for obstacle in obstacles]
+    ca, cb, radius = (np.concatenate(parts) for parts in zip(*capsules))
+    n, m = len(start), len(ca)
+    s = np.repeat(start, m, axis=0)
+    near_a = s + utils.wrap_offsets(np.tile(ca, (n, 1)) - s, period)
+    near_b = near_a + np.tile(cb - ca, (n, 1))
+    e = np.repeat(end, m, axis=0)
+    hit = (utils.segment_distances(s, e, near_a, near_b) <
+           np.tile(radius, n)).reshape(n, m)
+    assert set(rows.tolist()) == set(np.flatnonzero(hit.any(axis=1)))
+    gap = (utils.norms(s - utils.closest_on_segments(s, near_a, near_b)) -
+           np.tile(radius, n)).reshape(n, m)
+    gap[~hit] = np.inf
+    closest = np.argmin(gap, axis=1)[rows]
+    assert np.allclose(a, near_a.reshape(n, m, 2)[rows, closest])
+    assert np.allclose(b, near_b.reshape(n, m, 2)[rows, closest])
@@ -0,0 +1,19 @@
+"""Tiled runs against a run on a single tile."""
+import numpy as np
+
+from app import tiles
+
+BEHAVIOURS = {'wander': False, 'align': True, 'separate': True}
+
+
+def test_tiles_match_a_single_tile():
+    kwargs = dict(boids=300, steps=20, seed=0, behaviours=BEHAVIOURS)
+    single, _ = tiles.run((1, 1), **kwargs)
+    tiled, stats = tiles.run((2, 2), **kwargs)
+    assert np.array_equal(tiled['ids'], np.arange(300))
+    # halos give every boid the neighbours it would have on one tile,
+    # so only the order of sums differs
+    assert np.allclose(tiled['pos'], single['pos'], atol=1e-6)
+    assert np.allclose(tiled['vel'], single['vel'], atol=1e-6)
+    assert sum(tile['migrated'] for tile in stats) > 0
+    assert all(tile['halo'] > 0 for tile in stats)